@@ -0,0 +1,305 @@
+# api.py
+# Headless JSON API for margin, scenario, risk and coverage computation
+#
+# Run with: uvicorn api:app --host 0.0.0.0 --port 8000
+# (from the fyp-project folder; API_WORKERS sets the process pool size)
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Dict, List, Literal, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, Field
+
+from scripts import __version__
+from scripts.categories import to_labels
+from scripts.commodity_index import CommodityIndex, coverage_data_version
+from scripts.confidence_band import confidence_multiplier, confidence_multiplier_array
+from scripts.hs2_descriptions import HS2_DESCRIPTIONS
+from scripts.margin_model import compute_margin
+from scripts.parallel_executor import resolve_workers
+from scripts.pricing import COST_DRIVERS, price_batch
+from scripts.risk_adjuster import adjust_risk, adjust_risk_array
+from scripts.risk_label import risk_label, risk_label_array
+from scripts.scenario_runner import GRID_AXES, RESULT_COLUMNS, GridRange, run_scenario_grid
+from scripts.storage import read_table
+
+# Worker processes for CPU-bound requests (0 = one per core, 1 = threads only)
+API_WORKERS = int(os.environ.get("API_WORKERS", "0"))
+
+# Requests smaller than this are computed inline; pool hand-off costs more
+INLINE_BATCH_ITEMS = 2_000
+INLINE_GRID_POINTS = 20_000
+
+# Request size limits
+MAX_BATCH_ITEMS = 200_000
+MAX_GRID_POINTS = 2_000_000
+
+# Responses larger than this are gzip-compressed when the client accepts it
+GZIP_MIN_BYTES = 1_000
+
+CoverageClass = Literal["High coverage", "Partial coverage", "Low coverage", "No coverage"]
+
+
+# Request models
+
+class Order(BaseModel):
+    import_value_gbp: float
+    revenue_gbp: float
+    fx_shock_pct: float = Field(0.0, description="Decimal, e.g. 0.05 = 5% weaker GBP")
+    shipping_pct: float = 0.0
+    insurance_pct: float = 0.0
+    tariff_pct: float = 0.0
+    hs_code: Optional[int] = Field(None, ge=1, le=99, description="HS2 chapter, used for coverage")
+    coverage_class: Optional[CoverageClass] = Field(None, description="Overrides the HS2 lookup")
+
+
+class BatchRequest(BaseModel):
+    orders: List[Order] = Field(..., max_length=MAX_BATCH_ITEMS)
+
+
+class Axis(BaseModel):
+    lo: Optional[float] = None
+    hi: Optional[float] = None
+    steps: Optional[int] = Field(None, ge=1)
+    values: Optional[List[float]] = None
+
+
+class GridRequest(BaseModel):
+    import_value_gbp: float
+    revenue_gbp: float
+    axes: Dict[str, Axis] = Field(..., description=f"Axis name -> range or values; names: {', '.join(GRID_AXES)}")
+    fx_shock_pct: float = 0.0
+    shipping_pct: float = 0.0
+    insurance_pct: float = 0.0
+    tariff_pct: float = 0.0
+    outputs: List[str] = ["profit", "margin_pct"]
+
+
+class RiskItem(BaseModel):
+    margin_pct: Optional[float]
+    hs_code: Optional[int] = Field(None, ge=1, le=99)
+    coverage_class: Optional[CoverageClass] = None
+
+
+class RiskRequest(BaseModel):
+    items: List[RiskItem] = Field(..., max_length=MAX_BATCH_ITEMS)
+
+
+# Shared state
+
+@lru_cache(maxsize=4)
+def _commodity_index(data_version):
+    coverage_file, mtime = data_version
+    if mtime is None:
+        coverage = pd.DataFrame(columns=["commodity", "ons_coverage_pct", "coverage_class", "sitc_category"])
+    else:
+        coverage = read_table(coverage_file)
+    return CommodityIndex(coverage, HS2_DESCRIPTIONS)
+
+
+def commodity_index():
+    """Commodity index for the current coverage file (rebuilt when it changes)."""
+
+    return _commodity_index(coverage_data_version())
+
+
+def resolve_coverage(hs_code, coverage_class, index=None):
+    """Explicit coverage class, else the class for hs_code, else None."""
+
+    if coverage_class is not None or hs_code is None:
+        return coverage_class
+    return (index or commodity_index()).info(hs_code)["coverage_class"]
+
+
+def resolve_coverage_batch(items):
+    """
+    resolve_coverage() for a batch of orders or risk items.
+
+    The coverage file is checked once per request, so every item sees the
+    same version, and each distinct hs_code is looked up once.
+    """
+
+    hs_codes = {item.hs_code for item in items if item.coverage_class is None and item.hs_code is not None}
+    index = commodity_index() if hs_codes else None
+    classes = {hs_code: resolve_coverage(hs_code, None, index) for hs_code in hs_codes}
+    return [
+        item.coverage_class if item.coverage_class is not None or item.hs_code is None else classes[item.hs_code]
+        for item in items
+    ]
+
+
+def _json_column(values):
+    """Array -> JSON-safe list (NaN becomes null)."""
+
+    if isinstance(values, list):
+        return values
+    if isinstance(values, pd.Categorical):
+        return to_labels(values)
+    values = np.asarray(values)
+    if values.dtype.kind == "f" and np.isnan(values).any():
+        values = values.astype(object)
+        values[pd.isna(values)] = None
+    return values.tolist()
+
+
+async def run_cpu(func, *args, inline=False):
+    """
+    Run CPU-bound work without blocking the event loop.
+
+    Small jobs run inline; larger ones go to the process pool (or the
+    default thread pool when API_WORKERS is 1).
+    """
+
+    if inline:
+        return func(*args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(app.state.pool, func, *args)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    workers = resolve_workers(API_WORKERS)
+    app.state.pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        yield
+    finally:
+        if app.state.pool is not None:
+            app.state.pool.shutdown(cancel_futures=True)
+
+
+app = FastAPI(
+    title="UK SME Import Margin API",
+    version=__version__,
+    lifespan=lifespan,
+)
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES)
+
+
+# Worker functions (module level so the process pool can pickle them)
+
+def _price_orders(columns, coverage):
+    result = price_batch(coverage_class=coverage, **columns)
+    return {name: _json_column(values) for name, values in result.items()}
+
+
+def _grid(request_args, axes, outputs):
+    cube = run_scenario_grid(axes=axes, outputs=outputs, as_frame=False, **request_args)
+    return {
+        "dims": list(cube.dims),
+        "shape": list(cube.shape),
+        "coords": {dim: cube.coords[dim].tolist() for dim in cube.dims},
+        "data": {name: _json_column(values) for name, values in cube.data.items()},
+    }
+
+
+# Endpoints
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "version": __version__}
+
+
+@app.post("/margin")
+async def margin(order: Order):
+    """Landed cost, profit and margin for one order, with its risk levels."""
+
+    result = compute_margin(
+        import_value_gbp=order.import_value_gbp,
+        revenue_gbp=order.revenue_gbp,
+        fx_shock_pct=order.fx_shock_pct,
+        shipping_pct=order.shipping_pct,
+        insurance_pct=order.insurance_pct,
+        tariff_pct=order.tariff_pct,
+    )
+    coverage = resolve_coverage(order.hs_code, order.coverage_class)
+    base_risk = risk_label(result["margin_pct"])
+    result.update(
+        coverage_class=coverage,
+        risk_level=base_risk,
+        adjusted_risk=adjust_risk(base_risk, coverage),
+        confidence_multiplier=confidence_multiplier(coverage),
+    )
+    return result
+
+
+@app.post("/margin/batch")
+async def margin_batch(request: BatchRequest):
+    """
+    Price many orders in one vectorised pass.
+
+    Returns columns (one list per result field, in order position) rather
+    than one object per order, which keeps large responses compact.
+    """
+
+    orders = request.orders
+    columns = {
+        "import_value_gbp": np.fromiter((o.import_value_gbp for o in orders), np.float64, len(orders)),
+        "revenue_gbp": np.fromiter((o.revenue_gbp for o in orders), np.float64, len(orders)),
+    }
+    for driver in COST_DRIVERS:
+        columns[driver] = np.fromiter((getattr(o, driver) for o in orders), np.float64, len(orders))
+    coverage = resolve_coverage_batch(orders)
+
+    result = await run_cpu(_price_orders, columns, coverage, inline=len(orders) <= INLINE_BATCH_ITEMS)
+    result["coverage_class"] = coverage
+    return {"count": len(orders), "columns": result}
+
+
+@app.post("/grid")
+async def grid(request: GridRequest):
+    """Evaluate margins over an N-dimensional scenario grid."""
+
+    unknown = set(request.axes) - set(GRID_AXES)
+    if unknown:
+        raise HTTPException(422, f"Unknown grid axes: {sorted(unknown)}")
+    unknown = set(request.outputs) - set(RESULT_COLUMNS)
+    if unknown:
+        raise HTTPException(422, f"Unknown output columns: {sorted(unknown)}")
+
+    axes = {}
+    for name, axis in request.axes.items():
+        if axis.values is not None:
+            axes[name] = list(axis.values)
+        elif None not in (axis.lo, axis.hi, axis.steps):
+            axes[name] = GridRange(axis.lo, axis.hi, axis.steps)
+        else:
+            raise HTTPException(422, f"Axis {name} needs either values or lo, hi and steps")
+
+    points = int(np.prod([len(a) for a in axes.values()]))
+    if points > MAX_GRID_POINTS:
+        raise HTTPException(413, f"Grid has {points:,} points (limit {MAX_GRID_POINTS:,})")
+
+    request_args = request.model_dump(exclude={"axes", "outputs"})
+    return await run_cpu(_grid, request_args, axes, request.outputs, inline=points <= INLINE_GRID_POINTS)
+
+
+@app.post("/risk")
+async def risk(request: RiskRequest):
+    """Base and coverage-adjusted risk levels for a batch of margins."""
+
+    coverage = resolve_coverage_batch(request.items)
+    base_risk = risk_label_array([item.margin_pct for item in request.items])
+    columns = {
+        "risk_level": _json_column(base_risk),
+        "adjusted_risk": _json_column(adjust_risk_array(base_risk, coverage)),
+        "coverage_class": coverage,
+        "confidence_multiplier": _json_column(confidence_multiplier_array(coverage)),
+    }
+    results = [dict(zip(columns, row)) for row in zip(*columns.values())]
+    return {"count": len(results), "results": results}
+
+
+@app.get("/coverage/{hs_code}")
+async def coverage(hs_code: int):
+    """ONS coverage and SITC category for an HS2 chapter."""
+
+    if hs_code not in HS2_DESCRIPTIONS:
+        raise HTTPException(404, f"Unknown HS2 chapter: {hs_code}")
+    return {"hs_code": hs_code, **commodity_index().info(hs_code)}
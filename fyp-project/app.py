@@ -3,19 +3,35 @@
 
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import os
 from datetime import datetime
 
 # Core calculation modules
 from scripts.margin_model import compute_margin
-from scripts.scenario_runner import run_sensitivity_scenarios
+from scripts.scenario_cache import ScenarioCache, cached_scenarios
 from scripts.risk_label import risk_label
 from scripts.risk_adjuster import adjust_risk
-from scripts.confidence_band import confidence_multiplier
+from scripts.confidence_band import combined_multiplier
+from scripts.storage import read_table
+from scripts.commodity_index import CommodityIndex, coverage_data_version
+from scripts.fx_rates import fx_data_version, load_fx_rates
+from scripts.fx_distributions import FxShockDistributions, shock_data_version
+from scripts.forecast_engine import forecast_data_version, load_forecast_bands
+from scripts.market_intelligence import benchmark_data_version, load_market_benchmarks
+from scripts.hs2_descriptions import HS2_DESCRIPTIONS
+from scripts.dashboard_style import (
+    DASHBOARD_CSS,
+    get_coverage_badge,
+    get_coverage_color,
+    get_risk_badge,
+    quality_description,
+)
+from scripts.dashboard_figures import (
+    gauge_figure,
+    heatmap_figure,
+    scenario_display_table,
+    sensitivity_figures,
+    waterfall_figure,
+)
 
 # Page config
 st.set_page_config(
@@ -25,257 +41,81 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# HS2 chapter descriptions (codes 01-99)
-HS2_DESCRIPTIONS = {
-    1: "Live animals", 2: "Meat and edible meat offal", 3: "Fish and crustaceans",
-    4: "Dairy produce, eggs, honey", 5: "Products of animal origin", 6: "Live trees and plants",
-    7: "Edible vegetables", 8: "Edible fruit and nuts", 9: "Coffee, tea, spices",
-    10: "Cereals", 11: "Milling products, malt, starches", 12: "Oil seeds, miscellaneous grains",
-    13: "Lac, gums, resins", 14: "Vegetable plaiting materials", 15: "Animal or vegetable fats",
-    16: "Preparations of meat or fish", 17: "Sugars and sugar confectionery", 18: "Cocoa and cocoa preparations",
-    19: "Preparations of cereals", 20: "Preparations of vegetables, fruit", 21: "Miscellaneous edible preparations",
-    22: "Beverages, spirits and vinegar", 23: "Food industry residues", 24: "Tobacco and substitutes",
-    25: "Salt, sulphur, earth and stone", 26: "Ores, slag and ash", 27: "Mineral fuels, oils",
-    28: "Inorganic chemicals", 29: "Organic chemicals", 30: "Pharmaceutical products",
-    31: "Fertilisers", 32: "Tanning or dyeing extracts", 33: "Essential oils and perfumery",
-    34: "Soap, washing preparations", 35: "Albuminoidal substances, glues", 36: "Explosives, pyrotechnics",
-    37: "Photographic goods", 38: "Miscellaneous chemical products", 39: "Plastics and articles",
-    40: "Rubber and articles", 41: "Raw hides, skins and leather", 42: "Articles of leather",
-    43: "Furskins and artificial fur", 44: "Wood and articles of wood", 45: "Cork and articles",
-    46: "Manufactures of straw", 47: "Pulp of wood", 48: "Paper and paperboard",
-    49: "Printed books, newspapers", 50: "Silk", 51: "Wool and fine animal hair",
-    52: "Cotton", 53: "Other vegetable textile fibres", 54: "Man-made filaments",
-    55: "Man-made staple fibres", 56: "Wadding, felt and nonwovens", 57: "Carpets and textile floor coverings",
-    58: "Special woven fabrics", 59: "Impregnated textile fabrics", 60: "Knitted or crocheted fabrics",
-    61: "Knitted apparel and accessories", 62: "Woven apparel and accessories", 63: "Other made up textile articles",
-    64: "Footwear", 65: "Headgear", 66: "Umbrellas, walking sticks",
-    67: "Prepared feathers", 68: "Articles of stone, plaster, cement", 69: "Ceramic products",
-    70: "Glass and glassware", 71: "Precious stones and metals", 72: "Iron and steel",
-    73: "Articles of iron or steel", 74: "Copper and articles", 75: "Nickel and articles",
-    76: "Aluminium and articles", 78: "Lead and articles", 79: "Zinc and articles",
-    80: "Tin and articles", 81: "Other base metals", 82: "Tools of base metal",
-    83: "Miscellaneous articles of base metal", 84: "Nuclear reactors, boilers, machinery", 85: "Electrical machinery",
-    86: "Railway locomotives", 87: "Vehicles other than railway", 88: "Aircraft and spacecraft",
-    89: "Ships and boats", 90: "Optical and medical instruments", 91: "Clocks and watches",
-    92: "Musical instruments", 93: "Arms and ammunition", 94: "Furniture and bedding",
-    95: "Toys, games and sports equipment", 96: "Miscellaneous manufactured articles", 97: "Works of art and antiques",
-    99: "Special transactions"
-}
-
-# Custom CSS styling
-st.markdown("""
-<style>
-    .main .block-container {
-        padding-top: 2rem;
-        padding-bottom: 2rem;
-    }
-    
-    .metric-card {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        padding: 1.5rem;
-        border-radius: 1rem;
-        color: white;
-        box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-        text-align: center;
-    }
-    
-    .metric-card-profit {
-        background: linear-gradient(135deg, #11998e 0%, #38ef7d 100%);
-    }
-    
-    .metric-card-loss {
-        background: linear-gradient(135deg, #ff416c 0%, #ff4b2b 100%);
-    }
-    
-    .metric-card-margin {
-        background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);
-    }
-    
-    .metric-card-cost {
-        background: linear-gradient(135deg, #fa709a 0%, #fee140 100%);
-    }
-    
-    .metric-card-revenue {
-        background: linear-gradient(135deg, #a8edea 0%, #fed6e3 100%);
-        color: #333;
-    }
-    
-    .metric-value {
-        font-size: 2rem;
-        font-weight: 700;
-        margin: 0.5rem 0;
-    }
-    
-    .metric-label {
-        font-size: 0.9rem;
-        opacity: 0.9;
-        text-transform: uppercase;
-        letter-spacing: 1px;
-    }
-    
-    .risk-badge {
-        display: inline-block;
-        padding: 0.5rem 1.5rem;
-        border-radius: 2rem;
-        font-weight: 600;
-        font-size: 1rem;
-        margin: 0.25rem;
-    }
-    
-    .risk-high {
-        background: linear-gradient(135deg, #ff416c 0%, #ff4b2b 100%);
-        color: white;
-    }
-    
-    .risk-moderate {
-        background: linear-gradient(135deg, #f7971e 0%, #ffd200 100%);
-        color: #333;
-    }
-    
-    .risk-low {
-        background: linear-gradient(135deg, #56ab2f 0%, #a8e063 100%);
-        color: white;
-    }
-    
-    .coverage-badge {
-        display: inline-block;
-        padding: 0.5rem 1.2rem;
-        border-radius: 1rem;
-        font-size: 0.9rem;
-        font-weight: 600;
-    }
-    
-    .coverage-high { background: #d4edda; color: #155724; border: 2px solid #155724; }
-    .coverage-partial { background: #fff3cd; color: #856404; border: 2px solid #856404; }
-    .coverage-low { background: #f8d7da; color: #721c24; border: 2px solid #721c24; }
-    .coverage-none { background: #e2e3e5; color: #383d41; border: 2px solid #383d41; }
-    
-    .section-header {
-        background: linear-gradient(90deg, #1a1a2e 0%, #16213e 100%);
-        color: white;
-        padding: 1rem 1.5rem;
-        border-radius: 0.75rem;
-        margin: 1.5rem 0 1rem 0;
-        font-size: 1.2rem;
-        font-weight: 600;
-    }
-    
-    .info-box {
-        background: #f8f9fa;
-        border-left: 4px solid #4facfe;
-        padding: 1rem;
-        border-radius: 0 0.5rem 0.5rem 0;
-        margin: 1rem 0;
-    }
-    
-    .commodity-card {
-        background: linear-gradient(135deg, #f5f7fa 0%, #e4e8eb 100%);
-        padding: 1rem;
-        border-radius: 0.75rem;
-        border-left: 4px solid #667eea;
-        margin: 0.5rem 0;
-    }
-    
-    .commodity-category {
-        font-size: 0.85rem;
-        color: #667eea;
-        font-weight: 600;
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-    }
-    
-    .commodity-name {
-        font-size: 1rem;
-        color: #1a1a2e;
-        font-weight: 500;
-        margin-top: 0.25rem;
-    }
-    
-    .coverage-meter {
-        background: #e9ecef;
-        border-radius: 0.5rem;
-        height: 8px;
-        margin-top: 0.5rem;
-        overflow: hidden;
-    }
-    
-    .coverage-fill {
-        height: 100%;
-        border-radius: 0.5rem;
-    }
-    
-    .coverage-fill-high { background: linear-gradient(90deg, #51cf66 0%, #40c057 100%); }
-    .coverage-fill-partial { background: linear-gradient(90deg, #ffd43b 0%, #fab005 100%); }
-    .coverage-fill-low { background: linear-gradient(90deg, #ff6b6b 0%, #fa5252 100%); }
-    .coverage-fill-none { background: #adb5bd; }
-</style>
-""", unsafe_allow_html=True)
+# Custom CSS styling (static, from scripts.dashboard_style)
+st.markdown(DASHBOARD_CSS, unsafe_allow_html=True)
 
 # Load ONS coverage data
 @st.cache_data
-def load_ons_coverage():
-    coverage_file = "data/output/ons_coverage_by_commodity_classified.csv"
-    if os.path.exists(coverage_file):
-        df = pd.read_csv(coverage_file)
+def load_ons_coverage(data_version):
+    coverage_file, mtime = data_version
+    if mtime is not None:
+        df = read_table(coverage_file)
         return df
     else:
-        st.warning("Coverage data not found. Please run: python scripts/data_merge.py")
+        st.warning("Coverage data not found. Please run: python -m scripts.data_merge")
         return pd.DataFrame(columns=["commodity", "ons_coverage_pct", "coverage_class", "sitc_category"])
 
-ons_coverage_df = load_ons_coverage()
-
-# Helper functions
-def get_coverage_badge(coverage_class):
-    badges = {
-        "High coverage": ("coverage-high", "HIGH COVERAGE"),
-        "Partial coverage": ("coverage-partial", "PARTIAL COVERAGE"),
-        "Low coverage": ("coverage-low", "LOW COVERAGE"),
-        "No coverage": ("coverage-none", "NO COVERAGE")
-    }
-    css_class, label = badges.get(coverage_class, ("coverage-none", str(coverage_class)))
-    return f'<span class="coverage-badge {css_class}">{label}</span>'
-
-def get_risk_badge(risk_level):
-    badges = {
-        "HIGH": ("risk-high", "HIGH RISK"),
-        "MODERATE": ("risk-moderate", "MODERATE RISK"),
-        "LOW": ("risk-low", "LOW RISK")
-    }
-    css_class, label = badges.get(risk_level, ("risk-moderate", str(risk_level)))
-    return f'<span class="risk-badge {css_class}">{label}</span>'
-
-def get_coverage_color(coverage_class):
-    colors = {
-        "High coverage": "coverage-fill-high",
-        "Partial coverage": "coverage-fill-partial",
-        "Low coverage": "coverage-fill-low",
-        "No coverage": "coverage-fill-none"
-    }
-    return colors.get(coverage_class, "coverage-fill-none")
-
-def get_commodity_info(hs_code, coverage_df):
-    """Get commodity information from coverage data."""
-    row = coverage_df[coverage_df["commodity"] == hs_code]
-    
-    if len(row) > 0:
-        row = row.iloc[0]
-        return {
-            "description": HS2_DESCRIPTIONS.get(hs_code, "Unknown"),
-            "sitc_category": row.get("sitc_category", "Unknown"),
-            "coverage_class": row.get("coverage_class", "No coverage"),
-            "coverage_pct": row.get("ons_coverage_pct", 0),
-            "total_years": row.get("total_years", 0),
-            "covered_years": row.get("ons_covered_years", 0)
-        }
-    else:
-        return {
-            "description": HS2_DESCRIPTIONS.get(hs_code, "Unknown"),
-            "sitc_category": "Unknown",
-            "coverage_class": "No coverage",
-            "coverage_pct": 0,
-            "total_years": 0,
-            "covered_years": 0
-        }
+@st.cache_resource
+def load_commodity_index(data_version):
+    """Build the commodity lookup index once per coverage data version."""
+    return CommodityIndex(load_ons_coverage(data_version), HS2_DESCRIPTIONS)
+
+commodity_index = load_commodity_index(coverage_data_version())
+
+@st.cache_resource
+def load_fx(data_version):
+    """Indexed BoE FX series, loaded once per FX store version."""
+    return load_fx_rates(data_version[0])
+
+fx_rates = load_fx(fx_data_version())
+
+@st.cache_resource
+def load_fx_shocks(data_version):
+    """Empirical FX shock quantiles, loaded once per saved version."""
+    return FxShockDistributions.load(data_version[0])
+
+fx_shocks = load_fx_shocks(shock_data_version())
+
+@st.cache_data
+def load_forecasts(data_version):
+    """One-step forecast interval widths per HS2 chapter, once per forecast version."""
+    return load_forecast_bands(data_version[0])
+
+forecast_bands = load_forecasts(forecast_data_version())
+
+@st.cache_resource
+def load_benchmarks(data_version):
+    """Indexed HS2 x country market benchmarks, loaded once per table version."""
+    return load_market_benchmarks(data_version[0])
+
+market_benchmarks = load_benchmarks(benchmark_data_version())
+
+@st.cache_resource
+def get_scenario_cache():
+    """Scenario grid cache shared by all sessions."""
+    return ScenarioCache(maxsize=256, ttl=3600)
+
+scenario_cache = get_scenario_cache()
+
+# Cached figure builders, keyed on their inputs. Figures are shared
+# read-only objects, so cache_resource avoids copying them on every rerun.
+@st.cache_resource(max_entries=256)
+def build_waterfall(import_value, goods_cost, shipping_cost, insurance_cost, tariff_cost, landed_cost):
+    return waterfall_figure(import_value, goods_cost, shipping_cost, insurance_cost, tariff_cost, landed_cost)
+
+@st.cache_resource(max_entries=256)
+def build_gauge(margin_pct):
+    return gauge_figure(margin_pct)
+
+@st.cache_resource(max_entries=64)
+def build_scenario_figures(import_value, revenue, uncertainty, fx_axis=None):
+    df, pivot_margin = cached_scenarios(scenario_cache, import_value, revenue, uncertainty, fx_axis)
+    return (heatmap_figure(pivot_margin),) + sensitivity_figures(df, uncertainty)
+
+@st.cache_data(max_entries=64)
+def build_scenario_table(import_value, revenue, uncertainty, fx_axis=None):
+    df, _ = cached_scenarios(scenario_cache, import_value, revenue, uncertainty, fx_axis)
+    return scenario_display_table(df)
 
 # Header
 st.markdown("# UK SME Import Margin Simulator")
@@ -311,34 +151,16 @@ with st.sidebar:
     # Commodity selection
     st.markdown("### Select Your Commodity")
     
-    # Get unique SITC categories from coverage data
-    if len(ons_coverage_df) > 0 and "sitc_category" in ons_coverage_df.columns:
-        sitc_categories = sorted(ons_coverage_df["sitc_category"].dropna().unique())
-    else:
-        sitc_categories = [
-            "0 Food & live animals", "1 Beverages & tobacco", "2 Crude materials",
-            "3 Fuels", "5 Chemicals", "6 Manufactured goods",
-            "7 Machinery & transport equipment", "8 Miscellaneous manufactures", "9 Other commodities"
-        ]
-    
+    # SITC categories and HS options are prebuilt in the commodity index
     selected_sitc = st.selectbox(
         "Product Category (SITC)",
-        options=sitc_categories,
+        options=commodity_index.sitc_categories,
         index=0,
         help="Select the broad SITC category of your import goods"
     )
     
-    # Filter HS codes by selected SITC category
-    if len(ons_coverage_df) > 0:
-        filtered_hs = ons_coverage_df[ons_coverage_df["sitc_category"] == selected_sitc]["commodity"].tolist()
-    else:
-        filtered_hs = list(range(1, 99))
-    
-    # Create dropdown options with descriptions
-    hs_options = {
-        f"HS {hs:02d} - {HS2_DESCRIPTIONS.get(hs, 'Unknown')}": hs 
-        for hs in sorted(filtered_hs) if hs in HS2_DESCRIPTIONS
-    }
+    # Dropdown options with descriptions for the selected SITC category
+    hs_options = commodity_index.hs_options(selected_sitc)
     
     if hs_options:
         selected_hs_label = st.selectbox(
@@ -351,7 +173,7 @@ with st.sidebar:
         commodity_code = st.number_input("HS Code", value=1, min_value=1, max_value=99)
     
     # Get commodity info
-    commodity_info = get_commodity_info(commodity_code, ons_coverage_df)
+    commodity_info = commodity_index.info(commodity_code)
     coverage_class = commodity_info["coverage_class"]
     coverage_pct = commodity_info["coverage_pct"]
     
@@ -385,6 +207,36 @@ with st.sidebar:
         help="Currency fluctuation impact (+ve = weaker GBP)"
     )
     
+    # Historical context for the FX shock, when BoE rates have been loaded
+    fx_axis = None
+    if fx_rates.currencies:
+        supplier_currency = st.selectbox(
+            "Supplier Currency",
+            options=fx_rates.currencies,
+            help="Currency your supplier invoices in (Bank of England daily spot rates)"
+        )
+        fx_date = fx_rates.date_range(supplier_currency)[1]
+        fx_vol = fx_rates.volatility(supplier_currency, fx_date)
+        fx_move = fx_rates.typical_move(supplier_currency, fx_date)
+        st.caption(
+            f"GBP/{supplier_currency} {fx_rates.rate(supplier_currency, fx_date):.4f} on {fx_date}. "
+            f"1-year realised volatility {fx_vol * 100:.1f}%, "
+            f"a typical 3-month move of ±{fx_move * 100:.1f}%."
+        )
+        
+        # Scenario FX axis from the currency's historical 3-month shocks
+        if fx_shocks.has(supplier_currency):
+            if st.checkbox(
+                "Use historical FX range in scenarios",
+                value=True,
+                help="Scenario FX shocks span the 1st-99th percentile of past 3-month moves instead of ±10%"
+            ):
+                fx_axis = tuple(fx_shocks.grid(supplier_currency))
+                st.caption(
+                    f"Scenario FX range: {fx_axis[0] * 100:+.1f}% to {fx_axis[-1] * 100:+.1f}% "
+                    f"(1st-99th percentile of 3-month {supplier_currency} shocks)"
+                )
+    
     shipping_pct = st.slider(
         "Shipping Cost (%)",
         min_value=0.0,
@@ -436,7 +288,8 @@ tariff_cost = base_result["tariff_cost"]
 # Risk Assessment
 base_risk = risk_label(margin_pct)
 final_risk = adjust_risk(base_risk, coverage_class)
-uncertainty = confidence_multiplier(coverage_class)
+forecast_band = forecast_bands.get(commodity_code)
+uncertainty = combined_multiplier(coverage_class, forecast_band)
 
 # Main dashboard
 
@@ -490,39 +343,7 @@ left_col, right_col = st.columns([1, 1])
 with left_col:
     st.markdown('<div class="section-header">Cost Breakdown</div>', unsafe_allow_html=True)
     
-    cost_items = ['Import Value', 'FX Impact', 'Shipping', 'Insurance', 'Tariffs', 'Landed Cost']
-    cost_values = [
-        import_value,
-        goods_cost - import_value,
-        shipping_cost,
-        insurance_cost,
-        tariff_cost,
-        0
-    ]
-    
-    fig_waterfall = go.Figure(go.Waterfall(
-        name="Cost Breakdown",
-        orientation="v",
-        measure=["absolute", "relative", "relative", "relative", "relative", "total"],
-        x=cost_items,
-        y=cost_values,
-        connector={"line": {"color": "rgb(63, 63, 63)"}},
-        increasing={"marker": {"color": "#ff6b6b"}},
-        decreasing={"marker": {"color": "#51cf66"}},
-        totals={"marker": {"color": "#339af0"}},
-        text=[f"GBP {v:,.0f}" if i < 5 else f"GBP {landed_cost:,.0f}" for i, v in enumerate(cost_values)],
-        textposition="outside"
-    ))
-    
-    fig_waterfall.update_layout(
-        title="Cost Build-up to Landed Cost",
-        showlegend=False,
-        height=400,
-        margin=dict(t=50, b=50, l=50, r=50),
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-    )
-    
+    fig_waterfall = build_waterfall(import_value, goods_cost, shipping_cost, insurance_cost, tariff_cost, landed_cost)
     st.plotly_chart(fig_waterfall, use_container_width=True)
     
     # Cost summary table
@@ -554,17 +375,7 @@ with right_col:
     
     st.markdown("<br>", unsafe_allow_html=True)
     
-    # Quality descriptions
-    quality_description = {
-        "High coverage": ("excellent", "reliable", "narrow"),
-        "Partial coverage": ("moderate", "reasonably reliable", "moderately widened"),
-        "Low coverage": ("limited", "less reliable", "significantly widened"),
-        "No coverage": ("no", "unreliable", "maximally widened")
-    }
-    
-    qual_level, qual_reliability, qual_bands = quality_description.get(
-        coverage_class, ("unknown", "uncertain", "widened")
-    )
+    qual_level, qual_reliability, qual_bands = quality_description(coverage_class)
     
     st.markdown(f"""
     <div class="info-box">
@@ -580,192 +391,44 @@ with right_col:
     """, unsafe_allow_html=True)
     
     # Profit gauge
-    fig_gauge = go.Figure(go.Indicator(
-        mode="gauge+number+delta",
-        value=margin_pct,
-        domain={'x': [0, 1], 'y': [0, 1]},
-        title={'text': "Profit Margin (%)"},
-        delta={'reference': 10, 'increasing': {'color': "#51cf66"}, 'decreasing': {'color': "#ff6b6b"}},
-        gauge={
-            'axis': {'range': [-20, 40], 'tickwidth': 1},
-            'bar': {'color': "#339af0"},
-            'bgcolor': "white",
-            'borderwidth': 2,
-            'bordercolor': "gray",
-            'steps': [
-                {'range': [-20, 0], 'color': '#ff6b6b'},
-                {'range': [0, 5], 'color': '#ffd43b'},
-                {'range': [5, 10], 'color': '#ffe066'},
-                {'range': [10, 40], 'color': '#8ce99a'}
-            ],
-            'threshold': {
-                'line': {'color': "black", 'width': 4},
-                'thickness': 0.75,
-                'value': margin_pct
-            }
-        }
-    ))
-    
-    fig_gauge.update_layout(
-        height=280,
-        margin=dict(t=50, b=20, l=30, r=30),
-        paper_bgcolor='rgba(0,0,0,0)',
-    )
-    
-    st.plotly_chart(fig_gauge, use_container_width=True)
+    st.plotly_chart(build_gauge(margin_pct), use_container_width=True)
 
 # Scenario analysis
 st.markdown('<div class="section-header">Scenario Analysis</div>', unsafe_allow_html=True)
 
-# Run sensitivity scenarios
-df = run_sensitivity_scenarios(
-    import_value_gbp=import_value,
-    revenue_gbp=revenue,
-)
-
-# Calculate confidence bands
-df["profit_lower"] = df["profit"] - abs(df["profit"]) * uncertainty
-df["profit_upper"] = df["profit"] + abs(df["profit"]) * uncertainty
-df["margin_lower"] = df["margin_pct"] - abs(df["margin_pct"]) * uncertainty
-df["margin_upper"] = df["margin_pct"] + abs(df["margin_pct"]) * uncertainty
-
 # Tabs for different views
 tab1, tab2, tab3 = st.tabs(["Margin Heatmap", "Sensitivity Charts", "Data Table"])
 
+# Figures only depend on the scenario inputs, so slider moves that leave
+# them unchanged reuse the cached objects
+fig_heatmap, fig_shipping, fig_fx = build_scenario_figures(import_value, revenue, uncertainty, fx_axis)
+
 with tab1:
-    pivot_margin = df.pivot_table(
-        values='margin_pct', 
-        index='fx_shock_pct', 
-        columns='shipping_pct',
-        aggfunc='mean'
-    )
-    
-    fig_heatmap = px.imshow(
-        pivot_margin,
-        labels=dict(x="Shipping Cost (%)", y="FX Shock (%)", color="Margin (%)"),
-        x=[f"{x:.0f}%" for x in pivot_margin.columns],
-        y=[f"{y:.0f}%" for y in pivot_margin.index],
-        color_continuous_scale="RdYlGn",
-        aspect="auto"
-    )
-    
-    fig_heatmap.update_layout(
-        title="Profit Margin by FX Shock and Shipping Cost",
-        height=500,
-        margin=dict(t=60, b=50, l=80, r=50),
-    )
-    
     st.plotly_chart(fig_heatmap, use_container_width=True)
     
-    st.caption(f"Confidence bands: +/- {uncertainty*100:.0f}% based on ONS coverage ({coverage_class})")
+    if forecast_band is None:
+        st.caption(f"Confidence bands: +/- {uncertainty*100:.0f}% based on ONS coverage ({coverage_class})")
+    else:
+        st.caption(
+            f"Confidence bands: +/- {uncertainty*100:.0f}% based on ONS coverage ({coverage_class}) "
+            f"and the HS {commodity_code:02d} import forecast interval (+/- {forecast_band*100:.0f}%)"
+        )
 
 with tab2:
     trend_col1, trend_col2 = st.columns(2)
     
     with trend_col1:
-        df_fx0 = df[df['fx_shock_pct'] == 0].sort_values('shipping_pct')
-        
-        fig_shipping = go.Figure()
-        
-        fig_shipping.add_trace(go.Scatter(
-            x=df_fx0['shipping_pct'],
-            y=df_fx0['margin_upper'],
-            mode='lines',
-            line=dict(width=0),
-            showlegend=False,
-            hoverinfo='skip'
-        ))
-        
-        fig_shipping.add_trace(go.Scatter(
-            x=df_fx0['shipping_pct'],
-            y=df_fx0['margin_lower'],
-            mode='lines',
-            line=dict(width=0),
-            fill='tonexty',
-            fillcolor='rgba(51, 154, 240, 0.2)',
-            name=f'Confidence Band (+/- {uncertainty*100:.0f}%)'
-        ))
-        
-        fig_shipping.add_trace(go.Scatter(
-            x=df_fx0['shipping_pct'],
-            y=df_fx0['margin_pct'],
-            mode='lines+markers',
-            name='Margin %',
-            line=dict(color='#339af0', width=3),
-            marker=dict(size=8)
-        ))
-        
-        fig_shipping.add_hline(y=0, line_dash="dash", line_color="red", 
-                               annotation_text="Break-even", annotation_position="right")
-        
-        fig_shipping.update_layout(
-            title="Margin vs Shipping Cost (0% FX)",
-            xaxis_title="Shipping Cost (%)",
-            yaxis_title="Profit Margin (%)",
-            height=350,
-            showlegend=True,
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-        )
-        
         st.plotly_chart(fig_shipping, use_container_width=True)
     
     with trend_col2:
-        df_ship5 = df[abs(df['shipping_pct'] - 5) < 1].sort_values('fx_shock_pct')
-        
-        if df_ship5.empty:
-            df_ship5 = df[df['shipping_pct'] == df['shipping_pct'].min()].sort_values('fx_shock_pct')
-        
-        fig_fx = go.Figure()
-        
-        fig_fx.add_trace(go.Scatter(
-            x=df_ship5['fx_shock_pct'],
-            y=df_ship5['margin_upper'],
-            mode='lines',
-            line=dict(width=0),
-            showlegend=False,
-            hoverinfo='skip'
-        ))
-        
-        fig_fx.add_trace(go.Scatter(
-            x=df_ship5['fx_shock_pct'],
-            y=df_ship5['margin_lower'],
-            mode='lines',
-            line=dict(width=0),
-            fill='tonexty',
-            fillcolor='rgba(255, 107, 107, 0.2)',
-            name=f'Confidence Band (+/- {uncertainty*100:.0f}%)'
-        ))
-        
-        fig_fx.add_trace(go.Scatter(
-            x=df_ship5['fx_shock_pct'],
-            y=df_ship5['margin_pct'],
-            mode='lines+markers',
-            name='Margin %',
-            line=dict(color='#ff6b6b', width=3),
-            marker=dict(size=8)
-        ))
-        
-        fig_fx.add_hline(y=0, line_dash="dash", line_color="red",
-                         annotation_text="Break-even", annotation_position="right")
-        
-        fig_fx.update_layout(
-            title="Margin vs FX Shock (5% Shipping)",
-            xaxis_title="FX Shock (%)",
-            yaxis_title="Profit Margin (%)",
-            height=350,
-            showlegend=True,
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-        )
-        
         st.plotly_chart(fig_fx, use_container_width=True)
 
-with tab3:
+@st.fragment
+def scenario_table_section(import_value, revenue, uncertainty, commodity_code, fx_axis=None):
+    """Scenario table and CSV export; interactions here rerun only this fragment."""
     st.markdown("#### Full Scenario Data")
     
-    display_df = df.copy()
-    display_df = display_df.round(2)
-    display_df.columns = ['FX Shock (%)', 'Shipping (%)', 'Profit (GBP)', 'Margin (%)', 
-                          'Profit Lower (GBP)', 'Profit Upper (GBP)', 'Margin Lower (%)', 'Margin Upper (%)']
+    display_df = build_scenario_table(import_value, revenue, uncertainty, fx_axis)
     
     st.dataframe(
         display_df,
@@ -773,14 +436,62 @@ with tab3:
         height=400
     )
     
-    csv = display_df.to_csv(index=False)
+    # The CSV is only serialised when the download is requested
     st.download_button(
         label="Download Scenario Data (CSV)",
-        data=csv,
+        data=lambda: display_df.to_csv(index=False),
         file_name=f"import_scenarios_hs{commodity_code}.csv",
-        mime="text/csv"
+        mime="text/csv",
+        on_click="ignore",
+    )
+
+with tab3:
+    scenario_table_section(import_value, revenue, uncertainty, commodity_code, fx_axis)
+
+# Market benchmark (precomputed by the data pipeline; lookups only)
+market = market_benchmarks.market(commodity_code)
+if market is not None:
+    st.markdown('<div class="section-header">Market Benchmark</div>', unsafe_allow_html=True)
+    position = market_benchmarks.position(import_value, commodity_code, market["year"])
+    
+    market_col1, market_col2, market_col3 = st.columns(3)
+    with market_col1:
+        growth = f"{market['growth_pct']:+.1f}% on {market['year'] - 1}" if pd.notna(market["growth_pct"]) else None
+        market_year = f"{market['year']} to date" if market["months"] < 12 else market["year"]
+        st.metric(f"UK imports, HS {commodity_code:02d} ({market_year})", f"GBP {market['total_value']:,.0f}", growth)
+    with market_col2:
+        st.metric("Your share of UK imports", f"{position['share_pct']:.3f}%")
+    with market_col3:
+        st.metric("Largest supplier", market["top_country"], f"{market['top_share_pct']:.1f}% share", delta_color="off")
+    
+    st.caption(
+        f"Your import value is at or above {position['percentile']:.0f}% of the "
+        f"{position['suppliers']} supplier countries' totals for this chapter."
+    )
+    top = market_benchmarks.top_suppliers(commodity_code, market["year"])
+    st.dataframe(
+        top[["rank", "country_code", "value", "share_pct", "growth_pct"]].rename(columns={
+            "rank": "Rank", "country_code": "Country", "value": "Imports (GBP)",
+            "share_pct": "Share %", "growth_pct": "Growth %",
+        }),
+        hide_index=True,
+        use_container_width=True,
     )
 
+# Scenario cache counters (after this run's lookups)
+with st.sidebar:
+    with st.expander("Debug: scenario cache", expanded=False):
+        cache_stats = scenario_cache.stats()
+        st.markdown(
+            f"Hits: **{cache_stats['hits']}** | Misses: **{cache_stats['misses']}** "
+            f"| Hit rate: **{cache_stats['hit_rate'] * 100:.0f}%**"
+        )
+        st.caption(
+            f"{cache_stats['entries']}/{cache_stats['maxsize']} entries, "
+            f"TTL {cache_stats['ttl_seconds']:.0f}s, "
+            f"{cache_stats['evictions']} evicted, {cache_stats['expirations']} expired"
+        )
+
 # Footer
 st.markdown("---")
 
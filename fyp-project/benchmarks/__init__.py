@@ -0,0 +1 @@
+# UK SME Import Margin Simulator - Benchmarks
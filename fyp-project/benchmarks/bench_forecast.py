@@ -0,0 +1,101 @@
+# bench_forecast.py
+# Equivalence check and benchmark for the batched forecast engine
+#
+# Usage (from fyp-project/):
+#     python -m benchmarks.bench_forecast --series 20000 --periods 20 --workers 4
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from scripts.forecast_engine import ES_ALPHAS, ES_BETAS, ParamCache, _holt, fit_holt, forecast_panel
+from scripts.trend_analysis import SeriesPanel
+
+
+def make_panel(n_series, n_periods, seed=0):
+    """Synthetic positive import values with trend, noise and some gaps."""
+    rng = np.random.default_rng(seed)
+    growth = rng.normal(0.03, 0.05, (n_series, 1))
+    noise = rng.normal(0, 0.15, (n_series, n_periods))
+    values = np.exp(rng.uniform(8, 18, (n_series, 1)) + growth * np.arange(n_periods) + noise)
+    values[rng.random(values.shape) < 0.05] = np.nan
+    keys = pd.DataFrame({"country_code": np.arange(n_series) // 100, "hs2_chapter": np.arange(n_series) % 100})
+    return SeriesPanel(keys, np.arange(2024 - n_periods + 1, 2025), values)
+
+
+def reference_sse(y, alpha, beta):
+    """Holt's recursion one series at a time, in plain Python."""
+    level = trend = 0.0
+    seen = 0
+    sse = 0.0
+    for x in y:
+        if np.isnan(x):
+            level += trend
+            continue
+        if seen == 0:
+            level, trend = x, 0.0
+        elif seen == 1:
+            level, trend = x, x - level
+        else:
+            error = x - (level + trend)
+            level, trend = level + trend + alpha * error, trend + alpha * beta * error
+            sse += error * error
+        seen += 1
+    return sse
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the forecast engine")
+    parser.add_argument("--series", type=int, default=20_000)
+    parser.add_argument("--periods", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--check", type=int, default=50, help="Series to check against the Python loop")
+    args = parser.parse_args()
+
+    panel = make_panel(args.series, args.periods)
+    print(f"Series: {args.series:,} x {args.periods} periods")
+
+    # Grid search against the per-series loop
+    y = np.log(panel.values[:args.check])
+    grid = [(a, b) for a in ES_ALPHAS for b in ES_BETAS]
+    expected = np.array([[reference_sse(row, a, b) for a, b in grid] for row in y])
+    alpha, beta = np.meshgrid(ES_ALPHAS, ES_BETAS, indexing="ij")
+    batched = _holt(y, alpha.reshape(1, -1), beta.reshape(1, -1))["sse"]
+    print(f"Holt SSE matches the Python loop (rtol 1e-9): {np.allclose(batched, expected, rtol=1e-9)}")
+    best = np.array(grid)[expected.argmin(axis=1)]
+    print(f"Selected parameters match: {np.allclose(np.column_stack(fit_holt(y)), best)}")
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "params.pkl")
+
+        cache = ParamCache(path)
+        (cold, _, _), cold_time = timed(forecast_panel, panel, workers=1, cache=cache, arima=False)
+        cache.save()
+        print(f"Cold fit, 1 worker: {cold_time:.2f}s")
+
+        (parallel, _, _), parallel_time = timed(
+            forecast_panel, panel, workers=args.workers, cache=ParamCache(path, enabled=False), arima=False
+        )
+        print(f"Cold fit, {args.workers} workers: {parallel_time:.2f}s")
+
+        cache = ParamCache(path)
+        (warm, _, _), warm_time = timed(forecast_panel, panel, workers=1, cache=cache, arima=False)
+        print(f"Cached parameters: {warm_time:.2f}s ({cache.hits:,} reused)")
+
+    columns = ["forecast", "lower", "upper"]
+    print(f"Parallel results identical: {parallel[columns].equals(cold[columns])}")
+    print(f"Cached results identical: {warm[columns].equals(cold[columns])}")
+
+
+if __name__ == "__main__":
+    main()
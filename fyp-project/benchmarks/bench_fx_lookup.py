@@ -0,0 +1,89 @@
+# bench_fx_lookup.py
+# Equivalence check and benchmark for the indexed FX lookups against pandas filtering
+#
+# Usage (from fyp-project/):
+#     python -m benchmarks.bench_fx_lookup --years 25 --lookups 2000
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from scripts.fx_rates import TRADING_DAYS, FxRates
+
+CURRENCIES = ["USD", "EUR", "JPY", "CNY", "CHF", "INR"]
+
+
+def make_rates(years, seed=0):
+    """Synthetic daily fixings on business days, with gaps like bank holidays."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end="2024-12-31", periods=years * 260)
+
+    frames = []
+    for currency in CURRENCIES:
+        rates = np.exp(np.cumsum(rng.normal(0, 0.006, len(dates)))) * rng.uniform(1, 200)
+        keep = rng.random(len(dates)) > 0.02
+        frames.append(pd.DataFrame({"currency": currency, "date": dates[keep], "rate": rates[keep]}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def make_queries(rates, n, seed=1):
+    rng = np.random.default_rng(seed)
+    lo, hi = rates["date"].min(), rates["date"].max()
+    span = (hi - lo).days
+    starts = lo + pd.to_timedelta(rng.integers(0, span - 400, n), unit="D")
+    ends = starts + pd.to_timedelta(rng.integers(1, 400, n), unit="D")
+    return list(zip(rng.choice(CURRENCIES, n), starts, ends))
+
+
+def pandas_lookup(rates, currency, start, end, window):
+    """The straightforward version: filter the long table for every request."""
+    series = rates[rates["currency"] == currency].set_index("date")["rate"].sort_index()
+    rate = series[:end].iloc[-1] if len(series[:end]) else np.nan
+    average = series[start:end].mean()
+    returns = np.log(series[:end]).diff().dropna().iloc[-window:]
+    volatility = returns.std() * np.sqrt(TRADING_DAYS) if len(returns) >= 2 else np.nan
+    return rate, average, volatility
+
+
+def indexed_lookup(fx, currency, start, end, window):
+    return (
+        fx.rate(currency, end),
+        fx.average(currency, start, end),
+        fx.volatility(currency, end, window),
+    )
+
+
+def timed(func, queries, *args):
+    start = time.perf_counter()
+    results = [func(*args, currency, s, e, 250) for currency, s, e in queries]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark indexed FX lookups")
+    parser.add_argument("--years", type=int, default=25)
+    parser.add_argument("--lookups", type=int, default=2_000)
+    args = parser.parse_args()
+
+    rates = make_rates(args.years)
+    queries = make_queries(rates, args.lookups)
+    print(f"Observations: {len(rates):,}  Lookups: {len(queries):,}")
+
+    start = time.perf_counter()
+    fx = FxRates(rates)
+    print(f"Index build: {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    new, new_time = timed(indexed_lookup, queries, fx)
+    old, old_time = timed(pandas_lookup, queries, rates)
+    print(f"Indexed: {new_time / len(queries) * 1e6:.1f}us per lookup (rate + average + volatility)")
+    print(f"Pandas filter: {old_time / len(queries) * 1e6:.1f}us per lookup")
+    print(f"Speed-up: {old_time / new_time:.0f}x")
+
+    matches = np.allclose(np.array(new, dtype=float), np.array(old, dtype=float), rtol=1e-9, equal_nan=True)
+    print(f"Results match (rtol 1e-9): {matches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# bench_hs2_mapping.py
+# Before/after benchmark for HS2/SITC derivation in prepare_hmrc / prepare_ons_commodity
+#
+# Usage (from fyp-project/):
+#     python -m benchmarks.bench_hs2_mapping --rows 10000000
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from scripts.hs_codes import (
+    HS2_TO_SITC,
+    SITC_NAMES,
+    country_codes_from_names,
+    extract_country_code_from_name,
+    extract_main_sitc_section,
+    get_hs2_chapter,
+    hs2_chapters,
+    hs2_chapters_from_codes,
+    main_sitc_sections,
+    sitc_names_for_sections,
+    sitc_sections_for_hs2,
+)
+
+
+# Shipment-file HS codes and their chapters: leading zeros count, and
+# odd-length codes (including integers) have lost one
+SHIPMENT_CODES = [
+    ("01012100", 1), ("0302", 3), ("0302.11", 3), (" 0901 ", 9), ("302", 3),
+    ("1012100", 1), ("85", 85), ("8", 8), ("8471300000", 84),
+    (302, 3), (1012100, 1), (85, 85), ("UNKNOWN", None), ("", None), (None, None),
+]
+
+
+def make_frames(n_rows, seed=0):
+    """Synthetic HMRC and ONS frames with realistic code shapes and some bad values."""
+    rng = np.random.default_rng(seed)
+    
+    hs8 = rng.integers(1_000_000, 99_999_999, size=5_000).astype(str)
+    pool = np.concatenate([np.char.zfill(hs8, 8), ["", "UNKNOWN"]])
+    commodity = pd.Series(rng.choice(pool, n_rows), dtype=object)
+    commodity[rng.random(n_rows) < 0.001] = None
+    
+    countries = ["AE United Arab Emirates", "DE Germany", "FR France", "CN China",
+                 "W1 World", "Total world", None]
+    sitc = ["01 Meat", "11 Beverages", "33 Petroleum", "71 Machinery", "84 Clothing",
+            "T Total", None]
+    ons = pd.DataFrame({
+        "country_name": rng.choice(np.array(countries, dtype=object), n_rows),
+        "sitc_name_raw": rng.choice(np.array(sitc, dtype=object), n_rows),
+    })
+    return commodity, ons
+
+
+def legacy(commodity, ons):
+    """The original .apply()-based derivation."""
+    hs2 = commodity.apply(get_hs2_chapter)
+    section = hs2.apply(lambda x: HS2_TO_SITC.get(x, None))
+    name = section.apply(lambda x: SITC_NAMES.get(x, None))
+    country = ons["country_name"].apply(extract_country_code_from_name)
+    ons_section = ons["sitc_name_raw"].apply(extract_main_sitc_section)
+    ons_name = ons_section.apply(lambda x: SITC_NAMES.get(x, None))
+    return hs2, section, name, country, ons_section, ons_name
+
+
+def vectorised(commodity, ons):
+    """The vectorised derivation now used by data_merge."""
+    hs2 = hs2_chapters(commodity)
+    section = sitc_sections_for_hs2(hs2)
+    name = sitc_names_for_sections(section)
+    country = country_codes_from_names(ons["country_name"])
+    ons_section = main_sitc_sections(ons["sitc_name_raw"])
+    ons_name = sitc_names_for_sections(ons_section)
+    return hs2, section, name, country, ons_section, ons_name
+
+
+def check_shipment_codes():
+    """hs2_chapters_from_codes() against SHIPMENT_CODES, one code at a time."""
+    ok = True
+    for code, chapter in SHIPMENT_CODES:
+        result = hs2_chapters_from_codes(pd.Series([code], dtype=object)).iloc[0]
+        ok &= (chapter is None and pd.isna(result)) or result == chapter
+    return ok
+
+
+def same_values(a, b):
+    """Compare two Series treating None/NaN as equal and ignoring int/float dtype."""
+    a = a.astype(object).where(a.notna(), None)
+    b = b.astype(object).where(b.notna(), None)
+    return a.tolist() == b.tolist()
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HS2/SITC derivation")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--skip-legacy", action="store_true", help="Time the vectorised path only")
+    args = parser.parse_args()
+    
+    print(f"Shipment codes with leading zeros: {check_shipment_codes()}")
+    
+    commodity, ons = make_frames(args.rows)
+    print(f"Rows: {args.rows:,}")
+    
+    new, new_time = timed(vectorised, commodity, ons)
+    print(f"Vectorised: {new_time:.2f}s")
+    
+    if args.skip_legacy:
+        return
+    
+    old, old_time = timed(legacy, commodity, ons)
+    print(f"Legacy .apply(): {old_time:.2f}s")
+    print(f"Speed-up: {old_time / new_time:.1f}x")
+    
+    matches = all(same_values(a, b) for a, b in zip(old, new))
+    print(f"Results identical: {matches}")
+
+
+if __name__ == "__main__":
+    main()
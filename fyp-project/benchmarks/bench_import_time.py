@@ -0,0 +1,116 @@
+# bench_import_time.py
+# Import-time budget check for the dashboard's scripts modules (python -X importtime)
+#
+# Usage (from fyp-project/):
+#     python -m benchmarks.bench_import_time                # exits 1 if over budget
+#     python -m benchmarks.bench_import_time --budget-ms 150 --app
+
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_FILE = os.path.join(PROJECT_ROOT, "app.py")
+
+# Imported by Streamlit itself, so they cost nothing extra in the dashboard
+BASELINE_IMPORTS = ["streamlit", "pandas", "numpy", "plotly.graph_objects"]
+
+# Must not be imported until a page actually needs them
+LAZY_MODULES = ["plotly.express", "statsmodels", "scipy", "sklearn"]
+
+# Extra import time (ms) the dashboard's own modules may add on top of the baseline
+DEFAULT_BUDGET_MS = 100.0
+
+
+def app_modules(app_file=APP_FILE):
+    """scripts.* modules imported at the top level of app.py, in order."""
+    with open(app_file) as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module and node.module.startswith("scripts."):
+            modules.append(node.module)
+        elif isinstance(node, ast.Import):
+            modules += [a.name for a in node.names if a.name.startswith("scripts.")]
+    return list(dict.fromkeys(modules))
+
+
+def import_times(modules):
+    """
+    Import the baseline, then modules, in a fresh interpreter with
+    -X importtime.
+
+    Returns: (dictionary of module -> cumulative ms for the top-level
+    modules, list of LAZY_MODULES that ended up imported)
+    """
+
+    code = "; ".join(f"import {m}" for m in BASELINE_IMPORTS + modules)
+    code += f"; import sys, json; print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Top-level imports are not indented; nested ones are
+        if name.startswith(" ") and not name.startswith("  "):
+            name = name.strip()
+            if name in modules:
+                times[name] = int(cumulative) / 1000
+    return times, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def app_cold_start():
+    """Seconds for a fresh interpreter to run app.py once headlessly (AppTest)."""
+    code = (
+        "from streamlit.testing.v1 import AppTest; "
+        f"AppTest.from_file({APP_FILE!r}, default_timeout=120).run()"
+    )
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the dashboard's import-time budget")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters to take the best of")
+    parser.add_argument("--app", action="store_true", help="Also time a cold headless run of app.py")
+    args = parser.parse_args()
+
+    modules = app_modules()
+    runs = [import_times(modules) for _ in range(args.repeat)]
+    best = {m: min(run[0].get(m, 0.0) for run in runs) for m in modules}
+    eager = sorted(set().union(*(run[1] for run in runs)))
+
+    print(f"Import time on top of {', '.join(BASELINE_IMPORTS)} (best of {args.repeat}):")
+    for module, ms in sorted(best.items(), key=lambda item: -item[1]):
+        print(f"  {module:<35} {ms:7.1f} ms")
+    total = sum(best.values())
+    print(f"  {'total':<35} {total:7.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    if args.app:
+        print(f"Cold headless run of app.py: {app_cold_start():.2f}s")
+
+    failed = False
+    if total > args.budget_ms:
+        print(f"\nOver budget by {total - args.budget_ms:.1f} ms")
+        failed = True
+    if eager:
+        print(f"\nImported at startup but should be lazy: {', '.join(eager)}")
+        failed = True
+    if not failed:
+        print("\nWithin budget")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# bench_margin_batch.py
+# Equivalence check and benchmark for compute_margin_batch against the scalar compute_margin
+#
+# Usage (from fyp-project/):
+#     python -m benchmarks.bench_margin_batch --rows 500000
+
+import argparse
+import time
+
+import numpy as np
+
+from scripts.margin_model import compute_margin, compute_margin_batch
+from scripts.scenario_runner import run_scenario_grid
+
+# Scalar inputs on and around the cap, the profit floor and zero revenue
+EDGE_CASES = [
+    (1000.0, 1200.0, 0.0, 0.0, 0.0, 0.0),
+    (100_000.0, 150_000.0, 0.05, 0.1, 0.01, 0.04),
+    (1000.0, 0.0, 0.0, 0.0, 0.0, 0.0),
+    (1000.0, -50.0, 0.1, 0.0, 0.0, 0.0),
+    (1000.0, 500.0, 1.5, 0.5, 0.0, 0.0),
+    (1000.0, 10.0, 0.0, 0.0, 0.0, 0.0),
+    (0.0, 100.0, 0.0, 0.0, 0.0, 0.0),
+    (0.125, 1.0, 0.0, 0.0, 0.0, 0.0),
+]
+
+
+def make_inputs(n_rows, seed=0):
+    """Random import values, revenues and cost drivers, including some zero revenues."""
+    rng = np.random.default_rng(seed)
+    revenue = rng.uniform(0, 2e6, n_rows).round(2)
+    revenue[rng.random(n_rows) < 0.01] = 0.0
+    return (
+        rng.uniform(1e3, 1e6, n_rows).round(2),
+        revenue,
+        rng.uniform(-0.2, 0.5, n_rows),
+        rng.uniform(0, 0.3, n_rows),
+        rng.uniform(0, 0.05, n_rows),
+        rng.uniform(0, 0.2, n_rows),
+    )
+
+
+def as_scalar(value):
+    """A batch result element as compute_margin() returns it (NaN margin -> None)."""
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def check_scalar_inputs():
+    """
+    Scalar (0-d) batch calls and grids with no axes against compute_margin(),
+    one edge case at a time.
+    """
+    ok = True
+    for case in EDGE_CASES:
+        expected = compute_margin(*case)
+        batch = {k: as_scalar(v) for k, v in compute_margin_batch(*case).items()}
+        ok &= batch == expected
+
+        import_value, revenue, fx, shipping, insurance, tariff = case
+        for as_frame in (True, False):
+            grid = run_scenario_grid(
+                import_value, revenue, {}, fx, shipping, insurance, tariff,
+                outputs=("profit", "margin_pct"), as_frame=as_frame,
+            )
+            point = grid.iloc[0] if as_frame else grid
+            ok &= all(as_scalar(point[k]) == expected[k] for k in ("profit", "margin_pct"))
+    return ok
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def scalar(*columns):
+    return [compute_margin(*row) for row in zip(*(c.tolist() for c in columns))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorised margin model")
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--skip-scalar", action="store_true", help="Time the vectorised path only")
+    args = parser.parse_args()
+
+    print(f"Scalar inputs and empty grids identical: {check_scalar_inputs()}")
+
+    columns = make_inputs(args.rows)
+    print(f"Rows: {args.rows:,}")
+
+    new, new_time = timed(compute_margin_batch, *columns)
+    print(f"Vectorised: {new_time:.3f}s")
+
+    if args.skip_scalar:
+        return
+
+    old, old_time = timed(scalar, *columns)
+    print(f"Scalar: {old_time:.2f}s")
+    print(f"Speed-up: {old_time / new_time:.1f}x")
+
+    matches = all(
+        [as_scalar(v) for v in new[key]] == [row[key] for row in old]
+        for key in new
+    )
+    print(f"Results identical: {matches}")
+
+
+if __name__ == "__main__":
+    main()
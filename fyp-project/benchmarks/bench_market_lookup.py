@@ -0,0 +1,89 @@
+# bench_market_lookup.py
+# Equivalence check and benchmark for indexed market benchmark lookups against raw HMRC groupbys
+#
+# Usage (from fyp-project/):
+#     python -m benchmarks.bench_market_lookup --rows 2000000 --lookups 200
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from scripts.market_intelligence import MarketBenchmarks, benchmark_table
+from scripts.trend_analysis import SeriesPanel
+
+COUNTRIES = [f"{a}{b}" for a in "ABCDEFGHIJKLMN" for b in "ABCDEFGHIJKLMN"][:150]
+
+
+def make_hmrc(n_rows, seed=0):
+    """Synthetic HMRC detail rows: country, HS2 chapter, year and value."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "country_code": rng.choice(COUNTRIES, n_rows),
+        "hs2_chapter": rng.integers(1, 98, n_rows),
+        "year": rng.integers(2015, 2025, n_rows),
+        "value": rng.lognormal(10, 2, n_rows),
+    })
+
+
+def groupby_lookup(hmrc, hs2, year, import_value):
+    """The straightforward version: aggregate the raw rows for every request."""
+    rows = hmrc[(hmrc["hs2_chapter"] == hs2) & (hmrc["year"] == year)]
+    suppliers = rows.groupby("country_code")["value"].sum().sort_values(ascending=False)
+    total = suppliers.sum()
+    return (
+        total,
+        suppliers.index[0],
+        import_value / total * 100,
+        (suppliers <= import_value).mean() * 100,
+    )
+
+
+def indexed_lookup(benchmarks, hs2, year, import_value):
+    market = benchmarks.market(hs2, year)
+    position = benchmarks.position(import_value, hs2, year)
+    return market["total_value"], market["top_country"], position["share_pct"], position["percentile"]
+
+
+def timed(func, queries, *args):
+    start = time.perf_counter()
+    results = [func(*args, *query) for query in queries]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark indexed market benchmark lookups")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    hmrc = make_hmrc(args.rows)
+    rng = np.random.default_rng(1)
+    queries = list(zip(
+        rng.integers(1, 98, args.lookups).tolist(),
+        rng.integers(2016, 2025, args.lookups).tolist(),
+        rng.lognormal(12, 2, args.lookups).tolist(),
+    ))
+    print(f"HMRC rows: {len(hmrc):,}  Lookups: {len(queries):,}")
+
+    start = time.perf_counter()
+    panel = SeriesPanel.from_long(hmrc, ["country_code", "hs2_chapter"], "year", "value")
+    benchmarks = MarketBenchmarks(benchmark_table(panel))
+    print(f"Precompute (pipeline time): {time.perf_counter() - start:.2f}s for {len(benchmarks):,} benchmark rows")
+
+    new, new_time = timed(indexed_lookup, queries, benchmarks)
+    old, old_time = timed(groupby_lookup, queries, hmrc)
+    print(f"Indexed: {new_time / len(queries) * 1e6:.0f}us per lookup (market + position)")
+    print(f"Groupby over raw rows: {old_time / len(queries) * 1e3:.1f}ms per lookup")
+    print(f"Speed-up: {old_time / new_time:.0f}x")
+
+    numbers_match = np.allclose(
+        np.array([(r[0], r[2], r[3]) for r in new]), np.array([(r[0], r[2], r[3]) for r in old]), rtol=1e-9
+    )
+    matches = numbers_match and [r[1] for r in new] == [r[1] for r in old]
+    print(f"Results match (rtol 1e-9): {matches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# bench_risk.py
+# Equivalence check and benchmark for the vectorised risk functions
+#
+# Usage (from fyp-project/):
+#     python -m benchmarks.bench_risk --rows 5000000
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from scripts.confidence_band import confidence_multiplier, confidence_multiplier_array
+from scripts.risk_adjuster import adjust_risk, adjust_risk_array
+from scripts.risk_label import risk_label, risk_label_array
+
+COVERAGE_VALUES = ["High coverage", "Partial coverage", "Low coverage", "No coverage", "Unknown", None]
+
+# Margins on and around every threshold, plus infinities
+EDGE_MARGINS = [None, -np.inf, -100.0, 0.0, 4.99, 4.999999, 5.0, 5.000001, 9.99, 10.0, 10.01, 100.0, np.inf]
+
+
+def make_inputs(n_rows, seed=0):
+    """Random margins (some missing) and coverage classes, plus every edge case."""
+    rng = np.random.default_rng(seed)
+
+    margins = rng.normal(8, 10, n_rows).round(2).astype(object)
+    margins[rng.random(n_rows) < 0.01] = None
+    margins = np.concatenate([np.array(EDGE_MARGINS, dtype=object), margins])
+
+    coverage = rng.choice(np.array(COVERAGE_VALUES, dtype=object), len(margins))
+    return margins, coverage
+
+
+def scalar(margins, coverage):
+    """The original per-element functions."""
+    risk = [risk_label(m) for m in margins]
+    adjusted = [adjust_risk(r, c) for r, c in zip(risk, coverage)]
+    multiplier = [confidence_multiplier(c) for c in coverage]
+    return risk, adjusted, multiplier
+
+
+def vectorised(margins, coverage):
+    """The array versions, on NaN-for-None float margins and categorical coverage."""
+    risk = risk_label_array(margins)
+    adjusted = adjust_risk_array(risk, coverage)
+    multiplier = confidence_multiplier_array(coverage)
+    return risk, adjusted, multiplier
+
+
+def as_list(values):
+    """Array results as a list, with missing values as None (as the scalar functions return)."""
+    return [None if pd.isna(v) else v for v in values]
+
+
+def check_exhaustive():
+    """Every (margin, risk, coverage) combination against the scalar functions."""
+    risks = ["HIGH", "MODERATE", "LOW", "OTHER", None]
+    pairs = [(r, c) for r in risks for c in COVERAGE_VALUES]
+
+    ok = as_list(risk_label_array(EDGE_MARGINS)) == [risk_label(m) for m in EDGE_MARGINS]
+    ok &= as_list(adjust_risk_array([r for r, _ in pairs], [c for _, c in pairs])) == [
+        adjust_risk(r, c) for r, c in pairs
+    ]
+    ok &= as_list(confidence_multiplier_array(COVERAGE_VALUES)) == [
+        confidence_multiplier(c) for c in COVERAGE_VALUES
+    ]
+    return ok
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorised risk classification")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--skip-scalar", action="store_true", help="Time the vectorised path only")
+    args = parser.parse_args()
+
+    print(f"Edge cases identical: {check_exhaustive()}")
+
+    margins, coverage = make_inputs(args.rows)
+    print(f"Rows: {len(margins):,}")
+
+    # Array-native inputs, as produced by compute_margin_batch() and the storage schemas
+    margin_array = np.asarray(margins, dtype=np.float64)
+    coverage_categorical = pd.Categorical(coverage)
+
+    new, new_time = timed(vectorised, margin_array, coverage_categorical)
+    print(f"Vectorised: {new_time:.2f}s")
+
+    if args.skip_scalar:
+        return
+
+    old, old_time = timed(scalar, margins, coverage)
+    print(f"Scalar: {old_time:.2f}s")
+    print(f"Speed-up: {old_time / new_time:.1f}x")
+
+    matches = all(as_list(a) == as_list(b) for a, b in zip(old, new))
+    print(f"Results identical: {matches}")
+
+
+if __name__ == "__main__":
+    main()
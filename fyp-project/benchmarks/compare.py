@@ -0,0 +1,82 @@
+# compare.py
+# Compare two benchmark result files and fail on regressions
+#
+# Usage (from fyp-project/):
+#     python -m benchmarks.compare benchmarks/baselines/quick.json results.json --threshold 0.25
+
+import argparse
+import json
+import sys
+
+import pandas as pd
+
+DEFAULT_THRESHOLD = 0.25
+
+# Differences smaller than this (seconds) are timer noise, whatever the ratio
+MIN_DELTA = 0.001
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD, min_delta=MIN_DELTA):
+    """
+    Compare the best times of two result sets.
+
+    A benchmark regresses when it is more than threshold slower (e.g. 0.25 =
+    25%) and slower by at least min_delta seconds.
+
+    Parameters:
+        baseline, current: Result dictionaries as written by benchmarks.suite
+
+    Returns: (DataFrame with one row per benchmark, list of regressed names)
+    """
+
+    old, new = baseline["results"], current["results"]
+    rows = []
+    for name in sorted(set(old) | set(new)):
+        before = old.get(name, {}).get("min")
+        after = new.get(name, {}).get("min")
+        if before is None or after is None:
+            status, ratio = ("new" if before is None else "missing"), None
+        else:
+            ratio = after / before if before > 0 else float("inf")
+            if ratio > 1 + threshold and after - before >= min_delta:
+                status = "REGRESSED"
+            elif ratio < 1 / (1 + threshold) and before - after >= min_delta:
+                status = "improved"
+            else:
+                status = "ok"
+        rows.append({"benchmark": name, "baseline_s": before, "current_s": after, "ratio": ratio, "status": status})
+
+    table = pd.DataFrame(rows, columns=["benchmark", "baseline_s", "current_s", "ratio", "status"])
+    return table, table.loc[table["status"] == "REGRESSED", "benchmark"].tolist()
+
+
+def report(table, regressed, threshold=DEFAULT_THRESHOLD):
+    """Print the comparison and return the process exit code (1 on regression)."""
+
+    with pd.option_context("display.float_format", "{:.4g}".format, "display.width", 120):
+        print(table.to_string(index=False))
+    if regressed:
+        print(f"\n{len(regressed)} benchmark(s) regressed by more than {threshold:.0%}: {', '.join(regressed)}")
+        return 1
+    print(f"\nNo regressions beyond {threshold:.0%}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare benchmark results against a baseline")
+    parser.add_argument("baseline", help="Baseline results (JSON)")
+    parser.add_argument("current", help="New results (JSON)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    table, regressed = compare(load_results(args.baseline), load_results(args.current), args.threshold)
+    sys.exit(report(table, regressed, args.threshold))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+# suite.py
+# Benchmark suite over the margin model, scenario grids, data_merge stages, coverage and the dashboard
+#
+# Usage (from fyp-project/):
+#     python -m benchmarks.suite                                    # quick profile, print results
+#     python -m benchmarks.suite --save benchmarks/baselines/quick.json
+#     python -m benchmarks.suite --compare benchmarks/baselines/quick.json --threshold 0.25
+#     python -m benchmarks.suite --profile full --filter data_merge
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import runpy
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import synthetic
+from benchmarks.compare import DEFAULT_THRESHOLD, compare, load_results, report
+from scripts import data_merge
+from scripts.coverage import compute_coverage
+from scripts.margin_model import compute_margin, compute_margin_batch
+from scripts.scenario_runner import run_sensitivity_scenarios
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_FILE = os.path.join(PROJECT_ROOT, "app.py")
+
+# Row counts per profile; "full" covers the 1e4-1e7 range of the real extracts
+PROFILES = {
+    "quick": {"rows": (10_000, 100_000), "steps": (11, 51, 201), "calls": (1_000,)},
+    "full": {"rows": (10_000, 100_000, 1_000_000, 10_000_000), "steps": (11, 51, 201, 501), "calls": (1_000, 10_000)},
+}
+
+# Target time per sample; fast cases are looped until one sample takes this long
+MIN_SAMPLE_TIME = 0.2
+
+CASES = {}
+
+
+def case(name, sizes=None):
+    """
+    Register a benchmark. The decorated function takes a size (or None) and
+    does its setup, then returns the zero-argument callable to time.
+
+    Parameters:
+        name: Benchmark name, e.g. "data_merge.prepare_hmrc"
+        sizes: Key into the profile ("rows", "steps", "calls") or None for a single run
+    """
+
+    def register(func):
+        CASES[name] = (sizes, func)
+        return func
+
+    return register
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the pipeline's progress output while timing it."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+@contextlib.contextmanager
+def chdir(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def measure(func, repeat):
+    """
+    Time func like timeit.Timer.autorange(): loop fast calls so each sample
+    takes at least MIN_SAMPLE_TIME, then keep the best and median of repeat
+    samples (seconds per call).
+    """
+
+    start = time.perf_counter()
+    func()
+    first = time.perf_counter() - start
+    loops = max(1, int(MIN_SAMPLE_TIME / first)) if first > 0 else 1
+
+    # The warm-up counts as a sample for slow cases, which we cannot afford to rerun often
+    samples = [first] if loops == 1 else []
+    while len(samples) < repeat:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - start) / loops)
+
+    return {"min": min(samples), "median": statistics.median(samples), "loops": loops, "repeat": len(samples)}
+
+
+# ---------------------------------------------------------------- cases
+
+
+@case("margin.compute_margin", "calls")
+def bench_compute_margin(n):
+    rng = np.random.default_rng(0)
+    inputs = list(zip(rng.uniform(1e3, 1e6, n).tolist(), rng.uniform(1e3, 2e6, n).tolist(), rng.uniform(-0.2, 0.2, n).tolist()))
+    return lambda: [compute_margin(v, r, fx, 0.1, 0.01, 0.04) for v, r, fx in inputs]
+
+
+@case("margin.compute_margin_batch", "rows")
+def bench_compute_margin_batch(n):
+    rng = np.random.default_rng(0)
+    value, revenue, fx = rng.uniform(1e3, 1e6, n), rng.uniform(1e3, 2e6, n), rng.uniform(-0.2, 0.2, n)
+    return lambda: compute_margin_batch(value, revenue, fx, 0.1, 0.01, 0.04)
+
+
+@case("scenario.run_sensitivity_scenarios", "steps")
+def bench_sensitivity(steps):
+    return lambda: run_sensitivity_scenarios(100_000, 150_000, steps=steps, tariff_pct=0.04, insurance_pct=0.01)
+
+
+@case("data_merge.prepare_hmrc", "rows")
+def bench_prepare_hmrc(n):
+    hmrc = synthetic.hmrc_frame(n)
+    return lambda: data_merge.prepare_hmrc(hmrc, verbose=False)
+
+
+@case("data_merge.aggregate_hmrc_country_year", "rows")
+def bench_aggregate_hmrc(n):
+    with quiet():
+        hmrc = data_merge.prepare_hmrc(synthetic.hmrc_frame(n), verbose=False)
+    return lambda: data_merge.aggregate_hmrc_country_year(hmrc)
+
+
+@case("data_merge.load_hmrc_country_year", "rows")
+def bench_load_hmrc(n):
+    path = synthetic.write_dataset(f"load-{n}", n)["hmrc"]
+
+    def run():
+        with quiet():
+            data_merge.load_hmrc_country_year(path, chunksize=max(n // 4, 1))
+
+    return run
+
+
+@case("data_merge.merge_totals", "rows")
+def bench_merge_totals(n):
+    """The merge_totals stage: country-year aggregation, then the join to ONS totals."""
+    with quiet():
+        hmrc = data_merge.prepare_hmrc(synthetic.hmrc_frame(n), verbose=False)
+    ons_totals = synthetic.ons_totals_frame()
+
+    def run():
+        with quiet():
+            hmrc_agg = data_merge.aggregate_hmrc_country_year(hmrc)
+            data_merge.merge_country_year_totals(hmrc_agg, ons_totals, formats=("csv",))
+
+    return run
+
+
+@case("data_merge.prepare_ons_commodity", "rows")
+def bench_prepare_ons_commodity(n):
+    ons_commodity = synthetic.ons_commodity_frame(n)
+
+    def run():
+        # prepare_ons_commodity() adds columns in place, so give it a fresh frame
+        with quiet():
+            data_merge.prepare_ons_commodity(ons_commodity.copy())
+
+    return run
+
+
+@case("data_merge.compute_ons_coverage_by_sitc", "rows")
+def bench_sitc_coverage(n):
+    with quiet():
+        ons_commodity = data_merge.prepare_ons_commodity(synthetic.ons_commodity_frame(n))
+
+    def run():
+        with quiet():
+            data_merge.compute_ons_coverage_by_sitc(ons_commodity)
+
+    return run
+
+
+@case("data_merge.create_hs2_coverage_from_sitc")
+def bench_hs2_coverage(_):
+    with quiet():
+        ons_commodity = data_merge.prepare_ons_commodity(synthetic.ons_commodity_frame(10_000))
+        sitc_coverage, total_years = data_merge.compute_ons_coverage_by_sitc(ons_commodity)
+
+    def run():
+        with quiet():
+            data_merge.create_hs2_coverage_from_sitc(sitc_coverage, total_years)
+
+    return run
+
+
+@case("data_merge.pipeline", "rows")
+def bench_pipeline(n):
+    """Every stage end to end from the CSV inputs, without the stage cache."""
+    root = os.path.abspath(f"pipeline-{n}")
+    synthetic.write_dataset(root, n)
+
+    def run():
+        with chdir(root), quiet():
+            data_merge.main(["--no-cache", "--format", "csv"])
+
+    return run
+
+
+@case("coverage.compute_coverage", "rows")
+def bench_coverage(n):
+    totals, commodity = synthetic.merged_totals_frame(n), synthetic.merged_commodity_frame(n)
+    return lambda: compute_coverage(totals, commodity)
+
+
+@case("coverage.classify_ons_coverage_by_commodity", "rows")
+def bench_classify(n):
+    """The classification script as run from the command line, on n commodity rows."""
+    root = os.path.abspath(f"classify-{n}")
+    os.makedirs(os.path.join(root, data_merge.OUTPUT_FOLDER), exist_ok=True)
+    rng = np.random.default_rng(0)
+    pd.DataFrame({
+        "commodity": np.arange(n),
+        "ons_coverage_pct": rng.choice([0.0, 20.0, 50.0, 100.0], n) + rng.uniform(0, 1, n).round(1),
+    }).to_csv(os.path.join(root, "data/output/ons_coverage_by_commodity_aggregated.csv"), index=False)
+
+    def run():
+        # The module does its work at import time, so run it fresh each call
+        with chdir(root), quiet():
+            runpy.run_module("scripts.classify_ons_coverage_by_commodity", run_name="__main__")
+
+    return run
+
+
+@case("app.rerun")
+def bench_app_rerun(_):
+    """Headless rerun of the dashboard (a widget interaction) against pipeline outputs."""
+    from streamlit.logger import set_log_level
+    from streamlit.testing.v1 import AppTest
+    root = os.path.abspath("app")
+    synthetic.write_dataset(root, 100_000)
+    with chdir(root), quiet():
+        data_merge.main(["--no-cache", "--format", "csv"])
+        app = AppTest.from_file(APP_FILE, default_timeout=120).run()
+    if app.exception:
+        raise RuntimeError(f"app.py raised: {app.exception[0].message}")
+    # Deprecation notices are logged on every rerun and would drown the progress
+    # lines (AppTest resets the level from config on its first run)
+    set_log_level("error")
+
+    def run():
+        with chdir(root):
+            app.run()
+
+    return run
+
+
+# ---------------------------------------------------------------- runner
+
+
+def selected_cases(profile, pattern=None):
+    """Yield (benchmark name, case name, size) for the profile, optionally filtered by substring."""
+    for name, (sizes, _) in CASES.items():
+        if pattern and pattern not in name:
+            continue
+        for size in (PROFILES[profile][sizes] if sizes else (None,)):
+            yield (name if size is None else f"{name}[{size}]"), name, size
+
+
+def run_suite(profile="quick", pattern=None, repeat=7):
+    """
+    Run the selected benchmarks in a scratch folder (stages write their
+    outputs relative to the working directory).
+
+    Returns: Result dictionary with meta and results, as saved by --save
+    """
+
+    results = {}
+    # Stage modules import scripts.* lazily; keep the project importable after chdir
+    sys.path.insert(0, PROJECT_ROOT)
+    with tempfile.TemporaryDirectory(prefix="fyp-bench-") as scratch, chdir(scratch):
+        os.makedirs(data_merge.OUTPUT_FOLDER, exist_ok=True)
+        for label, name, size in selected_cases(profile, pattern):
+            print(f"  {label} ...", end=" ", file=sys.stderr, flush=True)
+            func = CASES[name][1](size)
+            results[label] = measure(func, repeat)
+            print(f"{results[label]['min']:.4g}s", file=sys.stderr)
+
+    return {
+        "meta": {
+            "profile": profile,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=7, help="Samples per benchmark")
+    parser.add_argument("--save", help="Write results to this JSON file (e.g. a new baseline)")
+    parser.add_argument("--compare", help="Baseline JSON to check against; exits 1 on regression")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    results = run_suite(args.profile, args.filter, args.repeat)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Saved {len(results['results'])} results to {args.save}")
+
+    if args.compare:
+        baseline = load_results(args.compare)
+        if args.filter:
+            baseline["results"] = {k: v for k, v in baseline["results"].items() if args.filter in k}
+        table, regressed = compare(baseline, results, args.threshold)
+        sys.exit(report(table, regressed, args.threshold))
+
+    for label, result in results["results"].items():
+        print(f"{label:<50} min {result['min']:.4g}s  median {result['median']:.4g}s  ({result['loops']} loops x {result['repeat']})")
+
+
+if __name__ == "__main__":
+    main()
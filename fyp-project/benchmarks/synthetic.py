@@ -0,0 +1,158 @@
+# synthetic.py
+# Synthetic HMRC and ONS inputs with the real column layouts, for benchmarks
+#
+# Usage (from fyp-project/):
+#     python -m benchmarks.synthetic /tmp/bench-data --rows 1000000
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from scripts.data_merge import HMRC_FILE, ONS_COMMODITY_FILE, ONS_TOTALS_FILE
+from scripts.storage import HMRC_SCHEMA, ONS_COMMODITY_SCHEMA, ONS_TOTALS_SCHEMA, apply_schema
+
+COUNTRIES = {
+    "CN": "China", "DE": "Germany", "US": "United States", "FR": "France", "NL": "Netherlands",
+    "IT": "Italy", "JP": "Japan", "TR": "Turkey", "IN": "India", "BE": "Belgium",
+    "ES": "Spain", "IE": "Ireland", "PL": "Poland", "VN": "Vietnam", "KR": "South Korea",
+    "CH": "Switzerland", "NO": "Norway", "SE": "Sweden", "CA": "Canada", "AE": "United Arab Emirates",
+}
+
+# Codes prepare_hmrc() drops, so the cleaning path does real work
+BAD_COUNTRY_CODES = ["ZZ", "XX", "YY"]
+
+# ONS commodity labels as exported (SITC divisions and sections, plus the total row)
+ONS_COMMODITIES = [
+    "01 Meat", "0 Food & live animals", "2 Crude", "33 Petroleum", "5 Chemicals",
+    "71 Machinery", "7 Machinery & transport equipment", "8 Miscellaneous manufactures", "T Total",
+]
+
+YEARS = np.arange(2015, 2025)
+
+
+def hmrc_frame(n_rows, seed=0):
+    """
+    HMRC detail rows: partner_country, commodity (HS2 to HS8 codes), year, value.
+
+    About 1% of rows carry an invalid country code and 0.5% an unparseable
+    commodity, as in the real extracts.
+    """
+
+    rng = np.random.default_rng(seed)
+    countries = np.array(list(COUNTRIES) + BAD_COUNTRY_CODES)
+    weights = np.r_[np.full(len(COUNTRIES), 0.99 / len(COUNTRIES)), np.full(len(BAD_COUNTRY_CODES), 0.01 / 3)]
+
+    chapters = rng.integers(1, 98, n_rows)
+    digits = rng.choice([0, 2, 4, 6], n_rows, p=[0.2, 0.3, 0.3, 0.2])
+    commodity = (chapters * 10 ** digits + rng.integers(0, 10 ** digits)).astype(str)
+    commodity[rng.random(n_rows) < 0.005] = "UNKNOWN"
+
+    df = pd.DataFrame({
+        "partner_country": rng.choice(countries, n_rows, p=weights),
+        "commodity": commodity,
+        "year": rng.choice(YEARS, n_rows),
+        "value": rng.lognormal(10, 2, n_rows).round(0),
+    })
+    return apply_schema(df, HMRC_SCHEMA)
+
+
+def ons_totals_frame(n_rows=None, seed=0):
+    """ONS country totals: country_code, country_name, year, import_value_million_gbp."""
+
+    rng = np.random.default_rng(seed)
+    codes = np.repeat(list(COUNTRIES), len(YEARS))
+    df = pd.DataFrame({
+        "country_code": codes,
+        "country_name": [COUNTRIES[c] for c in codes],
+        "year": np.tile(YEARS, len(COUNTRIES)),
+        "import_value_million_gbp": rng.uniform(100, 5_000, len(codes)).round(0),
+    })
+    if n_rows is not None:
+        df = df.iloc[rng.integers(0, len(df), n_rows)].reset_index(drop=True)
+    return apply_schema(df, ONS_TOTALS_SCHEMA)
+
+
+def ons_commodity_frame(n_rows, seed=0):
+    """
+    ONS country-by-commodity rows: country_name ("FR France"), commodity
+    (SITC label), year, import_value_million_gbp. Some values are missing
+    and some country names carry no code, as in the real file.
+    """
+
+    rng = np.random.default_rng(seed)
+    names = np.array([f"{code} {name}" for code, name in COUNTRIES.items()] + ["Unknown region"])
+    values = rng.uniform(0, 500, n_rows).round(0)
+    values[rng.random(n_rows) < 0.1] = np.nan
+
+    df = pd.DataFrame({
+        "country_name": rng.choice(names, n_rows),
+        "commodity": rng.choice(ONS_COMMODITIES, n_rows),
+        "year": rng.choice(YEARS, n_rows),
+        "import_value_million_gbp": values,
+    })
+    return apply_schema(df, ONS_COMMODITY_SCHEMA)
+
+
+def merged_totals_frame(n_rows, seed=0):
+    """Merged HMRC/ONS country-year rows as read by coverage.compute_coverage()."""
+
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(100, 5_000, n_rows)
+    values[rng.random(n_rows) < 0.3] = np.nan
+    return pd.DataFrame({
+        "country_code": rng.choice(list(COUNTRIES) + ["TW", "MX", "BR"], n_rows),
+        "year": rng.choice(YEARS, n_rows).astype(np.int16),
+        "import_value_million_gbp": values,
+    })
+
+
+def merged_commodity_frame(n_rows, seed=0):
+    """Merged HMRC/ONS commodity rows (commodity_x, as left by the merge)."""
+
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(0, 500, n_rows)
+    values[rng.random(n_rows) < 0.4] = np.nan
+    return pd.DataFrame({
+        "commodity_x": rng.integers(1, 98, n_rows),
+        "year": rng.choice(YEARS, n_rows).astype(np.int16),
+        "import_value_million_gbp": values,
+    })
+
+
+def write_dataset(root, hmrc_rows, ons_rows=2_000, seed=0):
+    """
+    Write a complete set of processed inputs under root (data/processed/...),
+    so data_merge and the dashboard can run against it with root as cwd.
+
+    Returns: Dictionary of input name -> path
+    """
+
+    paths = {
+        "hmrc": os.path.join(root, HMRC_FILE),
+        "ons_totals": os.path.join(root, ONS_TOTALS_FILE),
+        "ons_commodity": os.path.join(root, ONS_COMMODITY_FILE),
+    }
+    os.makedirs(os.path.dirname(paths["hmrc"]), exist_ok=True)
+    os.makedirs(os.path.join(root, "data", "output"), exist_ok=True)
+    hmrc_frame(hmrc_rows, seed).to_csv(paths["hmrc"], index=False)
+    ons_totals_frame(seed=seed).to_csv(paths["ons_totals"], index=False)
+    ons_commodity_frame(ons_rows, seed).to_csv(paths["ons_commodity"], index=False)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic HMRC/ONS inputs")
+    parser.add_argument("root", help="Folder to write data/processed/ under")
+    parser.add_argument("--rows", type=int, default=100_000, help="HMRC rows")
+    parser.add_argument("--ons-rows", type=int, default=2_000, help="ONS commodity rows")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for name, path in write_dataset(args.root, args.rows, args.ons_rows, args.seed).items():
+        print(f"{name}: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,19 +5,38 @@
 Core Modules:
 - margin_model: Landed-cost and profit margin calculations
 - scenario_runner: Sensitivity analysis
+- scenario_cache: LRU/TTL cache for scenario grids shared across sessions
 - risk_label: Financial risk classification
 - risk_adjuster: Data quality risk adjustment
 - confidence_band: Uncertainty multipliers
+- categories: int8 codes and Categorical dtypes for coverage classes and risk levels
+- pricing: Batch pricing with risk levels and confidence bands
+- monte_carlo: Correlated Monte Carlo margin simulation (VaR/CVaR)
+- quantile_sketch: Mergeable streaming quantile sketch
+- parallel_executor: Process-pool execution with shared-memory buffers
 
 Advanced Analytics Modules (v2.0):
 - trend_analysis: Historical trends, volatility, seasonality
-- forecast_engine: ARIMA forecasting, anomaly detection
+- forecast_engine: ARIMA / exponential smoothing forecasts, anomaly detection
 - advanced_risk_metrics: VaR, correlation, stress testing
 - market_intelligence: Benchmarking, alerts, market outlook
 
 Data Processing:
 - data_merge: HMRC/ONS data harmonisation
+- hs_codes: HS2/SITC mappings and vectorised code helpers
+- hmrc: HMRC extract loading and cleaning (shared by data_merge and trend_analysis)
 - classify_ons_coverage_by_commodity: Coverage classification
+- coverage: ONS coverage by year, country and commodity (single pass)
+- batch_price: Streamed pricing of whole import books (CLI)
+- commodity_index: Precomputed HS2 lookups for the dashboard
+- dashboard_figures: Plotly figure and table builders for the dashboard
+- dashboard_style: Static CSS and badge tables for the dashboard
+- hs2_descriptions: HS2 chapter descriptions
+- storage: Parquet/Arrow/CSV table storage with typed schemas
+- pipeline_cache: Content-hashed caching of pipeline stages
+- stage_metrics: Per-stage timing, memory and row-count records (JSON lines)
+- fx_rates: Bank of England FX ingestion and indexed rate lookups
+- fx_distributions: Empirical FX shock distributions for scenarios and Monte Carlo
 """
 
 __version__ = "2.0.0"
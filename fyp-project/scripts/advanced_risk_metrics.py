@@ -0,0 +1,447 @@
+# advanced_risk_metrics.py
+# Portfolio VaR/CVaR, import-growth correlation and stress tests across trade lanes
+#
+# Usage: python -m scripts.advanced_risk_metrics portfolio.csv [--level 0.95] [--no-cache]
+
+import argparse
+import hashlib
+import os
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+from scripts import trend_analysis
+from scripts.batch_price import HS_CODE_COLUMNS
+from scripts.hmrc import HMRC_FILE
+from scripts.hs_codes import hs2_chapters_from_codes
+from scripts.margin_model import compute_margin_batch
+from scripts.pipeline_cache import CACHE_FOLDER, StageCache, code_version
+from scripts.pricing import COST_DRIVERS
+from scripts.storage import DEFAULT_FORMATS, read_table, resolve_path, write_outputs
+from scripts.trend_analysis import hmrc_panel, log_changes
+
+OUTPUT_FILES = {
+    "summary": "data/output/portfolio_risk.csv",
+    "stress": "data/output/portfolio_stress.csv",
+    "correlation": "data/output/growth_correlation.csv",
+}
+
+# Accepted names for the supplier country column, in order of preference
+COUNTRY_COLUMNS = ("country_code", "partner_country", "country")
+
+DEFAULT_LEVEL = 0.95
+
+# Pairs of series with fewer overlapping growth observations get zero correlation
+MIN_OVERLAP = 3
+
+# Stress scenarios: shocks added to each lane's cost drivers, plus
+# import_growth, a change in import values (decimal, e.g. 0.2 = +20%)
+STRESS_SCENARIOS = {
+    "GBP -10%": {"fx_shock_pct": 0.10},
+    "GBP -20%": {"fx_shock_pct": 0.20},
+    "Shipping +5pts": {"shipping_pct": 0.05},
+    "Tariffs +10pts": {"tariff_pct": 0.10},
+    "Import costs +20%": {"import_growth": 0.20},
+    "Combined": {"fx_shock_pct": 0.10, "shipping_pct": 0.03, "tariff_pct": 0.05, "import_growth": 0.10},
+}
+
+
+# Covariance
+
+def growth_covariance(growth, min_overlap=MIN_OVERLAP, shrink=True, clip=True):
+    """
+    Covariance and correlation of growth rates across many series.
+
+    Pairs are computed over the periods both series observe (pairwise
+    complete, like DataFrame.cov/corr), but as a handful of matrix products
+    over the whole panel rather than a loop over pairs. With shrink, the
+    correlations are pulled towards zero by the Schäfer-Strimmer intensity,
+    which grows as histories get shorter and noisier; the covariance is the
+    shrunk correlation scaled by each series' own standard deviation.
+    Pairwise estimates need not form a valid correlation matrix, so
+    negative eigenvalues are clipped to zero before scaling.
+
+    Parameters:
+        growth: (n_series, n_periods) growth rates with NaN gaps
+        min_overlap: Pairs observed together fewer times get zero correlation
+        shrink: Apply correlation shrinkage
+        clip: Clip to a positive semi-definite matrix
+
+    Returns: Dictionary with mean, std (n_series,), correlation, covariance
+    (n_series, n_series), shrinkage (intensity used) and overlap (pair
+    observation counts)
+    """
+
+    x = np.asarray(growth, dtype=np.float64)
+    mask = (~np.isnan(x)).astype(np.float64)
+    x0 = np.where(mask > 0, x, 0.0)
+
+    overlap = mask @ mask.T
+    sums = x0 @ mask.T          # sums[i, j]: sum of series i where j is also observed
+    squares = (x0 * x0) @ mask.T
+    products = x0 @ x0.T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = (products - sums * sums.T / overlap) / (overlap - 1)
+        var = (squares - sums * sums / overlap) / (overlap - 1)
+        corr = cov / np.sqrt(var * var.T)
+
+    valid = (overlap >= min_overlap) & np.isfinite(corr)
+    corr = np.clip(np.where(valid, corr, 0.0), -1.0, 1.0)
+
+    count = mask.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = x0.sum(axis=1) / count
+        std = np.sqrt((x0 * x0).sum(axis=1) / count - mean * mean) * np.sqrt(count / (count - 1))
+    std = np.where(count >= 2, np.nan_to_num(std), 0.0)
+
+    shrinkage = 0.0
+    if shrink and len(x) > 1:
+        shrinkage = _shrinkage(x0, mask, mean, std, overlap, corr, valid)
+        corr = corr * (1 - shrinkage)
+    np.fill_diagonal(corr, 1.0)
+    if clip:
+        corr = _positive_semidefinite(corr)
+    corr[std == 0] = 0.0
+    corr[:, std == 0] = 0.0
+
+    return {
+        "mean": np.nan_to_num(mean),
+        "std": std,
+        "correlation": corr,
+        "covariance": corr * std[:, None] * std[None, :],
+        "shrinkage": shrinkage,
+        "overlap": overlap.astype(np.int64),
+    }
+
+
+def _shrinkage(x0, mask, mean, std, overlap, corr, valid):
+    """
+    Schäfer-Strimmer shrinkage intensity towards the identity correlation:
+    sum of estimated Var(r_ij) over sum of r_ij^2, for off-diagonal pairs.
+    """
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where(mask > 0, (x0 - mean[:, None]) / std[:, None], 0.0)
+    z = np.nan_to_num(z, posinf=0.0, neginf=0.0)
+
+    # w_kij = z_ki * z_kj; Var(r_ij) ~ n / (n - 1)^3 * sum_k (w_kij - mean_k w_kij)^2
+    w_sum = z @ z.T
+    w_sq = (z * z) @ (z * z).T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var_r = overlap / (overlap - 1) ** 3 * (w_sq - w_sum * w_sum / overlap)
+
+    off = valid & ~np.eye(len(corr), dtype=bool)
+    denominator = (corr[off] ** 2).sum()
+    if denominator <= 0:
+        return 1.0
+    return float(np.clip(np.nan_to_num(var_r[off]).sum() / denominator, 0.0, 1.0))
+
+
+def _positive_semidefinite(corr):
+    """Clip negative eigenvalues of a correlation matrix and restore the unit diagonal."""
+
+    eigenvalues, vectors = np.linalg.eigh(corr)
+    if eigenvalues.min() >= 0:
+        return corr
+    fixed = (vectors * np.maximum(eigenvalues, 0.0)) @ vectors.T
+    scale = np.sqrt(np.diag(fixed))
+    scale[scale == 0] = 1.0
+    fixed = fixed / scale[:, None] / scale[None, :]
+    np.fill_diagonal(fixed, 1.0)
+    return fixed
+
+
+# VaR and CVaR
+
+def historical_var(losses, level=DEFAULT_LEVEL):
+    """
+    VaR and CVaR from a sample of losses (positive = loss).
+
+    VaR is the level quantile of the losses; CVaR the mean of the losses
+    at or beyond it.
+
+    Returns: (var, cvar)
+    """
+
+    losses = np.asarray(losses, dtype=np.float64)
+    losses = losses[~np.isnan(losses)]
+    if len(losses) == 0:
+        return np.nan, np.nan
+    var = float(np.quantile(losses, level))
+    return var, float(losses[losses >= var].mean())
+
+
+def parametric_var(mean_loss, sd, level=DEFAULT_LEVEL):
+    """
+    VaR and CVaR of a normally distributed loss.
+
+    Returns: (var, cvar)
+    """
+
+    z = NormalDist().inv_cdf(level)
+    tail = NormalDist().pdf(z) / (1 - level)
+    return mean_loss + z * sd, mean_loss + tail * sd
+
+
+# Portfolio
+
+def _first_column(df, names):
+    return next((c for c in names if c in df.columns), None)
+
+
+def portfolio_lanes(portfolio, panel):
+    """
+    Match portfolio rows (lanes) to country x HS2 series in a panel.
+
+    Parameters:
+        portfolio: DataFrame with import_value_gbp, revenue_gbp, an HS code
+                   column (HS_CODE_COLUMNS; leading zeros count, see
+                   hs2_chapters_from_codes), a country column
+                   (COUNTRY_COLUMNS) and optional cost driver columns
+        panel: SeriesPanel keyed by country_code and hs2_chapter
+
+    Returns: portfolio with country_code, hs2 and series (row index into
+    panel, -1 where the lane has no history) columns added
+    """
+
+    missing = {"import_value_gbp", "revenue_gbp"} - set(portfolio.columns)
+    if missing:
+        raise ValueError(f"Missing required columns: {sorted(missing)}")
+    hs_column = _first_column(portfolio, HS_CODE_COLUMNS)
+    country_column = _first_column(portfolio, COUNTRY_COLUMNS)
+    if hs_column is None or country_column is None:
+        raise ValueError(
+            f"Portfolio needs an HS code column ({', '.join(HS_CODE_COLUMNS)}) "
+            f"and a country column ({', '.join(COUNTRY_COLUMNS)})"
+        )
+
+    lanes = portfolio.copy()
+    lanes["country_code"] = lanes[country_column].astype(str).str.strip().str.upper()
+    lanes["hs2"] = hs2_chapters_from_codes(lanes[hs_column])
+
+    index = pd.MultiIndex.from_arrays([
+        panel.keys["country_code"].astype(str),
+        panel.keys["hs2_chapter"].astype(np.int64),
+    ])
+    hs2 = lanes["hs2"].fillna(-1).astype(np.int64)
+    lanes["series"] = index.get_indexer(pd.MultiIndex.from_arrays([lanes["country_code"], hs2]))
+    return lanes
+
+
+def _lane_drivers(lanes, shocks=None):
+    """Cost driver arrays per lane (column values, else COST_DRIVERS defaults) plus shocks."""
+
+    drivers = {}
+    for driver, default in COST_DRIVERS.items():
+        if driver in lanes.columns:
+            values = lanes[driver].fillna(default).to_numpy(dtype=np.float64)
+        else:
+            values = np.full(len(lanes), default)
+        drivers[driver] = values + (shocks or {}).get(driver, 0.0)
+    return drivers
+
+
+def portfolio_profit(lanes, import_growth=0.0, shocks=None):
+    """
+    Total portfolio profit with import values scaled by (1 + import_growth).
+
+    import_growth may be a scalar, one value per lane, or a (n_scenarios,
+    n_lanes) array, giving one total per scenario.
+    """
+
+    import_value = lanes["import_value_gbp"].to_numpy(dtype=np.float64) * (1 + np.asarray(import_growth))
+    revenue = lanes["revenue_gbp"].to_numpy(dtype=np.float64)
+    result = compute_margin_batch(import_value, revenue, **_lane_drivers(lanes, shocks))
+    return result["profit"].sum(axis=-1)
+
+
+def portfolio_risk(lanes, growth, level=DEFAULT_LEVEL, covariance=None):
+    """
+    Historical and parametric VaR/CVaR of portfolio profit.
+
+    Each historical period's import-value growth per lane is one scenario:
+    the historical measures revalue the whole portfolio under every
+    scenario (full repricing, including the landed-cost cap). The
+    parametric measures use the growth covariance and each lane's landed
+    cost as its exposure. Lanes without history do not move.
+
+    Parameters:
+        lanes: Output of portfolio_lanes()
+        growth: (n_series, n_periods) growth panel the lanes index into
+        covariance: growth_covariance() result for growth (computed if None)
+
+    Returns: Dictionary of portfolio measures (GBP, losses positive)
+    """
+
+    series = lanes["series"].to_numpy()
+    matched = series >= 0
+    base = portfolio_profit(lanes)
+
+    # Scenarios: periods where any lane has history; missing growth = no change
+    lane_growth = np.zeros((len(lanes), growth.shape[1]))
+    lane_growth[matched] = growth[series[matched]]
+    observed = np.zeros(growth.shape[1], dtype=bool)
+    if matched.any():
+        observed = ~np.isnan(growth[np.unique(series[matched])]).all(axis=0)
+    scenarios = np.expm1(np.nan_to_num(lane_growth[:, observed])).T
+    losses = base - portfolio_profit(lanes, scenarios) if len(scenarios) else np.empty(0)
+    hist_var, hist_cvar = historical_var(losses, level)
+
+    covariance = covariance if covariance is not None else growth_covariance(growth)
+    landed = compute_margin_batch(
+        lanes["import_value_gbp"].to_numpy(dtype=np.float64),
+        lanes["revenue_gbp"].to_numpy(dtype=np.float64),
+        **_lane_drivers(lanes),
+    )["landed_cost"]
+    # Exposure per series: a 1-unit log-growth move raises landed cost by about this much
+    exposure = np.bincount(series[matched], weights=landed[matched], minlength=growth.shape[0])
+    mean_loss = float(exposure @ covariance["mean"])
+    sd = float(np.sqrt(max(exposure @ covariance["covariance"] @ exposure, 0.0)))
+    param_var, param_cvar = parametric_var(mean_loss, sd, level)
+
+    revenue = lanes["revenue_gbp"].sum()
+    return {
+        "lanes": len(lanes),
+        "lanes_with_history": int(matched.sum()),
+        "scenarios": len(losses),
+        "level": level,
+        "base_profit": float(base),
+        "base_margin_pct": float(base / revenue * 100) if revenue > 0 else np.nan,
+        "historical_var": hist_var,
+        "historical_cvar": hist_cvar,
+        "parametric_var": param_var,
+        "parametric_cvar": param_cvar,
+        "loss_sd": sd,
+        "shrinkage": covariance["shrinkage"],
+    }
+
+
+def stress_test(lanes, scenarios=STRESS_SCENARIOS):
+    """
+    Portfolio profit under each stress scenario (see STRESS_SCENARIOS).
+
+    Returns: DataFrame with one row per scenario: profit, change from
+    base, margin and number of loss-making lanes
+    """
+
+    import_value = lanes["import_value_gbp"].to_numpy(dtype=np.float64)
+    revenue = lanes["revenue_gbp"].to_numpy(dtype=np.float64)
+    base = portfolio_profit(lanes)
+
+    rows = []
+    for name, shocks in scenarios.items():
+        unknown = set(shocks) - set(COST_DRIVERS) - {"import_growth"}
+        if unknown:
+            raise ValueError(f"Unknown stress factors in {name}: {sorted(unknown)}")
+        result = compute_margin_batch(
+            import_value * (1 + shocks.get("import_growth", 0.0)), revenue, **_lane_drivers(lanes, shocks)
+        )
+        profit = result["profit"].sum()
+        rows.append({
+            "scenario": name,
+            "profit": profit,
+            "profit_change": profit - base,
+            "margin_pct": profit / revenue.sum() * 100 if revenue.sum() > 0 else np.nan,
+            "loss_making_lanes": int((result["profit"] < 0).sum()),
+        })
+    return pd.DataFrame(rows)
+
+
+# Cached inputs
+
+def cached_growth(hmrc_path=None, cache=None):
+    """
+    Country x HS2 import panel and its period-on-period log growth, cached
+    by the content hash of the HMRC file and the code version.
+
+    Returns: (SeriesPanel, growth array)
+    """
+
+    cache = cache or StageCache(enabled=False)
+    path = hmrc_path or resolve_path(HMRC_FILE)
+    key = cache.key(
+        "growth_panel", [cache.file_key(path)], code=code_version(__file__, trend_analysis.__file__)
+    )
+
+    def compute():
+        panel = hmrc_panel(path)
+        return panel, log_changes(panel.values)
+
+    return cache.get_or_compute("growth_panel", key, compute)
+
+
+def cached_covariance(growth, series, cache=None, shrink=True):
+    """growth_covariance() for a subset of series rows, cached by the data and row set."""
+
+    cache = cache or StageCache(enabled=False)
+    subset = np.ascontiguousarray(growth[series])
+    digest = hashlib.sha256(subset.tobytes())
+    digest.update(str(subset.shape).encode("utf-8"))
+    key = cache.key(
+        "growth_covariance",
+        [digest.hexdigest()],
+        params={"shrink": shrink, "min_overlap": MIN_OVERLAP},
+        code=code_version(__file__),
+    )
+    return cache.get_or_compute("growth_covariance", key, lambda: growth_covariance(subset, shrink=shrink))
+
+
+def correlation_table(panel, series, covariance):
+    """Correlation matrix labelled by "country-HS2" series names."""
+
+    keys = panel.keys.iloc[series]
+    labels = [f"{c}-{int(h):02d}" for c, h in zip(keys["country_code"], keys["hs2_chapter"])]
+    return pd.DataFrame(covariance["correlation"], index=labels, columns=labels).rename_axis("series").reset_index()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Portfolio VaR/CVaR, growth correlation and stress tests")
+    parser.add_argument("portfolio", help="Lanes file (.csv, .parquet or .feather)")
+    parser.add_argument("--hmrc", default=None, help="HMRC file (default: the cleaned HMRC data)")
+    parser.add_argument("--level", type=float, default=DEFAULT_LEVEL, help="VaR/CVaR confidence level")
+    parser.add_argument("--no-shrink", action="store_true", help="Use the raw pairwise correlations")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute the growth panel and covariance")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cache = StageCache(CACHE_FOLDER, enabled=not args.no_cache)
+
+    panel, growth = cached_growth(args.hmrc, cache)
+    # HS codes as text, so "0302" stays chapter 3
+    portfolio = read_table(args.portfolio, dtype=dict.fromkeys(HS_CODE_COLUMNS, str))
+    lanes = portfolio_lanes(portfolio, panel)
+
+    # Covariance over the series the portfolio holds, re-indexed to them
+    series = np.unique(lanes["series"][lanes["series"] >= 0])
+    covariance = cached_covariance(growth, series, cache, shrink=not args.no_shrink)
+    local = lanes.assign(series=np.searchsorted(series, lanes["series"]))
+    local.loc[lanes["series"] < 0, "series"] = -1
+
+    summary = portfolio_risk(local, growth[series], args.level, covariance)
+    stress = stress_test(lanes)
+    cache.save_memo()
+
+    outputs = {
+        "summary": pd.DataFrame([summary]),
+        "stress": stress,
+        "correlation": correlation_table(panel, series, covariance),
+    }
+    for name, table in outputs.items():
+        os.makedirs(os.path.dirname(OUTPUT_FILES[name]), exist_ok=True)
+        write_outputs(table, OUTPUT_FILES[name], DEFAULT_FORMATS)
+
+    print(f"Lanes: {summary['lanes']:,} ({summary['lanes_with_history']:,} with import history, "
+          f"{len(series):,} series, {summary['scenarios']} historical scenarios)")
+    print(f"Base profit: £{summary['base_profit']:,.0f} ({summary['base_margin_pct']:.1f}% margin)")
+    pct = f"{args.level:.0%}"
+    print(f"{pct} VaR  historical £{summary['historical_var']:,.0f}, parametric £{summary['parametric_var']:,.0f}")
+    print(f"{pct} CVaR historical £{summary['historical_cvar']:,.0f}, parametric £{summary['parametric_cvar']:,.0f}")
+    print(f"Correlation shrinkage: {summary['shrinkage']:.2f}")
+    print(stress.round(2).to_string(index=False))
+    print(f"Saved → {', '.join(OUTPUT_FILES.values())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# batch_price.py
+# Prices a whole import book (CSV/Parquet of shipments) in streamed chunks
+#
+# Usage: python -m scripts.batch_price shipments.csv priced.parquet [--chunksize 100000]
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from scripts.categories import MISSING_CODE, coverage_categorical, coverage_codes
+from scripts.commodity_index import COVERAGE_FILE
+from scripts.fx_rates import BASE_CURRENCY, FX_FILE, load_fx_rates
+from scripts.hs_codes import hs2_chapters_from_codes
+from scripts.pricing import COST_DRIVERS, price_batch
+from scripts.storage import TableWriter, file_format, iter_table, read_table, resolve_path
+
+# Required input columns; cost driver columns (COST_DRIVERS) are optional
+# per-row assumptions, and any other columns (e.g. country) pass through
+REQUIRED_COLUMNS = ("import_value_gbp", "revenue_gbp")
+
+# Accepted names for the HS code column, in order of preference
+HS_CODE_COLUMNS = ("hs_code", "hs2", "commodity")
+
+# Supplier currency column, used for historical FX shocks (--fx-from)
+CURRENCY_COLUMN = "currency"
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def csv_dtypes(path):
+    """
+    Column types for reading a CSV book in chunks: amounts and cost drivers
+    as float64, everything else (HS codes, currency, pass-through columns)
+    as text. Per-chunk type inference would otherwise give a column
+    different types in different chunks, which a Parquet/Arrow output
+    cannot hold.
+    """
+
+    if file_format(path) != "csv":
+        return None
+    numeric = set(REQUIRED_COLUMNS) | set(COST_DRIVERS)
+    header = pd.read_csv(path, nrows=0).columns
+    return {col: np.float64 if col in numeric else str for col in header}
+
+
+def coverage_lookup(path=COVERAGE_FILE):
+    """
+    Coverage class code per HS2 chapter as an int8 array indexed by
+    chapter (0-99).
+
+    Chapters without a coverage row are MISSING_CODE.
+    """
+
+    lookup = np.full(100, MISSING_CODE, dtype=np.int8)
+    path = resolve_path(path)
+    if not os.path.exists(path):
+        print(f"Warning: {path} not found; coverage will be unknown for all rows", file=sys.stderr)
+        return lookup
+    coverage = read_table(path, columns=["commodity", "coverage_class"])
+    codes = pd.to_numeric(coverage["commodity"], errors="coerce").to_numpy(dtype=np.float64)
+    valid = np.isfinite(codes) & (codes >= 0) & (codes < 100)
+    # Reverse so the first row for a chapter wins
+    codes = codes[valid].astype(np.intp)[::-1]
+    lookup[codes] = coverage_codes(coverage["coverage_class"])[valid][::-1]
+    return lookup
+
+
+def join_coverage(hs2, lookup):
+    """Coverage class for each HS2 chapter in a Series, as a Categorical (missing if unknown)."""
+
+    values = hs2.to_numpy(dtype=np.float64, na_value=np.nan)
+    in_range = np.isfinite(values) & (values >= 0) & (values < 100)
+    codes = lookup[np.where(in_range, values, 0).astype(np.intp)]
+    codes[~in_range] = MISSING_CODE
+    return coverage_categorical(codes)
+
+
+def fx_shock_table(start, end=None, path=FX_FILE):
+    """
+    Historical FX shock per currency between two dates (see FxRates.shock).
+
+    Parameters:
+        start: Date the import values were priced at
+        end: Date to revalue at (default: each currency's latest fixing)
+        path: FX store
+
+    Returns: Dict of currency -> shock (decimal), including GBP = 0
+    """
+
+    fx = load_fx_rates(path)
+    if not fx.currencies:
+        print(f"Warning: no FX rates in {path}; using the default FX shock", file=sys.stderr)
+    shocks = {BASE_CURRENCY: 0.0}
+    for currency in fx.currencies:
+        to_date = end if end is not None else fx.date_range(currency)[1]
+        shocks[currency] = fx.shock(currency, start, to_date)
+    return shocks
+
+
+def price_chunk(chunk, lookup, defaults, fx_shocks=None):
+    """
+    Price one chunk of shipments.
+
+    Parameters:
+        chunk: DataFrame of shipments
+        lookup: Code array from coverage_lookup()
+        defaults: Cost driver values used where a column is missing or empty
+        fx_shocks: Optional dict of currency -> FX shock, used as the
+                   fx_shock_pct default for rows with a currency
+
+    Returns: chunk with hs2, coverage_class and the pricing columns appended
+    """
+
+    missing = set(REQUIRED_COLUMNS) - set(chunk.columns)
+    if missing:
+        raise ValueError(f"Missing required columns: {sorted(missing)}")
+
+    hs_column = next((c for c in HS_CODE_COLUMNS if c in chunk.columns), None)
+    if hs_column is not None:
+        hs2 = hs2_chapters_from_codes(chunk[hs_column])
+        coverage = join_coverage(hs2, lookup)
+    else:
+        hs2 = pd.Series(pd.NA, index=chunk.index, dtype="Int64")
+        coverage = coverage_categorical(np.full(len(chunk), MISSING_CODE, dtype=np.int8))
+
+    defaults = dict(defaults)
+    if fx_shocks and CURRENCY_COLUMN in chunk.columns:
+        currency = chunk[CURRENCY_COLUMN].astype(object).str.strip().str.upper()
+        # Per-row default, a Series so an fx_shock_pct column can fill from it
+        defaults["fx_shock_pct"] = currency.map(fx_shocks).fillna(defaults["fx_shock_pct"])
+
+    drivers = {}
+    for driver, default in defaults.items():
+        if driver in chunk.columns:
+            drivers[driver] = chunk[driver].fillna(default).to_numpy(dtype=np.float64)
+        elif isinstance(default, pd.Series):
+            drivers[driver] = default.to_numpy(dtype=np.float64)
+        else:
+            drivers[driver] = default
+
+    result = price_batch(
+        chunk["import_value_gbp"].to_numpy(dtype=np.float64),
+        chunk["revenue_gbp"].to_numpy(dtype=np.float64),
+        coverage_class=coverage,
+        **drivers,
+    )
+
+    out = chunk.copy()
+    out["hs2"] = hs2.to_numpy()
+    out["coverage_class"] = coverage
+    for name, values in result.items():
+        out[name] = values
+    return out
+
+
+def batch_price(
+    input_path,
+    output_path,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    coverage_path=COVERAGE_FILE,
+    defaults=None,
+    progress=True,
+    fx_shocks=None,
+):
+    """
+    Price every shipment in input_path and stream the results to output_path.
+
+    Memory use depends on chunksize, not on the size of the book.
+
+    Parameters:
+        input_path: CSV, Parquet or Arrow file of shipments
+        output_path: Output file; the format comes from the extension
+        chunksize: Rows priced per chunk
+        coverage_path: Coverage table used for the HS2 join
+        defaults: Dict of cost driver -> value for rows without one
+        progress: Print a progress line per chunk
+        fx_shocks: Optional dict from fx_shock_table(), applied by currency
+
+    Returns: Dictionary with rows, seconds and rows_per_sec
+    """
+
+    driver_defaults = dict(COST_DRIVERS)
+    driver_defaults.update(defaults or {})
+    lookup = coverage_lookup(coverage_path)
+
+    start = time.perf_counter()
+    with TableWriter(output_path) as writer:
+        for i, chunk in enumerate(iter_table(input_path, chunksize, dtype=csv_dtypes(input_path)), start=1):
+            writer.write(price_chunk(chunk, lookup, driver_defaults, fx_shocks))
+            if progress:
+                elapsed = time.perf_counter() - start
+                print(
+                    f"  chunk {i}: {writer.rows:,} rows priced "
+                    f"({writer.rows / elapsed:,.0f} rows/sec)",
+                    file=sys.stderr,
+                )
+        rows = writer.rows
+
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed) if elapsed > 0 else 0,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Price an import book in streamed chunks")
+    parser.add_argument("input", help="Shipments file (.csv, .parquet or .feather)")
+    parser.add_argument("output", help="Output file (.csv, .parquet or .feather)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Rows per chunk")
+    parser.add_argument("--coverage", default=COVERAGE_FILE, help="Coverage table for the HS2 join")
+    parser.add_argument("--fx-shock", type=float, default=0.0, help="Default FX shock (decimal)")
+    parser.add_argument("--shipping", type=float, default=0.0, help="Default shipping rate (decimal)")
+    parser.add_argument("--insurance", type=float, default=0.0, help="Default insurance rate (decimal)")
+    parser.add_argument("--tariff", type=float, default=0.0, help="Default tariff rate (decimal)")
+    parser.add_argument(
+        "--fx-from",
+        help="Price FX from BoE rates: shock each row's currency from this date (YYYY-MM-DD)",
+    )
+    parser.add_argument("--fx-to", help="End date for --fx-from (default: latest rate)")
+    parser.add_argument("--fx-rates", default=FX_FILE, help="FX store for --fx-from")
+    parser.add_argument("--quiet", action="store_true", help="No per-chunk progress")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Fail on unsupported extensions before any work is done
+    file_format(args.input)
+    file_format(args.output)
+
+    fx_shocks = fx_shock_table(args.fx_from, args.fx_to, args.fx_rates) if args.fx_from else None
+    stats = batch_price(
+        args.input,
+        args.output,
+        chunksize=args.chunksize,
+        coverage_path=args.coverage,
+        defaults={
+            "fx_shock_pct": args.fx_shock,
+            "shipping_pct": args.shipping,
+            "insurance_pct": args.insurance,
+            "tariff_pct": args.tariff,
+        },
+        progress=not args.quiet,
+        fx_shocks=fx_shocks,
+    )
+    print(f"Priced {stats['rows']:,} rows in {stats['seconds']}s "
+          f"({stats['rows_per_sec']:,} rows/sec) → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# categories.py
+# Compact int8 encoding for coverage classes and risk levels
+
+from enum import IntEnum
+
+import numpy as np
+import pandas as pd
+
+# Code used for missing or unrecognised labels (pandas Categorical convention)
+MISSING_CODE = -1
+
+
+class CoverageClass(IntEnum):
+    """ONS coverage classes, best to worst. The value is the int8 code."""
+
+    HIGH = 0
+    PARTIAL = 1
+    LOW = 2
+    NONE = 3
+
+    @property
+    def label(self) -> str:
+        return COVERAGE_CLASSES[self]
+
+
+class RiskLevel(IntEnum):
+    """Risk levels, most to least severe. The value is the int8 code."""
+
+    HIGH = 0
+    MODERATE = 1
+    LOW = 2
+
+    @property
+    def label(self) -> str:
+        return RISK_LEVELS[self]
+
+
+# Display labels, indexed by code
+COVERAGE_CLASSES = ("High coverage", "Partial coverage", "Low coverage", "No coverage")
+RISK_LEVELS = ("HIGH", "MODERATE", "LOW")
+
+# Categorical dtypes used in DataFrames and stored outputs
+COVERAGE_DTYPE = pd.CategoricalDtype(COVERAGE_CLASSES)
+RISK_DTYPE = pd.CategoricalDtype(RISK_LEVELS)
+
+# Label -> code, for scalar lookups
+COVERAGE_CODES = {label: code for code, label in enumerate(COVERAGE_CLASSES)}
+RISK_CODES = {label: code for code, label in enumerate(RISK_LEVELS)}
+
+
+def encode(values, dtype) -> np.ndarray:
+    """
+    Encode labels as int8 codes of a categorical dtype.
+
+    Accepts strings/None, a Categorical or categorical Series (recoded by
+    category, without touching each row), or integer codes, which are
+    returned as int8. Missing or unknown labels become MISSING_CODE.
+    """
+
+    if isinstance(getattr(values, "dtype", None), pd.CategoricalDtype):
+        categorical = pd.Categorical(values)
+        if categorical.dtype == dtype:
+            return categorical.codes.astype(np.int8, copy=False)
+        # Map each category once, then index by code (last slot = missing)
+        mapping = pd.Categorical(categorical.categories.astype(object), dtype=dtype).codes
+        mapping = np.append(mapping, MISSING_CODE).astype(np.int8)
+        return mapping[categorical.codes]
+
+    array = np.asarray(values)
+    if array.dtype.kind in "iu":
+        return array.astype(np.int8)
+    return pd.Categorical(array.astype(object).ravel(), dtype=dtype).codes.reshape(array.shape)
+
+
+def decode(codes, dtype) -> pd.Categorical:
+    """int8 codes -> Categorical of labels (MISSING_CODE -> missing)."""
+
+    return pd.Categorical.from_codes(np.asarray(codes), dtype=dtype)
+
+
+def coverage_codes(values) -> np.ndarray:
+    """Coverage classes -> int8 codes (see CoverageClass)."""
+
+    return encode(values, COVERAGE_DTYPE)
+
+
+def risk_codes(values) -> np.ndarray:
+    """Risk levels -> int8 codes (see RiskLevel)."""
+
+    return encode(values, RISK_DTYPE)
+
+
+def coverage_categorical(codes) -> pd.Categorical:
+    return decode(codes, COVERAGE_DTYPE)
+
+
+def risk_categorical(codes) -> pd.Categorical:
+    return decode(codes, RISK_DTYPE)
+
+
+def code_lookup(values_by_code, missing):
+    """
+    Array for mapping codes to values with one take: position i holds the
+    value for code i, and the extra last slot (reached by -1) holds missing.
+    """
+
+    return np.append(np.asarray(values_by_code), missing)
+
+
+def to_labels(values) -> list:
+    """Categorical/codes -> plain list of labels for display (None for missing)."""
+
+    return [None if pd.isna(v) else v for v in pd.Series(values, copy=False).astype(object)]
@@ -1,12 +1,14 @@
 # classify_ons_coverage_by_commodity.py
 # Classifies ONS data coverage into High/Partial/Low/No coverage
 
-import pandas as pd
+import numpy as np
+from scripts.categories import CoverageClass, coverage_categorical
+from scripts.storage import COVERAGE_SCHEMA, DEFAULT_FORMATS, read_table, resolve_path, write_outputs
 
 INPUT_FILE = "data/output/ons_coverage_by_commodity_aggregated.csv"
 OUTPUT_FILE = "data/output/ons_coverage_by_commodity_classified.csv"
 
-df = pd.read_csv(INPUT_FILE)
+df = read_table(resolve_path(INPUT_FILE))
 
 # Check required columns exist
 required_cols = {"commodity", "ons_coverage_pct"}
@@ -30,9 +32,23 @@ def classify_coverage(pct):
         return "High coverage"
 
 
-df["coverage_class"] = df["ons_coverage_pct"].apply(classify_coverage)
+def classify_coverage_array(pct):
+    """
+    Vectorised classify_coverage(): coverage percentages -> Categorical of
+    classes, built from int8 codes.
+    """
+    pct = np.asarray(pct, dtype=np.float64)
+    codes = np.select(
+        [pct == 0, pct <= 40, pct <= 80],
+        [CoverageClass.NONE, CoverageClass.LOW, CoverageClass.PARTIAL],
+        default=CoverageClass.HIGH,
+    ).astype(np.int8)
+    return coverage_categorical(codes)
+
+
+df["coverage_class"] = classify_coverage_array(df["ons_coverage_pct"])
 
-df.to_csv(OUTPUT_FILE, index=False)
+write_outputs(df, OUTPUT_FILE, DEFAULT_FORMATS, schema=COVERAGE_SCHEMA)
 
 print("Saved classified ONS coverage by commodity →", OUTPUT_FILE)
 print(df[["commodity", "ons_coverage_pct", "coverage_class"]].head(10))
@@ -0,0 +1,109 @@
+# commodity_index.py
+# Precomputed HS2 commodity lookups for the dashboard
+
+import os
+
+from scripts.storage import resolve_path
+
+COVERAGE_FILE = "data/output/ons_coverage_by_commodity_classified.csv"
+
+# Used when no coverage data has been generated yet
+FALLBACK_SITC_CATEGORIES = [
+    "0 Food & live animals", "1 Beverages & tobacco", "2 Crude materials",
+    "3 Fuels", "5 Chemicals", "6 Manufactured goods",
+    "7 Machinery & transport equipment", "8 Miscellaneous manufactures", "9 Other commodities"
+]
+
+# Coverage file column -> commodity info key
+_INFO_COLUMNS = {
+    "sitc_category": ("sitc_category", "Unknown"),
+    "coverage_class": ("coverage_class", "No coverage"),
+    "ons_coverage_pct": ("coverage_pct", 0),
+    "total_years": ("total_years", 0),
+    "ons_covered_years": ("covered_years", 0),
+}
+
+
+def coverage_data_version(path=COVERAGE_FILE):
+    """Resolved path and modification time of the coverage file (mtime is None if missing)."""
+
+    coverage_file = resolve_path(path)
+    if os.path.exists(coverage_file):
+        return coverage_file, os.path.getmtime(coverage_file)
+    return coverage_file, None
+
+
+class CommodityIndex:
+    """
+    Commodity information keyed by HS2 code, built once per data version.
+
+    Replaces per-rerun DataFrame scans with dictionary lookups: info(hs)
+    returns the description, SITC category and coverage figures, and
+    hs_options(sitc) returns the prebuilt selectbox options for a SITC
+    category.
+
+    Parameters:
+        coverage_df: Classified coverage table (one row per HS2 chapter)
+        descriptions: Dict of HS2 code -> description
+    """
+
+    def __init__(self, coverage_df, descriptions):
+        self.descriptions = descriptions
+        self._info = {}
+        self._hs_by_sitc = {}
+
+        if len(coverage_df) > 0:
+            columns = [c for c in _INFO_COLUMNS if c in coverage_df.columns]
+            for hs, record in zip(coverage_df["commodity"].tolist(),
+                                  coverage_df[columns].to_dict("records")):
+                hs = int(hs)
+                # Keep the first row for an HS code, as the old filter did
+                if hs in self._info:
+                    continue
+                info = self._default_info(hs)
+                for col, value in record.items():
+                    info[_INFO_COLUMNS[col][0]] = value
+                self._info[hs] = info
+                self._hs_by_sitc.setdefault(record.get("sitc_category"), []).append(hs)
+
+        if len(coverage_df) > 0 and "sitc_category" in coverage_df.columns:
+            self.sitc_categories = sorted(coverage_df["sitc_category"].dropna().unique())
+        else:
+            self.sitc_categories = list(FALLBACK_SITC_CATEGORIES)
+
+        # Selectbox options per category, sorted by HS code
+        self._options = {
+            sitc: self._build_options(hs_codes) for sitc, hs_codes in self._hs_by_sitc.items()
+        }
+        self._all_options = self._build_options(range(1, 99))
+
+    def _default_info(self, hs):
+        info = {"description": self.descriptions.get(hs, "Unknown")}
+        for key, default in _INFO_COLUMNS.values():
+            info[key] = default
+        return info
+
+    def _build_options(self, hs_codes):
+        return {
+            f"HS {hs:02d} - {self.descriptions.get(hs, 'Unknown')}": hs
+            for hs in sorted(hs_codes) if hs in self.descriptions
+        }
+
+    def info(self, hs_code):
+        """Commodity information for an HS2 code (defaults if it has no coverage row)."""
+
+        return self._info.get(hs_code) or self._default_info(hs_code)
+
+    def hs_codes(self, sitc_category):
+        """HS2 codes in a SITC category, in coverage-file order."""
+
+        if not self._info:
+            return list(range(1, 99))
+        return list(self._hs_by_sitc.get(sitc_category, []))
+
+    def hs_options(self, sitc_category):
+        """Dict of selectbox label -> HS2 code for a SITC category."""
+
+        if not self._info:
+            return self._all_options
+        return self._options.get(sitc_category, {})
@@ -1,6 +1,26 @@
 # confidence_band.py
 # Maps ONS data coverage to uncertainty multipliers for confidence bands
 
+import math
+
+from scripts.categories import COVERAGE_CLASSES, code_lookup, coverage_codes
+
+# Coverage class -> uncertainty multiplier
+COVERAGE_MULTIPLIERS = {
+    "No coverage": 0.40,
+    "Low coverage": 0.25,
+    "Partial coverage": 0.15,
+    "High coverage": 0.05
+}
+
+# Multiplier for unknown or missing coverage
+DEFAULT_MULTIPLIER = 0.30
+
+# Multiplier by coverage code (last slot: missing or unknown coverage)
+_MULTIPLIER_BY_CODE = code_lookup(
+    [COVERAGE_MULTIPLIERS[label] for label in COVERAGE_CLASSES], DEFAULT_MULTIPLIER
+)
+
 
 def confidence_multiplier(coverage_class):
     """
@@ -15,13 +35,7 @@ def confidence_multiplier(coverage_class):
     Returns: Multiplier as decimal (e.g., 0.15 = ±15%)
     """
     
-    mapping = {
-        "No coverage": 0.40,
-        "Low coverage": 0.25,
-        "Partial coverage": 0.15,
-        "High coverage": 0.05
-    }
-    return mapping.get(coverage_class, 0.30)
+    return COVERAGE_MULTIPLIERS.get(coverage_class, DEFAULT_MULTIPLIER)
 
 
 def compute_confidence_band(profit, coverage_class):
@@ -35,3 +49,34 @@ def compute_confidence_band(profit, coverage_class):
     lower = profit * (1 - m)
     upper = profit * (1 + m)
     return lower, upper
+
+
+def confidence_multiplier_array(coverage_class):
+    """
+    Vectorised confidence_multiplier() for an array of coverage classes.
+    
+    Classes are encoded as int8 codes and looked up in one take. Unknown or
+    missing classes get DEFAULT_MULTIPLIER.
+    
+    Returns: float64 array of multipliers
+    """
+    
+    return _MULTIPLIER_BY_CODE[coverage_codes(coverage_class)]
+
+
+def combined_multiplier(coverage_class, forecast_band=None):
+    """
+    Coverage multiplier widened by a forecast interval.
+    
+    The two relative uncertainties are treated as independent and added in
+    quadrature. forecast_band is the forecast interval half-width as a
+    fraction of the point forecast (see forecast_engine); None or NaN
+    leaves the coverage multiplier unchanged.
+    
+    Returns: Multiplier as decimal
+    """
+    
+    m = confidence_multiplier(coverage_class)
+    if forecast_band is None or math.isnan(forecast_band):
+        return m
+    return math.hypot(m, forecast_band)
@@ -0,0 +1,189 @@
+# coverage.py
+# ONS data coverage by year, country and commodity in one pass
+
+import argparse
+import os
+
+from scripts.storage import DEFAULT_FORMATS, read_table, resolve_path, write_outputs
+
+TOTALS_FILE = "data/output/merged_hmrc_ons_totals.csv"
+COMMODITY_FILE = "data/output/merged_hmrc_ons_commodity.csv"
+
+OUTPUT_FILES = {
+    "overall": "data/output/ons_coverage_overall_aggregated.csv",
+    "country": "data/output/ons_coverage_by_country_aggregated.csv",
+    "commodity": "data/output/ons_coverage_by_commodity_aggregated.csv",
+}
+
+TABLES = tuple(OUTPUT_FILES)
+
+
+def ons_presence(df, keys):
+    """
+    Flag whether ONS has a value for each unique key combination.
+
+    Parameters:
+        df: Merged HMRC/ONS rows
+        keys: Grouping columns, e.g. ["country_code", "year"]
+
+    Returns: DataFrame with the key columns and a boolean ons_present column
+    """
+
+    present = df["import_value_million_gbp"].notna().rename("ons_present")
+    return (
+        present.groupby([df[k] for k in keys], observed=True)
+        .max()
+        .reset_index()
+    )
+
+
+def _coverage_pct(coverage, covered, total):
+    coverage["ons_coverage_pct"] = coverage[covered] / coverage[total] * 100
+    return coverage
+
+
+def coverage_overall(country_year):
+    """Share of country-years with ONS data, per year."""
+
+    coverage = (
+        country_year.groupby("year", observed=True)
+        .agg(
+            total_country_years=("country_code", "count"),
+            ons_covered_country_years=("ons_present", "sum"),
+        )
+        .reset_index()
+    )
+    return _coverage_pct(coverage, "ons_covered_country_years", "total_country_years")
+
+
+def coverage_by_country(country_year):
+    """Share of years with ONS data, per country (lowest coverage first)."""
+
+    coverage = (
+        country_year.groupby("country_code", observed=True)
+        .agg(
+            total_years=("year", "count"),
+            ons_covered_years=("ons_present", "sum"),
+        )
+        .reset_index()
+    )
+    return _coverage_pct(coverage, "ons_covered_years", "total_years").sort_values("ons_coverage_pct")
+
+
+def coverage_by_commodity(commodity):
+    """Share of years with ONS data, per commodity (lowest coverage first)."""
+
+    # HMRC commodity column is 'commodity_x' after merge
+    if "commodity_x" in commodity.columns:
+        commodity = commodity.rename(columns={"commodity_x": "commodity"})
+    if "commodity" not in commodity.columns:
+        raise ValueError("commodity column missing — merge is broken")
+
+    commodity_year = ons_presence(commodity, ["commodity", "year"])
+    coverage = (
+        commodity_year.groupby("commodity", observed=True)
+        .agg(
+            total_years=("year", "count"),
+            ons_covered_years=("ons_present", "sum"),
+        )
+        .reset_index()
+    )
+    return _coverage_pct(coverage, "ons_covered_years", "total_years").sort_values("ons_coverage_pct")
+
+
+def compute_coverage(totals=None, commodity=None, tables=TABLES):
+    """
+    Compute the requested coverage tables.
+
+    The overall and per-country tables share one country-year presence
+    pass over the merged totals. DataFrames can be passed in directly;
+    otherwise each input file is read once, and only the columns needed.
+
+    Parameters:
+        totals: Merged HMRC/ONS country totals (default: TOTALS_FILE)
+        commodity: Merged HMRC/ONS commodity rows (default: COMMODITY_FILE)
+        tables: Any of "overall", "country", "commodity"
+
+    Returns: Dictionary of table name -> DataFrame
+    """
+
+    unknown = set(tables) - set(TABLES)
+    if unknown:
+        raise ValueError(f"Unknown coverage tables: {unknown}")
+
+    results = {}
+
+    if "overall" in tables or "country" in tables:
+        if totals is None:
+            totals = read_table(
+                resolve_path(TOTALS_FILE),
+                columns=["country_code", "year", "import_value_million_gbp"],
+            )
+        country_year = ons_presence(totals, ["country_code", "year"])
+        if "overall" in tables:
+            results["overall"] = coverage_overall(country_year)
+        if "country" in tables:
+            results["country"] = coverage_by_country(country_year)
+
+    if "commodity" in tables:
+        if commodity is None:
+            commodity = read_table(resolve_path(COMMODITY_FILE))
+        results["commodity"] = coverage_by_commodity(commodity)
+
+    return results
+
+
+def save_coverage(results, formats=DEFAULT_FORMATS):
+    """Write each coverage table to its OUTPUT_FILES path; returns written paths."""
+
+    paths = []
+    for name, coverage in results.items():
+        paths += write_outputs(coverage, OUTPUT_FILES[name], formats)
+    return paths
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="ONS data coverage tables")
+    parser.add_argument(
+        "--table",
+        action="append",
+        choices=TABLES,
+        help="Table to build (repeatable; default: all available)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["csv", "parquet", "feather", "both"],
+        default=None,
+        help="Output format (default: CSV plus Parquet when pyarrow is installed)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.format is None:
+        formats = DEFAULT_FORMATS
+    elif args.format == "both":
+        formats = ("csv", "parquet")
+    else:
+        formats = (args.format,)
+
+    tables = args.table
+    if tables is None:
+        # Skip the commodity table when its merged input has not been built
+        tables = [
+            name for name in TABLES
+            if name != "commodity" or os.path.exists(resolve_path(COMMODITY_FILE))
+        ]
+
+    results = compute_coverage(tables=tables)
+    save_coverage(results, formats)
+
+    for name, coverage in results.items():
+        print(f"\nSaved ONS coverage ({name}) → {OUTPUT_FILES[name]}")
+        print(coverage.head(10))
+        print(f"Rows: {len(coverage)}")
+
+
+if __name__ == "__main__":
+    main()
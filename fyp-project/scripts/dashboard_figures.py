@@ -0,0 +1,192 @@
+# dashboard_figures.py
+# Plotly figure and table builders for the dashboard
+
+# Streamlit's plotly_chart already loads plotly.graph_objects. plotly.express
+# (and the pyarrow it pulls in) is imported only when the heatmap is built.
+import plotly.graph_objects as go
+
+# Column labels for the scenario data table and CSV export
+SCENARIO_TABLE_COLUMNS = [
+    'FX Shock (%)', 'Shipping (%)', 'Profit (GBP)', 'Margin (%)',
+    'Profit Lower (GBP)', 'Profit Upper (GBP)', 'Margin Lower (%)', 'Margin Upper (%)'
+]
+
+
+def waterfall_figure(import_value, goods_cost, shipping_cost, insurance_cost, tariff_cost, landed_cost):
+    """Cost build-up from import value to landed cost."""
+
+    cost_items = ['Import Value', 'FX Impact', 'Shipping', 'Insurance', 'Tariffs', 'Landed Cost']
+    cost_values = [
+        import_value,
+        goods_cost - import_value,
+        shipping_cost,
+        insurance_cost,
+        tariff_cost,
+        0
+    ]
+
+    fig_waterfall = go.Figure(go.Waterfall(
+        name="Cost Breakdown",
+        orientation="v",
+        measure=["absolute", "relative", "relative", "relative", "relative", "total"],
+        x=cost_items,
+        y=cost_values,
+        connector={"line": {"color": "rgb(63, 63, 63)"}},
+        increasing={"marker": {"color": "#ff6b6b"}},
+        decreasing={"marker": {"color": "#51cf66"}},
+        totals={"marker": {"color": "#339af0"}},
+        text=[f"GBP {v:,.0f}" if i < 5 else f"GBP {landed_cost:,.0f}" for i, v in enumerate(cost_values)],
+        textposition="outside"
+    ))
+
+    fig_waterfall.update_layout(
+        title="Cost Build-up to Landed Cost",
+        showlegend=False,
+        height=400,
+        margin=dict(t=50, b=50, l=50, r=50),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+    )
+    return fig_waterfall
+
+
+def gauge_figure(margin_pct):
+    """Profit margin gauge with risk bands."""
+
+    fig_gauge = go.Figure(go.Indicator(
+        mode="gauge+number+delta",
+        value=margin_pct,
+        domain={'x': [0, 1], 'y': [0, 1]},
+        title={'text': "Profit Margin (%)"},
+        delta={'reference': 10, 'increasing': {'color': "#51cf66"}, 'decreasing': {'color': "#ff6b6b"}},
+        gauge={
+            'axis': {'range': [-20, 40], 'tickwidth': 1},
+            'bar': {'color': "#339af0"},
+            'bgcolor': "white",
+            'borderwidth': 2,
+            'bordercolor': "gray",
+            'steps': [
+                {'range': [-20, 0], 'color': '#ff6b6b'},
+                {'range': [0, 5], 'color': '#ffd43b'},
+                {'range': [5, 10], 'color': '#ffe066'},
+                {'range': [10, 40], 'color': '#8ce99a'}
+            ],
+            'threshold': {
+                'line': {'color': "black", 'width': 4},
+                'thickness': 0.75,
+                'value': margin_pct
+            }
+        }
+    ))
+
+    fig_gauge.update_layout(
+        height=280,
+        margin=dict(t=50, b=20, l=30, r=30),
+        paper_bgcolor='rgba(0,0,0,0)',
+    )
+    return fig_gauge
+
+
+def heatmap_figure(pivot_margin):
+    """Margin heatmap over FX shock (rows) and shipping cost (columns)."""
+
+    import plotly.express as px
+
+    fig_heatmap = px.imshow(
+        pivot_margin,
+        labels=dict(x="Shipping Cost (%)", y="FX Shock (%)", color="Margin (%)"),
+        x=[f"{x:.0f}%" for x in pivot_margin.columns],
+        y=[f"{y:.0f}%" for y in pivot_margin.index],
+        color_continuous_scale="RdYlGn",
+        aspect="auto"
+    )
+
+    fig_heatmap.update_layout(
+        title="Profit Margin by FX Shock and Shipping Cost",
+        height=500,
+        margin=dict(t=60, b=50, l=80, r=50),
+    )
+    return fig_heatmap
+
+
+def _band_figure(x, lower, upper, centre, colour, fill, uncertainty, title, x_title):
+    """Line chart of margin with a shaded confidence band."""
+
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatter(
+        x=x,
+        y=upper,
+        mode='lines',
+        line=dict(width=0),
+        showlegend=False,
+        hoverinfo='skip'
+    ))
+
+    fig.add_trace(go.Scatter(
+        x=x,
+        y=lower,
+        mode='lines',
+        line=dict(width=0),
+        fill='tonexty',
+        fillcolor=fill,
+        name=f'Confidence Band (+/- {uncertainty*100:.0f}%)'
+    ))
+
+    fig.add_trace(go.Scatter(
+        x=x,
+        y=centre,
+        mode='lines+markers',
+        name='Margin %',
+        line=dict(color=colour, width=3),
+        marker=dict(size=8)
+    ))
+
+    fig.add_hline(y=0, line_dash="dash", line_color="red",
+                  annotation_text="Break-even", annotation_position="right")
+
+    fig.update_layout(
+        title=title,
+        xaxis_title=x_title,
+        yaxis_title="Profit Margin (%)",
+        height=350,
+        showlegend=True,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig
+
+
+def sensitivity_figures(df, uncertainty):
+    """
+    Margin vs shipping cost (at the FX point nearest 0%) and margin vs FX
+    shock (at ~5% shipping).
+
+    Returns: (fig_shipping, fig_fx)
+    """
+
+    # Exactly 0% on the default grid; empirical FX grids may not include it
+    fx_base = df['fx_shock_pct'].iloc[df['fx_shock_pct'].abs().argmin()]
+    df_fx0 = df[df['fx_shock_pct'] == fx_base].sort_values('shipping_pct')
+    fig_shipping = _band_figure(
+        df_fx0['shipping_pct'], df_fx0['margin_lower'], df_fx0['margin_upper'], df_fx0['margin_pct'],
+        '#339af0', 'rgba(51, 154, 240, 0.2)', uncertainty,
+        f"Margin vs Shipping Cost ({fx_base:g}% FX)", "Shipping Cost (%)",
+    )
+
+    df_ship5 = df[abs(df['shipping_pct'] - 5) < 1].sort_values('fx_shock_pct')
+    if df_ship5.empty:
+        df_ship5 = df[df['shipping_pct'] == df['shipping_pct'].min()].sort_values('fx_shock_pct')
+    fig_fx = _band_figure(
+        df_ship5['fx_shock_pct'], df_ship5['margin_lower'], df_ship5['margin_upper'], df_ship5['margin_pct'],
+        '#ff6b6b', 'rgba(255, 107, 107, 0.2)', uncertainty,
+        "Margin vs FX Shock (5% Shipping)", "FX Shock (%)",
+    )
+    return fig_shipping, fig_fx
+
+
+def scenario_display_table(df):
+    """Rounded, relabelled copy of the scenario grid for display and export."""
+
+    display_df = df.round(2)
+    display_df.columns = SCENARIO_TABLE_COLUMNS
+    return display_df
@@ -0,0 +1,201 @@
+# dashboard_style.py
+# Static CSS and badge/label tables for the dashboard, built once per process
+
+# Injected at the top of every page run
+DASHBOARD_CSS = """
+<style>
+    .main .block-container {
+        padding-top: 2rem;
+        padding-bottom: 2rem;
+    }
+    
+    .metric-card {
+        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+        padding: 1.5rem;
+        border-radius: 1rem;
+        color: white;
+        box-shadow: 0 4px 15px rgba(0,0,0,0.1);
+        text-align: center;
+    }
+    
+    .metric-card-profit {
+        background: linear-gradient(135deg, #11998e 0%, #38ef7d 100%);
+    }
+    
+    .metric-card-loss {
+        background: linear-gradient(135deg, #ff416c 0%, #ff4b2b 100%);
+    }
+    
+    .metric-card-margin {
+        background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);
+    }
+    
+    .metric-card-cost {
+        background: linear-gradient(135deg, #fa709a 0%, #fee140 100%);
+    }
+    
+    .metric-card-revenue {
+        background: linear-gradient(135deg, #a8edea 0%, #fed6e3 100%);
+        color: #333;
+    }
+    
+    .metric-value {
+        font-size: 2rem;
+        font-weight: 700;
+        margin: 0.5rem 0;
+    }
+    
+    .metric-label {
+        font-size: 0.9rem;
+        opacity: 0.9;
+        text-transform: uppercase;
+        letter-spacing: 1px;
+    }
+    
+    .risk-badge {
+        display: inline-block;
+        padding: 0.5rem 1.5rem;
+        border-radius: 2rem;
+        font-weight: 600;
+        font-size: 1rem;
+        margin: 0.25rem;
+    }
+    
+    .risk-high {
+        background: linear-gradient(135deg, #ff416c 0%, #ff4b2b 100%);
+        color: white;
+    }
+    
+    .risk-moderate {
+        background: linear-gradient(135deg, #f7971e 0%, #ffd200 100%);
+        color: #333;
+    }
+    
+    .risk-low {
+        background: linear-gradient(135deg, #56ab2f 0%, #a8e063 100%);
+        color: white;
+    }
+    
+    .coverage-badge {
+        display: inline-block;
+        padding: 0.5rem 1.2rem;
+        border-radius: 1rem;
+        font-size: 0.9rem;
+        font-weight: 600;
+    }
+    
+    .coverage-high { background: #d4edda; color: #155724; border: 2px solid #155724; }
+    .coverage-partial { background: #fff3cd; color: #856404; border: 2px solid #856404; }
+    .coverage-low { background: #f8d7da; color: #721c24; border: 2px solid #721c24; }
+    .coverage-none { background: #e2e3e5; color: #383d41; border: 2px solid #383d41; }
+    
+    .section-header {
+        background: linear-gradient(90deg, #1a1a2e 0%, #16213e 100%);
+        color: white;
+        padding: 1rem 1.5rem;
+        border-radius: 0.75rem;
+        margin: 1.5rem 0 1rem 0;
+        font-size: 1.2rem;
+        font-weight: 600;
+    }
+    
+    .info-box {
+        background: #f8f9fa;
+        border-left: 4px solid #4facfe;
+        padding: 1rem;
+        border-radius: 0 0.5rem 0.5rem 0;
+        margin: 1rem 0;
+    }
+    
+    .commodity-card {
+        background: linear-gradient(135deg, #f5f7fa 0%, #e4e8eb 100%);
+        padding: 1rem;
+        border-radius: 0.75rem;
+        border-left: 4px solid #667eea;
+        margin: 0.5rem 0;
+    }
+    
+    .commodity-category {
+        font-size: 0.85rem;
+        color: #667eea;
+        font-weight: 600;
+        text-transform: uppercase;
+        letter-spacing: 0.5px;
+    }
+    
+    .commodity-name {
+        font-size: 1rem;
+        color: #1a1a2e;
+        font-weight: 500;
+        margin-top: 0.25rem;
+    }
+    
+    .coverage-meter {
+        background: #e9ecef;
+        border-radius: 0.5rem;
+        height: 8px;
+        margin-top: 0.5rem;
+        overflow: hidden;
+    }
+    
+    .coverage-fill {
+        height: 100%;
+        border-radius: 0.5rem;
+    }
+    
+    .coverage-fill-high { background: linear-gradient(90deg, #51cf66 0%, #40c057 100%); }
+    .coverage-fill-partial { background: linear-gradient(90deg, #ffd43b 0%, #fab005 100%); }
+    .coverage-fill-low { background: linear-gradient(90deg, #ff6b6b 0%, #fa5252 100%); }
+    .coverage-fill-none { background: #adb5bd; }
+</style>
+"""
+
+# Coverage class -> (badge CSS class, label)
+COVERAGE_BADGES = {
+    "High coverage": ("coverage-high", "HIGH COVERAGE"),
+    "Partial coverage": ("coverage-partial", "PARTIAL COVERAGE"),
+    "Low coverage": ("coverage-low", "LOW COVERAGE"),
+    "No coverage": ("coverage-none", "NO COVERAGE"),
+}
+
+# Risk level -> (badge CSS class, label)
+RISK_BADGES = {
+    "HIGH": ("risk-high", "HIGH RISK"),
+    "MODERATE": ("risk-moderate", "MODERATE RISK"),
+    "LOW": ("risk-low", "LOW RISK"),
+}
+
+# Coverage class -> CSS class of the coverage meter fill
+COVERAGE_FILL_CLASSES = {
+    "High coverage": "coverage-fill-high",
+    "Partial coverage": "coverage-fill-partial",
+    "Low coverage": "coverage-fill-low",
+    "No coverage": "coverage-fill-none",
+}
+
+# Coverage class -> (coverage level, reliability, confidence band wording)
+QUALITY_DESCRIPTIONS = {
+    "High coverage": ("excellent", "reliable", "narrow"),
+    "Partial coverage": ("moderate", "reasonably reliable", "moderately widened"),
+    "Low coverage": ("limited", "less reliable", "significantly widened"),
+    "No coverage": ("no", "unreliable", "maximally widened"),
+}
+
+
+def get_coverage_badge(coverage_class):
+    css_class, label = COVERAGE_BADGES.get(coverage_class, ("coverage-none", str(coverage_class)))
+    return f'<span class="coverage-badge {css_class}">{label}</span>'
+
+
+def get_risk_badge(risk_level):
+    css_class, label = RISK_BADGES.get(risk_level, ("risk-moderate", str(risk_level)))
+    return f'<span class="risk-badge {css_class}">{label}</span>'
+
+
+def get_coverage_color(coverage_class):
+    return COVERAGE_FILL_CLASSES.get(coverage_class, "coverage-fill-none")
+
+
+def quality_description(coverage_class):
+    """(coverage level, reliability, band wording) for the data quality box."""
+    return QUALITY_DESCRIPTIONS.get(coverage_class, ("unknown", "uncertain", "widened"))
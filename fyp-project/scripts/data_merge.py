@@ -1,162 +1,145 @@
 # data_merge.py
 # Merges HMRC import data with ONS coverage statistics
 
+import argparse
+import shutil
+import time
 import pandas as pd
 import numpy as np
 import os
-import re
+
+from scripts import categories, hmrc, hs_codes, storage
+from scripts.categories import CoverageClass, coverage_categorical
+from scripts.hmrc import HMRC_FILE, iter_hmrc_chunks, normalize_columns, prepare_hmrc, prepare_hmrc_chunk
+from scripts.hs_codes import (
+    HS2_TO_SITC,
+    SITC_NAMES,
+    country_codes_from_names,
+    main_sitc_sections,
+    sitc_names_for_sections,
+)
+from scripts.pipeline_cache import CACHE_FOLDER, StageCache, code_version
+from scripts.stage_metrics import METRICS_FILE, StageRecorder, instrumented, set_rows_in
+
+from scripts.storage import (
+    COVERAGE_SCHEMA,
+    DEFAULT_FORMATS,
+    HMRC_SCHEMA,
+    MERGED_TOTALS_SCHEMA,
+    ONS_COMMODITY_SCHEMA,
+    ONS_TOTALS_SCHEMA,
+    apply_schema,
+    read_table,
+    resolve_path,
+    write_outputs,
+)
 
 # File paths
-HMRC_FILE = "data/processed/hmrc_cleaned.csv"
 ONS_TOTALS_FILE = "data/processed/ons_country_totals_clean.csv"
 ONS_COMMODITY_FILE = "data/processed/ons_country_by_commodity_clean.csv"
 OUTPUT_FOLDER = "data/output/"
 
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-
-# HMRC uses HS chapters (01-99), ONS uses SITC sections (0-9)
-# This maps each HS2 chapter to its parent SITC section
-
-HS2_TO_SITC = {
-    # Section 0: Food and live animals
-    1: 0, 2: 0, 3: 0, 4: 0, 5: 0, 6: 0, 7: 0, 8: 0, 9: 0, 10: 0,
-    11: 0, 12: 0, 13: 0, 14: 0, 15: 0, 16: 0, 17: 0, 18: 0, 19: 0, 20: 0,
-    21: 0, 22: 1, 23: 0, 24: 1,  # 22, 24 are beverages/tobacco
-    # Section 2: Crude materials
-    25: 2, 26: 2, 27: 3,  # 27 is fuels
-    # Section 5: Chemicals
-    28: 5, 29: 5, 30: 5, 31: 5, 32: 5, 33: 5, 34: 5, 35: 5, 36: 5, 37: 5, 38: 5,
-    # Section 6: Manufactured goods (basic)
-    39: 6, 40: 6, 41: 2, 42: 8, 43: 8,  # 42-43 are misc manufactures (leather goods)
-    44: 6, 45: 6, 46: 6, 47: 6, 48: 6, 49: 8, 50: 6,
-    51: 6, 52: 6, 53: 6, 54: 6, 55: 6, 56: 6, 57: 6, 58: 6, 59: 6,
-    60: 6, 61: 8, 62: 8, 63: 8, 64: 8, 65: 8, 66: 6, 67: 6,
-    68: 6, 69: 6, 70: 6, 71: 8, 72: 6, 73: 6, 74: 6, 75: 6, 76: 6,
-    78: 6, 79: 6, 80: 6, 81: 6, 82: 6, 83: 6,
-    # Section 7: Machinery and transport equipment
-    84: 7, 85: 7, 86: 7, 87: 7, 88: 7, 89: 7,
-    # Section 8: Miscellaneous manufactured articles
-    90: 8, 91: 8, 92: 8, 93: 8, 94: 8, 95: 8, 96: 8, 97: 8,
-    # Section 9: Other
-    99: 9,
-}
+# Incremental mode: each file in this folder is one HMRC partition (e.g. a
+# year or month extract), aggregated and cached independently
+HMRC_PARTITION_FOLDER = "data/processed/hmrc_partitions/"
 
-# SITC section names
-SITC_NAMES = {
-    0: "0 Food & live animals",
-    1: "1 Beverages & tobacco",
-    2: "2 Crude materials",
-    3: "3 Fuels",
-    4: "4 Animal & vegetable oils",
-    5: "5 Chemicals",
-    6: "6 Manufactured goods",
-    7: "7 Machinery & transport equipment",
-    8: "8 Miscellaneous manufactures",
-    9: "9 Other commodities",
+# Pipeline stages, in dependency order (loading is part of the prepare stages)
+STAGES = (
+    "prepare_hmrc",
+    "prepare_ons",
+    "sitc_coverage",
+    "hs2_coverage",
+    "save_coverage",
+    "merge_totals",
+    "market_intelligence",
+)
+
+# Stages that consume each stage's output. A downstream stage that is
+# reused from the cache never calls its inputs, so forcing a stage must
+# force everything that depends on it too.
+STAGE_DEPENDENTS = {
+    "prepare_hmrc": ("merge_totals", "market_intelligence"),
+    "prepare_ons": ("sitc_coverage",),
+    "sitc_coverage": ("hs2_coverage",),
+    "hs2_coverage": ("save_coverage",),
 }
 
 
-def extract_country_code_from_name(country_name):
-    """Extract country code from ONS format like 'AE United Arab Emirates' -> 'AE'"""
-    if pd.isna(country_name):
-        return None
-    parts = str(country_name).split(' ', 1)
-    if len(parts) >= 1 and len(parts[0]) == 2 and parts[0].isupper():
-        return parts[0]
-    return None
+@instrumented()
+def load_ons_totals():
+    """Load the ONS country totals file."""
+    # Prefer Parquet/Feather copies of the inputs when they are up to date
+    ons_totals = read_table(resolve_path(ONS_TOTALS_FILE), schema=ONS_TOTALS_SCHEMA)
+    return apply_schema(normalize_columns(ons_totals), ONS_TOTALS_SCHEMA)
 
 
-def extract_main_sitc_section(sitc_name):
-    """Extract main SITC section (0-9) from commodity name like '01 Meat' -> 0"""
-    if pd.isna(sitc_name):
-        return None
-    
-    name_str = str(sitc_name).strip()
-    
-    # Skip totals
-    if name_str.startswith('T ') or name_str == 'T Total':
-        return None
-    
-    # Get first digit from leading number
-    match = re.match(r'^(\d+)', name_str)
-    if match:
-        return int(match.group(1)[0])
-    return None
-
+@instrumented()
+def load_ons_commodity():
+    """Load the ONS country-by-commodity file."""
+    ons_commodity = read_table(resolve_path(ONS_COMMODITY_FILE), schema=ONS_COMMODITY_SCHEMA)
+    return apply_schema(normalize_columns(ons_commodity), ONS_COMMODITY_SCHEMA)
 
-def normalize_columns(df):
-    """Standardise column names to lowercase with underscores."""
-    df.columns = (
-        df.columns
-        .str.strip()
-        .str.lower()
-        .str.replace(" ", "_")
-        .str.replace("-", "_")
-    )
-    return df
 
-
-def load_data():
-    """Load all cleaned data files."""
-    print("=" * 60)
-    print("LOADING DATA FILES")
-    print("=" * 60)
-    
-    hmrc = pd.read_csv(HMRC_FILE, low_memory=False)
-    ons_totals = pd.read_csv(ONS_TOTALS_FILE)
-    ons_commodity = pd.read_csv(ONS_COMMODITY_FILE)
-    
-    hmrc = normalize_columns(hmrc)
-    ons_totals = normalize_columns(ons_totals)
-    ons_commodity = normalize_columns(ons_commodity)
-    
-    print(f"HMRC rows: {len(hmrc):,}")
-    print(f"ONS totals rows: {len(ons_totals):,}")
-    print(f"ONS commodity rows: {len(ons_commodity):,}")
-    
-    return hmrc, ons_totals, ons_commodity
-
-
-def prepare_hmrc(hmrc):
-    """Prepare HMRC data - extract HS2 chapters and map to SITC."""
-    print("\n" + "=" * 60)
-    print("PREPARING HMRC DATA")
-    print("=" * 60)
-    
-    # Rename partner_country to country_code
-    if "partner_country" in hmrc.columns:
-        hmrc = hmrc.rename(columns={"partner_country": "country_code"})
-    
-    # Remove bad country codes
-    bad_codes = ["YY", "ZZ", "XX", "", "UNK"]
-    original_len = len(hmrc)
-    hmrc = hmrc[~hmrc["country_code"].isin(bad_codes)]
-    hmrc = hmrc[hmrc["country_code"].notna()]
-    print(f"Removed {original_len - len(hmrc):,} rows with invalid country codes")
-    
-    # Extract HS2 chapter (first 2 digits of commodity code)
-    def get_hs2_chapter(commodity_code):
-        try:
-            code = int(commodity_code)
-            if code < 100:
-                return code
-            return int(str(code)[:2])
-        except (ValueError, TypeError):
-            return None
-    
-    hmrc["hs2_chapter"] = hmrc["commodity"].apply(get_hs2_chapter)
-    
-    # Map to SITC section
-    hmrc["sitc_section"] = hmrc["hs2_chapter"].apply(lambda x: HS2_TO_SITC.get(x, None))
-    hmrc["sitc_name"] = hmrc["sitc_section"].apply(lambda x: SITC_NAMES.get(x, None))
-    
-    print(f"HMRC unique HS2 chapters: {hmrc['hs2_chapter'].nunique()}")
-    print(f"HMRC unique SITC sections: {hmrc['sitc_section'].nunique()}")
-    print(f"HMRC year range: {hmrc['year'].min()} - {hmrc['year'].max()}")
-    
-    return hmrc
+class HmrcStreamStats:
+    """
+    Wraps a stream of HMRC chunks to report progress and throughput.
+    
+    Counts rows read and kept, and collects the same summary that
+    prepare_hmrc() prints for a full DataFrame.
+    """
+    
+    def __init__(self, chunksize, path=None):
+        self.chunksize = chunksize
+        self.path = path
+        self.rows_read = 0
+        self.rows_kept = 0
+        self.chunks = 0
+        self.hs2_chapters = set()
+        self.sitc_sections = set()
+        self.min_year = None
+        self.max_year = None
+        self.start = None
+        self.elapsed = 0.0
+    
+    def prepared_chunks(self):
+        """Yield cleaned HMRC chunks, updating the statistics as they go."""
+        self.start = time.perf_counter()
+        for raw in iter_hmrc_chunks(self.chunksize, self.path):
+            self.rows_read += len(raw)
+            chunk = prepare_hmrc_chunk(raw)
+            self.rows_kept += len(chunk)
+            self.chunks += 1
+            
+            self.hs2_chapters.update(chunk["hs2_chapter"].dropna().unique().tolist())
+            self.sitc_sections.update(chunk["sitc_section"].dropna().unique().tolist())
+            if len(chunk):
+                lo, hi = chunk["year"].min(), chunk["year"].max()
+                self.min_year = lo if self.min_year is None else min(self.min_year, lo)
+                self.max_year = hi if self.max_year is None else max(self.max_year, hi)
+            
+            self.elapsed = time.perf_counter() - self.start
+            print(f"  chunk {self.chunks}: {self.rows_read:,} rows read "
+                  f"({self.rows_per_sec:,.0f} rows/sec)")
+            yield chunk
+    
+    @property
+    def rows_per_sec(self):
+        return self.rows_read / self.elapsed if self.elapsed > 0 else 0.0
+    
+    def report(self):
+        print("\n" + "=" * 60)
+        print("HMRC STREAMING SUMMARY")
+        print("=" * 60)
+        print(f"Chunks: {self.chunks} (chunk size {self.chunksize:,})")
+        print(f"HMRC rows read: {self.rows_read:,}")
+        print(f"Removed {self.rows_read - self.rows_kept:,} rows with invalid country codes")
+        print(f"HMRC unique HS2 chapters: {len(self.hs2_chapters)}")
+        print(f"HMRC unique SITC sections: {len(self.sitc_sections)}")
+        print(f"HMRC year range: {self.min_year} - {self.max_year}")
+        print(f"Throughput: {self.rows_per_sec:,.0f} rows/sec ({self.elapsed:.1f}s)")
 
 
+@instrumented()
 def prepare_ons_commodity(ons_commodity):
     """Prepare ONS commodity data - extract country codes and SITC sections."""
     print("\n" + "=" * 60)
@@ -164,7 +147,7 @@ def prepare_ons_commodity(ons_commodity):
     print("=" * 60)
     
     # Extract country code from country_name (e.g., "AE United Arab Emirates" -> "AE")
-    ons_commodity["country_code"] = ons_commodity["country_name"].apply(extract_country_code_from_name)
+    ons_commodity["country_code"] = country_codes_from_names(ons_commodity["country_name"])
     
     # Remove rows without valid country code
     original_len = len(ons_commodity)
@@ -175,8 +158,8 @@ def prepare_ons_commodity(ons_commodity):
     ons_commodity = ons_commodity.rename(columns={"commodity": "sitc_name_raw"})
     
     # Extract main SITC section (0-9) from the commodity name
-    ons_commodity["sitc_section"] = ons_commodity["sitc_name_raw"].apply(extract_main_sitc_section)
-    ons_commodity["sitc_name"] = ons_commodity["sitc_section"].apply(lambda x: SITC_NAMES.get(x, None))
+    ons_commodity["sitc_section"] = main_sitc_sections(ons_commodity["sitc_name_raw"])
+    ons_commodity["sitc_name"] = sitc_names_for_sections(ons_commodity["sitc_section"])
     
     # Remove rows without valid SITC section (e.g., "T Total")
     before_filter = len(ons_commodity)
@@ -196,6 +179,7 @@ def prepare_ons_commodity(ons_commodity):
     return ons_commodity
 
 
+@instrumented()
 def compute_ons_coverage_by_sitc(ons_commodity):
     """Calculate ONS data coverage for each SITC section."""
     print("\n" + "=" * 60)
@@ -204,7 +188,7 @@ def compute_ons_coverage_by_sitc(ons_commodity):
     
     # Aggregate to main SITC section level (summing all sub-categories)
     sitc_year_agg = (
-        ons_commodity.groupby(["sitc_section", "sitc_name", "year"])
+        ons_commodity.groupby(["sitc_section", "sitc_name", "year"], observed=True)
         .agg(
             total_value=("import_value_million_gbp", "sum"),
             country_count=("country_code", "nunique"),
@@ -221,7 +205,7 @@ def compute_ons_coverage_by_sitc(ons_commodity):
     total_years = len(all_years)
     
     sitc_coverage = (
-        sitc_year_agg.groupby(["sitc_section", "sitc_name"])
+        sitc_year_agg.groupby(["sitc_section", "sitc_name"], observed=True)
         .agg(
             years_with_data=("has_data", "sum"),
             total_value=("total_value", "sum")
@@ -240,6 +224,21 @@ def compute_ons_coverage_by_sitc(ons_commodity):
     return sitc_coverage, total_years
 
 
+def coverage_classes(coverage_pct):
+    """
+    Classify SITC-derived coverage percentages (>=80 High, >=50 Partial,
+    >0 Low, else No coverage) as a Categorical built from int8 codes.
+    """
+    pct = np.asarray(coverage_pct, dtype=np.float64)
+    codes = np.select(
+        [pct >= 80, pct >= 50, pct > 0],
+        [CoverageClass.HIGH, CoverageClass.PARTIAL, CoverageClass.LOW],
+        default=CoverageClass.NONE,
+    ).astype(np.int8)
+    return coverage_categorical(codes)
+
+
+@instrumented()
 def create_hs2_coverage_from_sitc(sitc_coverage, total_years):
     """Map SITC coverage to HS2 chapters (each HS2 inherits from its SITC section)."""
     print("\n" + "=" * 60)
@@ -262,16 +261,6 @@ def create_hs2_coverage_from_sitc(sitc_coverage, total_years):
             sitc_name = SITC_NAMES.get(sitc_section, "Unknown")
             years_covered = 0
         
-        # Classify coverage
-        if coverage_pct >= 80:
-            coverage_class = "High coverage"
-        elif coverage_pct >= 50:
-            coverage_class = "Partial coverage"
-        elif coverage_pct > 0:
-            coverage_class = "Low coverage"
-        else:
-            coverage_class = "No coverage"
-        
         hs2_coverage_rows.append({
             "commodity": hs2,
             "hs2_chapter": hs2,
@@ -280,10 +269,10 @@ def create_hs2_coverage_from_sitc(sitc_coverage, total_years):
             "total_years": total_years,
             "ons_covered_years": years_covered,
             "ons_coverage_pct": coverage_pct,
-            "coverage_class": coverage_class
         })
     
     hs2_coverage = pd.DataFrame(hs2_coverage_rows)
+    hs2_coverage["coverage_class"] = coverage_classes(hs2_coverage["ons_coverage_pct"])
     hs2_coverage = hs2_coverage.sort_values("commodity")
     
     # Summary
@@ -297,19 +286,75 @@ def create_hs2_coverage_from_sitc(sitc_coverage, total_years):
     return hs2_coverage
 
 
-def merge_hmrc_ons_totals(hmrc, ons_totals):
-    """Merge HMRC with ONS country totals for summary stats."""
+def combine_country_year(partials):
+    """Sum partial country-year totals (from chunks or partitions) into one table."""
+    # Partial categories differ, so combine keys as plain strings
+    partials = [p.astype({"country_code": str}) for p in partials]
+    if not partials:
+        return pd.DataFrame(columns=["country_code", "year", "hmrc_total_value"])
+    return (
+        pd.concat(partials)
+        .groupby(["country_code", "year"])
+        .agg(hmrc_total_value=("hmrc_total_value", "sum"))
+        .reset_index()
+    )
+
+
+def aggregate_hmrc_country_year(hmrc):
+    """
+    Sum HMRC values to country-year level.
+    
+    Accepts a DataFrame or an iterable of DataFrame chunks. Chunks are
+    folded into a running total one at a time, so only the (small)
+    country-year table is held in memory.
+    """
+    if isinstance(hmrc, pd.DataFrame):
+        hmrc = [hmrc]
+    
+    running = None
+    for chunk in hmrc:
+        partial = (
+            chunk.groupby(["country_code", "year"], observed=True)
+            .agg(hmrc_total_value=("value", "sum"))
+            .reset_index()
+        )
+        running = partial if running is None else combine_country_year([running, partial])
+    
+    if running is None:
+        return combine_country_year([])
+    return running
+
+
+@instrumented()
+def load_hmrc_country_year(path=None, chunksize=None):
+    """
+    Load, clean and aggregate one HMRC file to country-year totals.
+    
+    With chunksize the file is streamed; otherwise it is loaded whole.
+    Streamed chunks are cleaned without a stage record each, so this stage
+    records the whole stream once, with the rows read as its rows in.
+    """
+    if chunksize:
+        hmrc_stream = HmrcStreamStats(chunksize, path)
+        hmrc_agg = aggregate_hmrc_country_year(hmrc_stream.prepared_chunks())
+        hmrc_stream.report()
+        set_rows_in(hmrc_stream.rows_read)
+        return hmrc_agg
+    
+    path = path or resolve_path(HMRC_FILE)
+    hmrc = apply_schema(normalize_columns(read_table(path, schema=HMRC_SCHEMA)), HMRC_SCHEMA)
+    print(f"HMRC rows: {len(hmrc):,} ({path})")
+    set_rows_in(len(hmrc))
+    return aggregate_hmrc_country_year(prepare_hmrc(hmrc))
+
+
+@instrumented("merge_hmrc_ons_totals")
+def merge_country_year_totals(hmrc_agg, ons_totals, formats=DEFAULT_FORMATS):
+    """Join HMRC country-year totals to ONS totals and save the result."""
     print("\n" + "=" * 60)
     print("MERGING HMRC WITH ONS TOTALS")
     print("=" * 60)
     
-    # Aggregate HMRC to country-year level for summary
-    hmrc_agg = (
-        hmrc.groupby(["country_code", "year"])
-        .agg(hmrc_total_value=("value", "sum"))
-        .reset_index()
-    )
-    
     merged = hmrc_agg.merge(
         ons_totals,
         on=["country_code", "year"],
@@ -321,59 +366,278 @@ def merge_hmrc_ons_totals(hmrc, ons_totals):
     print(f"Rows: {len(merged):,}")
     
     output_file = OUTPUT_FOLDER + "merged_hmrc_ons_totals.csv"
-    merged.to_csv(output_file, index=False)
-    print(f"Saved: {output_file}")
+    paths = write_outputs(merged, output_file, formats, schema=MERGED_TOTALS_SCHEMA)
+    for path in paths:
+        print(f"Saved: {path}")
     
-    return merged
+    return merged, paths
 
 
-def save_coverage_output(hs2_coverage):
-    """Save HS2 coverage classification to CSV."""
+@instrumented()
+def save_coverage_output(hs2_coverage, formats=DEFAULT_FORMATS):
+    """Save HS2 coverage classification (CSV plus any columnar formats)."""
     print("\n" + "=" * 60)
     print("SAVING COVERAGE OUTPUT")
     print("=" * 60)
     
     output_file = OUTPUT_FOLDER + "ons_coverage_by_commodity_classified.csv"
-    hs2_coverage.to_csv(output_file, index=False)
-    print(f"Saved: {output_file}")
+    paths = write_outputs(hs2_coverage, output_file, formats, schema=COVERAGE_SCHEMA)
     
     # Also save aggregated version
     agg_file = OUTPUT_FOLDER + "ons_coverage_by_commodity_aggregated.csv"
-    hs2_coverage.to_csv(agg_file, index=False)
-    print(f"Saved: {agg_file}")
+    paths += write_outputs(hs2_coverage, agg_file, formats, schema=COVERAGE_SCHEMA)
+    
+    for path in paths:
+        print(f"Saved: {path}")
+    return paths
+
+
+def hmrc_partition_files():
+    """HMRC partition files for incremental mode, in a stable order."""
+    if not os.path.isdir(HMRC_PARTITION_FOLDER):
+        return []
+    return sorted(
+        os.path.join(HMRC_PARTITION_FOLDER, name)
+        for name in os.listdir(HMRC_PARTITION_FOLDER)
+        if os.path.splitext(name)[1].lower() in storage.FORMATS
+    )
+
+
+def add_hmrc_partition(path):
+    """Copy a new HMRC extract (e.g. a new year or month) into the partition folder."""
+    os.makedirs(HMRC_PARTITION_FOLDER, exist_ok=True)
+    target = os.path.join(HMRC_PARTITION_FOLDER, os.path.basename(path))
+    shutil.copy2(path, target)
+    print(f"Added HMRC partition: {target}")
+    return target
+
+
+def with_dependents(stages):
+    """The given stages plus every stage downstream of them, in STAGES order."""
+    forced = set(stages)
+    pending = list(forced)
+    while pending:
+        for dependent in STAGE_DEPENDENTS.get(pending.pop(), ()):
+            if dependent not in forced:
+                forced.add(dependent)
+                pending.append(dependent)
+    return [stage for stage in STAGES if stage in forced]
+
+
+def outputs_exist(paths):
+    """Cache validity check for stages that write files."""
+    return all(os.path.exists(p) for p in paths)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="HMRC/ONS data merge pipeline")
+    parser.add_argument(
+        "--format",
+        choices=["csv", "parquet", "feather", "both"],
+        default=None,
+        help="Output format (default: CSV plus Parquet when pyarrow is installed)",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=None,
+        help="Stream HMRC in chunks of this many rows (bounded memory)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild every stage, ignoring cached artifacts",
+    )
+    parser.add_argument(
+        "--stage",
+        action="append",
+        choices=STAGES,
+        default=[],
+        help="Rebuild this stage and the stages that use it, even if cached (repeatable)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Neither read nor write the stage cache",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=f"Read HMRC from per-partition files in {HMRC_PARTITION_FOLDER}",
+    )
+    parser.add_argument(
+        "--append",
+        metavar="PATH",
+        help="Add an HMRC extract as a new partition (implies --incremental)",
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="PATH",
+        default=METRICS_FILE,
+        help=f"Append per-stage timing/memory records here as JSON lines (default: {METRICS_FILE})",
+    )
+    parser.add_argument(
+        "--no-metrics",
+        action="store_true",
+        help="Do not write per-stage metrics",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        help="Write a cProfile dump per top-level stage to this folder (nested stages are in their parent's dump)",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Also record each stage's Python allocation peak (tracemalloc; slower)",
+    )
+    return parser.parse_args(argv)
+
 
+def main(argv=None):
+    """
+    Run the data merge pipeline.
+    
+    Each stage is cached under a key built from its input file hashes, the
+    code version and its parameters, so unchanged stages are skipped.
+    Stages that run are timed and appended to the metrics file.
+    """
+    args = parse_args(argv)
+    recorder = StageRecorder(
+        None if args.no_metrics else args.metrics,
+        profile_dir=args.profile,
+        trace_memory=args.trace_memory,
+    )
+    with recorder:
+        run_pipeline(args)
+    
+    summary = recorder.summary()
+    if len(summary):
+        print("\nStage timings (slowest first):")
+        print(summary.to_string(index=False))
+    if recorder.records and recorder.path:
+        print(f"Stage metrics appended to {recorder.path} (run {recorder.run_id})")
+    if args.profile:
+        print(f"cProfile dumps in {args.profile} (python -m pstats <file>)")
 
-def main():
-    """Run the data merge pipeline."""
+
+def run_pipeline(args):
+    """Run the cached pipeline stages for parsed command-line arguments."""
+    if args.format is None:
+        formats = DEFAULT_FORMATS
+    elif args.format == "both":
+        formats = ("csv", "parquet")
+    else:
+        formats = (args.format,)
+    
     print("\n" + "=" * 60)
     print("DATA MERGE PIPELINE")
     print("=" * 60)
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    
+    force_stages = with_dependents(args.stage)
+    if len(force_stages) > len(set(args.stage)):
+        print(f"Rebuilding: {', '.join(force_stages)}")
+    cache = StageCache(CACHE_FOLDER, force=args.force, force_stages=force_stages, enabled=not args.no_cache)
+    code = code_version(__file__, hmrc.__file__, hs_codes.__file__, storage.__file__, categories.__file__)
+    params = {"formats": list(formats)}
+    
+    # HMRC -> country-year totals, either from one file or from partitions
+    if args.append:
+        add_hmrc_partition(args.append)
+    if args.incremental or args.append:
+        partition_keys = {
+            path: cache.key("prepare_hmrc", [cache.file_key(path)], code=code)
+            for path in hmrc_partition_files()
+        }
+        if not partition_keys:
+            raise FileNotFoundError(f"No HMRC partitions found in {HMRC_PARTITION_FOLDER}")
+        hmrc_key = cache.key("prepare_hmrc", list(partition_keys.values()), code=code)
+        hmrc_input = list(partition_keys)
+        
+        def hmrc_totals():
+            # Only new or changed partitions are recomputed
+            return combine_country_year([
+                cache.get_or_compute(
+                    "prepare_hmrc", key,
+                    lambda path=path: load_hmrc_country_year(path, args.chunksize),
+                )
+                for path, key in partition_keys.items()
+            ])
+    else:
+        hmrc_path = resolve_path(HMRC_FILE)
+        hmrc_key = cache.key("prepare_hmrc", [cache.file_key(hmrc_path)], code=code)
+        hmrc_input = hmrc_path
+        
+        def hmrc_totals():
+            return cache.get_or_compute(
+                "prepare_hmrc", hmrc_key,
+                lambda: load_hmrc_country_year(hmrc_path, args.chunksize),
+            )
+    
+    # ONS commodity -> SITC coverage -> HS2 coverage
+    ons_key = cache.key("prepare_ons", [cache.file_key(resolve_path(ONS_COMMODITY_FILE))], code=code)
+    sitc_key = cache.key("sitc_coverage", [ons_key], code=code)
+    hs2_key = cache.key("hs2_coverage", [sitc_key], code=code)
+    save_key = cache.key("save_coverage", [hs2_key], params, code=code)
+    totals_key = cache.file_key(resolve_path(ONS_TOTALS_FILE))
+    merge_key = cache.key("merge_totals", [hmrc_key, totals_key], params, code=code)
+    
+    def ons_prepared():
+        return cache.get_or_compute(
+            "prepare_ons", ons_key, lambda: prepare_ons_commodity(load_ons_commodity())
+        )
     
-    # Load data
-    hmrc, ons_totals, ons_commodity = load_data()
-    
-    # Prepare datasets
-    hmrc = prepare_hmrc(hmrc)
-    ons_commodity = prepare_ons_commodity(ons_commodity)
-    
-    # Compute SITC-level coverage from ONS
-    sitc_coverage, total_years = compute_ons_coverage_by_sitc(ons_commodity)
+    def sitc_coverage():
+        return cache.get_or_compute(
+            "sitc_coverage", sitc_key, lambda: compute_ons_coverage_by_sitc(ons_prepared())
+        )
     
-    # Map to HS2 chapters
-    hs2_coverage = create_hs2_coverage_from_sitc(sitc_coverage, total_years)
+    def hs2_coverage():
+        return cache.get_or_compute(
+            "hs2_coverage", hs2_key, lambda: create_hs2_coverage_from_sitc(*sitc_coverage())
+        )
     
     # Save coverage output
-    save_coverage_output(hs2_coverage)
+    cache.get_or_compute(
+        "save_coverage", save_key,
+        lambda: save_coverage_output(hs2_coverage(), formats),
+        valid=outputs_exist,
+    )
     
     # Merge HMRC with ONS totals (for summary stats)
-    merge_hmrc_ons_totals(hmrc, ons_totals)
+    cache.get_or_compute(
+        "merge_totals", merge_key,
+        lambda: merge_country_year_totals(hmrc_totals(), load_ons_totals(), formats)[1],
+        valid=outputs_exist,
+    )
+    
+    # HS2 x country x year market benchmarks and alerts. market_intelligence
+    # imports this module, so it is loaded here rather than at the top.
+    from scripts import market_intelligence, trend_analysis
+    market_code = code_version(__file__, market_intelligence.__file__, trend_analysis.__file__)
+    market_key = cache.key("market_intelligence", [hmrc_key], params, code=market_code)
+    cache.get_or_compute(
+        "market_intelligence", market_key,
+        lambda: market_intelligence.build_market_intelligence(hmrc_input, formats, chunksize=args.chunksize),
+        valid=outputs_exist,
+    )
+    
+    cache.save_memo()
+    
+    # Every forced stage must have run; a cached consumer would otherwise hide it
+    skipped = [stage for stage in force_stages if stage not in cache.misses]
+    if cache.enabled and skipped:
+        raise RuntimeError(f"Forced stage(s) not recomputed: {', '.join(skipped)}")
     
     print("\n" + "=" * 60)
     print("PIPELINE COMPLETE")
     print("=" * 60)
+    print(f"Cache: {cache.summary()}")
     print("\nOutput files:")
     print(f"  - {OUTPUT_FOLDER}ons_coverage_by_commodity_classified.csv")
     print(f"  - {OUTPUT_FOLDER}merged_hmrc_ons_totals.csv")
+    print(f"  - {OUTPUT_FOLDER}market_benchmarks.csv")
 
 
 if __name__ == "__main__":
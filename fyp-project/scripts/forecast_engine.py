@@ -0,0 +1,450 @@
+# forecast_engine.py
+# Per-series import value forecasts (ARIMA or exponential smoothing) and anomaly flags
+#
+# Usage: python -m scripts.forecast_engine [--horizon 2] [--workers 0] [--no-cache]
+
+import argparse
+import hashlib
+import os
+import time
+import warnings
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+from scripts import __version__
+from scripts.parallel_executor import map_ordered, resolve_workers, split_range
+from scripts.pipeline_cache import CACHE_FOLDER
+from scripts.storage import DEFAULT_FORMATS, read_table, resolve_path, write_outputs
+from scripts.trend_analysis import SeriesPanel, hmrc_panel
+
+OUTPUT_FILES = {
+    "country_hs2": "data/output/forecast_country_hs2.csv",
+    "hs2": "data/output/forecast_hs2.csv",
+    "anomalies": "data/output/import_anomalies.csv",
+}
+
+PARAM_CACHE_FILE = os.path.join(CACHE_FOLDER, "forecast_params.pkl")
+
+ARIMA_ORDER = (1, 1, 1)
+
+# Series with fewer observations use exponential smoothing instead of ARIMA
+MIN_ARIMA_OBS = 24
+
+# Series with fewer observations get a naive (last value) forecast, no interval
+MIN_FIT_OBS = 3
+
+# Forecast horizon in years (converted to periods) and interval level
+DEFAULT_HORIZON_YEARS = 2
+INTERVAL_LEVEL = 0.95
+
+# |standardised one-step residual| above this flags an anomaly
+ANOMALY_THRESHOLD = 3.0
+
+# Exponential smoothing parameter grid, searched for every series at once
+ES_ALPHAS = np.round(np.linspace(0.1, 0.9, 9), 2)
+ES_BETAS = (0.0, 0.05, 0.1, 0.2, 0.3)
+
+# Series per process-pool task
+BATCH_SIZE = 500
+
+
+def statsmodels_available() -> bool:
+    """True if statsmodels is installed (needed for ARIMA)."""
+
+    try:
+        import statsmodels  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# Parameter cache
+
+def series_key(y, model):
+    """Hash of a series' (log) values, the model and the package version."""
+
+    digest = hashlib.sha256(np.ascontiguousarray(y, dtype=np.float64).tobytes())
+    digest.update(f"{model}|{ARIMA_ORDER}|{__version__}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ParamCache:
+    """
+    Fitted model parameters keyed by series_key().
+
+    Series whose values have not changed since the last run reuse their
+    parameters and are only filtered, not refitted. save() keeps just the
+    entries used in this run, so the file does not grow without bound.
+    """
+
+    def __init__(self, path=PARAM_CACHE_FILE, enabled=True):
+        self.path = path
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._entries = pd.read_pickle(path) if enabled and os.path.exists(path) else {}
+        self._used = {}
+
+    def get(self, key):
+        params = self._entries.get(key) if self.enabled else None
+        if params is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._used[key] = params
+        return params
+
+    def put(self, key, params):
+        self._used[key] = params
+
+    def save(self):
+        if not self.enabled:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        pd.to_pickle(self._used, self.path)
+
+
+# Exponential smoothing (Holt's linear trend), vectorised over series
+
+def _holt(y, alpha, beta, keep_residuals=False):
+    """
+    Run Holt's linear trend recursion over every series and parameter pair.
+
+    Parameters:
+        y: (n_series, n_periods) log values; NaN gaps are stepped over
+        alpha, beta: Arrays broadcastable to (n_series, n_params)
+        keep_residuals: Also return one-step residuals (n_params must be 1)
+
+    Returns: Dictionary with level, trend, sse (n_series, n_params), count
+    (one-step errors per series) and optionally residuals (n_series, n_periods)
+    """
+
+    n_series, n_periods = y.shape
+    shape = np.broadcast_shapes((n_series, 1), np.shape(alpha), np.shape(beta))
+    level = np.zeros(shape)
+    trend = np.zeros(shape)
+    sse = np.zeros(shape)
+    seen = np.zeros(n_series, dtype=np.int64)
+    count = np.zeros(n_series, dtype=np.int64)
+    residuals = np.full((n_series, n_periods), np.nan) if keep_residuals else None
+
+    for t in range(n_periods):
+        x = y[:, t]
+        ok = ~np.isnan(x)
+        first = (ok & (seen == 0))[:, None]
+        second = (ok & (seen == 1))[:, None]
+        update = (ok & (seen >= 2))[:, None]
+        x = x[:, None]
+
+        forecast = level + trend
+        error = x - forecast
+        # The first point sets the level, the second the initial trend
+        new_trend = np.where(update, trend + alpha * beta * error, trend)
+        new_trend = np.where(second, x - level, np.where(first, 0.0, new_trend))
+        level = np.where(update, forecast + alpha * error, np.where(first | second, x, forecast))
+        trend = new_trend
+
+        sse += np.where(update, error * error, 0.0)
+        count += update[:, 0]
+        seen += ok
+        if keep_residuals:
+            residuals[:, t] = np.where(update[:, 0], error[:, 0], np.nan)
+
+    return {"level": level, "trend": trend, "sse": sse, "count": count, "residuals": residuals}
+
+
+def fit_holt(y):
+    """
+    Choose alpha and beta per series by grid search on one-step squared
+    errors (all series and grid points in one recursion).
+
+    Returns: (alpha, beta) arrays, one value per series
+    """
+
+    alpha, beta = np.meshgrid(ES_ALPHAS, ES_BETAS, indexing="ij")
+    alpha, beta = alpha.reshape(1, -1), beta.reshape(1, -1)
+    best = _holt(y, alpha, beta)["sse"].argmin(axis=1)
+    return alpha[0, best], beta[0, best]
+
+
+def holt_forecast(y, alpha, beta, horizon, z):
+    """
+    Point forecasts and prediction intervals from fitted Holt parameters.
+
+    The h-step variance is sigma^2 * (1 + sum_{j<h} (alpha * (1 + beta * j))^2).
+
+    Returns: (mean, lower, upper, standardised residuals); mean and bounds
+    are (n_series, horizon) in log units
+    """
+
+    run = _holt(y, alpha[:, None], beta[:, None], keep_residuals=True)
+    level, trend = run["level"][:, 0], run["trend"][:, 0]
+    sigma2 = run["sse"][:, 0] / np.maximum(run["count"] - 2, 1)
+
+    steps = np.arange(1, horizon + 1)
+    mean = level[:, None] + trend[:, None] * steps
+    psi = alpha[:, None] * (1 + beta[:, None] * np.arange(horizon))
+    psi[:, 0] = 0.0
+    variance = sigma2[:, None] * (1 + np.cumsum(psi * psi, axis=1))
+    spread = z * np.sqrt(variance)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        standardised = run["residuals"] / np.sqrt(sigma2)[:, None]
+    return mean, mean - spread, mean + spread, standardised
+
+
+# ARIMA (statsmodels)
+
+def arima_forecast(y, horizon, level, params=None):
+    """
+    ARIMA(ARIMA_ORDER) forecast for one log series with NaN gaps.
+
+    With params the model is only filtered (no optimisation).
+
+    Returns: (params, mean, lower, upper, standardised residuals)
+    """
+
+    from statsmodels.tsa.arima.model import ARIMA
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model = ARIMA(y, order=ARIMA_ORDER)
+        result = model.filter(params) if params is not None else model.fit()
+        forecast = result.get_forecast(horizon)
+        bounds = np.asarray(forecast.conf_int(alpha=1 - level))
+
+    fitted_params = np.asarray(result.params)
+    sigma = np.sqrt(fitted_params[-1])
+    # The first d residuals only reflect initialisation
+    residuals = np.asarray(result.resid, dtype=np.float64) / sigma
+    residuals[:ARIMA_ORDER[1]] = np.nan
+    residuals[np.isnan(y)] = np.nan
+    return fitted_params, np.asarray(forecast.predicted_mean), bounds[:, 0], bounds[:, 1], residuals
+
+
+# Batch worker
+
+def _forecast_batch(task):
+    """
+    Worker: forecast a block of series.
+
+    Exponential smoothing runs vectorised over the whole block; ARIMA rows
+    are then fitted one by one and replace their smoothing results. A
+    failed ARIMA fit keeps the smoothing forecast.
+    """
+
+    y, models, cached, horizon, level = task
+    n_series = len(y)
+    z = NormalDist().inv_cdf(0.5 + level / 2)
+    params = list(cached)
+
+    # Exponential smoothing for every fitted row (also the ARIMA fallback)
+    alpha = np.full(n_series, ES_ALPHAS[0])
+    beta = np.full(n_series, ES_BETAS[0])
+    es_cached = [i for i in range(n_series) if models[i] == "ets" and cached[i] is not None]
+    for i in es_cached:
+        alpha[i], beta[i] = cached[i]
+    skip = set(es_cached)
+    to_fit = np.array([i for i in range(n_series) if models[i] != "naive" and i not in skip], dtype=np.intp)
+    if len(to_fit):
+        alpha[to_fit], beta[to_fit] = fit_holt(y[to_fit])
+    mean, lower, upper, residuals = holt_forecast(y, alpha, beta, horizon, z)
+
+    used = list(models)
+    for i, model in enumerate(models):
+        if model == "ets":
+            params[i] = (float(alpha[i]), float(beta[i]))
+        elif model == "arima":
+            start = int(np.argmax(~np.isnan(y[i])))
+            try:
+                fitted, m, lo, hi, res = arima_forecast(y[i, start:], horizon, level, cached[i])
+            except Exception:
+                used[i], params[i] = "ets", None
+                continue
+            params[i] = fitted
+            mean[i], lower[i], upper[i] = m, lo, hi
+            residuals[i] = np.nan
+            residuals[i, start:] = res
+        else:
+            # Naive: last value, no interval
+            last = y[i][~np.isnan(y[i])]
+            mean[i] = last[-1] if len(last) else np.nan
+            lower[i] = upper[i] = np.nan
+            residuals[i] = np.nan
+
+    return {"models": used, "params": params, "mean": mean, "lower": lower, "upper": upper, "residuals": residuals}
+
+
+# Panels
+
+def _choose_models(y, arima):
+    observed = (~np.isnan(y)).sum(axis=1)
+    models = np.where(observed < MIN_FIT_OBS, "naive", "ets").astype(object)
+    if arima:
+        models[observed >= MIN_ARIMA_OBS] = "arima"
+    return models
+
+
+def forecast_panel(panel, horizon=None, level=INTERVAL_LEVEL, workers=1, cache=None, arima=None):
+    """
+    Forecast every series in a SeriesPanel.
+
+    Values are modelled on the log scale, so forecasts are medians and the
+    intervals are positive and skewed. Series with at least MIN_ARIMA_OBS
+    observations use ARIMA when statsmodels is installed; shorter ones use
+    Holt's exponential smoothing, and very short ones a naive forecast.
+
+    Parameters:
+        panel: SeriesPanel of import values (see trend_analysis)
+        horizon: Periods ahead (default DEFAULT_HORIZON_YEARS of periods)
+        level: Prediction interval level
+        workers: Processes for the fits (0 = all cores)
+        cache: Optional ParamCache; unchanged series reuse their parameters
+        arima: Use ARIMA for long series (default: if statsmodels is installed)
+
+    Returns: (forecasts, residuals, stats) where forecasts is a long
+    DataFrame (keys, step, period, forecast, lower, upper,
+    interval_halfwidth_pct, model), residuals the standardised one-step
+    residuals (n_series, n_periods) and stats a dict of counts
+    """
+
+    horizon = horizon or DEFAULT_HORIZON_YEARS * panel.freq
+    arima = statsmodels_available() if arima is None else arima
+    with np.errstate(invalid="ignore", divide="ignore"):
+        y = np.where(panel.values > 0, np.log(panel.values), np.nan)
+    models = _choose_models(y, arima)
+
+    keys = [series_key(row, model) for row, model in zip(y, models)]
+    cached = [cache.get(k) if cache is not None else None for k in keys]
+
+    workers = resolve_workers(workers)
+    tasks = [
+        (y[start:stop], list(models[start:stop]), cached[start:stop], horizon, level)
+        for start, stop in split_range(len(y), max(-(-len(y) // BATCH_SIZE), workers))
+    ]
+    results = map_ordered(_forecast_batch, tasks, workers)
+
+    used = [m for r in results for m in r["models"]]
+    params = [p for r in results for p in r["params"]]
+    if cache is not None:
+        for key, model, fitted, p in zip(keys, models, used, params):
+            # Only cache parameters for the model the key was built for
+            if p is not None and fitted == model:
+                cache.put(key, p)
+
+    def stack(name):
+        if not results:
+            return np.empty((0, horizon))
+        return np.vstack([r[name] for r in results])
+
+    mean, lower, upper = np.exp(stack("mean")), np.exp(stack("lower")), np.exp(stack("upper"))
+    residuals = np.vstack([r["residuals"] for r in results]) if results else np.empty(panel.shape)
+
+    n_series = len(y)
+    last = int(panel.periods[-1]) if len(panel.periods) else 0
+    future = np.arange(last + 1, last + horizon + 1)
+    labels = SeriesPanel(panel.keys.iloc[:0], future, np.empty((0, horizon)), panel.freq).period_labels()
+
+    forecasts = panel.keys.iloc[np.repeat(np.arange(n_series), horizon)].reset_index(drop=True)
+    forecasts["step"] = np.tile(np.arange(1, horizon + 1), n_series)
+    forecasts["period"] = np.tile(labels, n_series)
+    forecasts["forecast"] = mean.reshape(-1)
+    forecasts["lower"] = lower.reshape(-1)
+    forecasts["upper"] = upper.reshape(-1)
+    forecasts["interval_halfwidth_pct"] = (forecasts["upper"] - forecasts["lower"]) / (2 * forecasts["forecast"]) * 100
+    forecasts["model"] = np.repeat(np.array(used, dtype=object), horizon)
+    forecasts = forecasts[forecasts["forecast"].notna()].reset_index(drop=True)
+
+    stats = {
+        "series": n_series,
+        "models": pd.Series(used, dtype=object).value_counts().to_dict(),
+        "cache_hits": cache.hits if cache is not None else 0,
+        "cache_misses": cache.misses if cache is not None else n_series,
+    }
+    return forecasts, residuals, stats
+
+
+def find_anomalies(panel, residuals, threshold=ANOMALY_THRESHOLD):
+    """
+    Periods whose value was far from the one-step forecast.
+
+    Returns: DataFrame with the key columns, period, value and z_score for
+    every |standardised residual| above threshold
+    """
+
+    with np.errstate(invalid="ignore"):
+        rows, cols = np.nonzero(np.abs(residuals) > threshold)
+    anomalies = panel.keys.iloc[rows].reset_index(drop=True)
+    anomalies["period"] = np.array(panel.period_labels(), dtype=object)[cols]
+    anomalies["value"] = panel.values[rows, cols]
+    anomalies["z_score"] = residuals[rows, cols]
+    return anomalies
+
+
+def forecast_data_version(path=OUTPUT_FILES["hs2"]):
+    """Resolved path and modification time of the HS2 forecasts (mtime is None if missing)."""
+
+    forecast_file = resolve_path(path)
+    if os.path.exists(forecast_file):
+        return forecast_file, os.path.getmtime(forecast_file)
+    return forecast_file, None
+
+
+def load_forecast_bands(path=OUTPUT_FILES["hs2"]):
+    """
+    One-step forecast interval half-width per HS2 chapter, as a fraction
+    of the forecast (for confidence_band.combined_multiplier()).
+
+    Returns: Dict of HS2 chapter -> half-width; empty if no forecast file
+    """
+
+    path = resolve_path(path)
+    if not os.path.exists(path):
+        return {}
+    forecasts = read_table(path, columns=["hs2_chapter", "step", "interval_halfwidth_pct"])
+    first = forecasts[(forecasts["step"] == 1) & forecasts["interval_halfwidth_pct"].notna()]
+    return dict(zip(first["hs2_chapter"].astype(int), first["interval_halfwidth_pct"] / 100))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Forecast import values per country x HS2 and per HS2")
+    parser.add_argument("--hmrc", default=None, help="HMRC file (default: the cleaned HMRC data)")
+    parser.add_argument("--horizon", type=int, default=None, help="Periods ahead (default: two years)")
+    parser.add_argument("--level", type=float, default=INTERVAL_LEVEL, help="Prediction interval level")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (0 = all cores)")
+    parser.add_argument("--threshold", type=float, default=ANOMALY_THRESHOLD, help="Anomaly z-score")
+    parser.add_argument("--no-cache", action="store_true", help="Refit every series")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not statsmodels_available():
+        print("statsmodels is not installed; using exponential smoothing for all series")
+
+    start = time.perf_counter()
+    panel = hmrc_panel(args.hmrc)
+    cache = ParamCache(enabled=not args.no_cache)
+
+    outputs = {}
+    for name, series in (("country_hs2", panel), ("hs2", panel.aggregate(["hs2_chapter"]))):
+        forecasts, residuals, stats = forecast_panel(
+            series, args.horizon, args.level, workers=args.workers, cache=cache
+        )
+        outputs[name] = forecasts
+        print(f"{name}: {stats['series']:,} series, models {stats['models']}")
+        if name == "country_hs2":
+            outputs["anomalies"] = find_anomalies(series, residuals, args.threshold)
+
+    cache.save()
+    for name, table in outputs.items():
+        os.makedirs(os.path.dirname(OUTPUT_FILES[name]), exist_ok=True)
+        write_outputs(table, OUTPUT_FILES[name], DEFAULT_FORMATS)
+        print(f"Saved {name} ({len(table):,} rows) → {OUTPUT_FILES[name]}")
+    print(f"Parameter cache: {cache.hits:,} reused, {cache.misses:,} fitted "
+          f"({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
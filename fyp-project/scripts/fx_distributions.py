@@ -0,0 +1,267 @@
+# fx_distributions.py
+# Empirical FX shock distributions per currency, from rolling BoE rate changes
+#
+# Usage: python -m scripts.fx_distributions [--horizon 63 ...] [--rebuild]
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from scripts.fx_rates import BASE_CURRENCY, DEFAULT_HORIZON, FX_FILE, load_fx_rates
+from scripts.pipeline_cache import CACHE_FOLDER
+from scripts.storage import DEFAULT_FORMATS, write_outputs
+
+# Shock horizons in trading days (about 1, 3 and 6 months)
+SHOCK_HORIZONS = (21, 63, 126)
+
+# Quantile levels kept per distribution. Evenly spaced with the min and max
+# at the ends, so np.quantile over them interpolates the empirical inverse
+# CDF (this is what run_monte_carlo's "empirical" distribution does).
+QUANTILE_LEVELS = np.linspace(0.0, 1.0, 201)
+
+# Default tail cut-off for scenario grids (1st to 99th percentile)
+DEFAULT_TAIL = 0.01
+
+SHOCK_STATE_FILE = os.path.join(CACHE_FOLDER, "fx_shocks.pkl")
+QUANTILES_FILE = "data/output/fx_shock_quantiles.csv"
+
+
+def rolling_shocks(rates, horizon, start=None):
+    """
+    FX shocks over every window of horizon fixings: rates[t - horizon] / rates[t] - 1,
+    the change in the GBP cost of foreign-priced goods (positive = weaker GBP).
+
+    Parameters:
+        rates: Rates in date order (foreign units per GBP)
+        horizon: Window length in fixings
+        start: First end index t to include (default: horizon)
+
+    Returns: float64 array, one shock per window end
+    """
+
+    rates = np.asarray(rates, dtype=np.float64)
+    start = horizon if start is None else max(start, horizon)
+    if start >= len(rates):
+        return np.empty(0)
+    return rates[start - horizon:len(rates) - horizon] / rates[start:] - 1
+
+
+class FxShockDistributions:
+    """
+    Sorted rolling shocks and quantiles per (currency, horizon).
+
+    update() brings the distributions up to date with an FxRates store.
+    When the store has only gained newer fixings since the last update, the
+    new shocks are merged into the sorted arrays (no re-sort of the
+    history); otherwise the series is rebuilt. Quantiles over
+    QUANTILE_LEVELS are computed at update time, so lookups are array reads.
+
+    Parameters:
+        horizons: Shock horizons in trading days
+    """
+
+    def __init__(self, horizons=SHOCK_HORIZONS):
+        self.horizons = tuple(horizons)
+        # (currency, horizon) -> dict(shocks, quantiles, n_rates, last_day, last_rate)
+        self._state = {}
+
+    @property
+    def currencies(self):
+        return sorted({currency for currency, _ in self._state})
+
+    def update(self, fx):
+        """
+        Add the fixings in fx that are not yet included.
+
+        Returns: Dictionary with counts of appended, rebuilt and unchanged series
+        """
+
+        counts = {"appended": 0, "rebuilt": 0, "unchanged": 0}
+        for currency in fx.currencies:
+            days, rates = fx.series(currency)
+            for horizon in self.horizons:
+                key = (currency, horizon)
+                state = self._state.get(key)
+
+                if state is not None and self._extends(state, days, rates):
+                    if state["n_rates"] == len(rates):
+                        counts["unchanged"] += 1
+                        continue
+                    new = np.sort(rolling_shocks(rates, horizon, start=state["n_rates"]))
+                    old = state["shocks"]
+                    shocks = np.insert(old, np.searchsorted(old, new), new)
+                    counts["appended"] += 1
+                else:
+                    shocks = np.sort(rolling_shocks(rates, horizon))
+                    counts["rebuilt"] += 1
+
+                self._state[key] = {
+                    "shocks": shocks,
+                    "quantiles": np.quantile(shocks, QUANTILE_LEVELS) if len(shocks) else None,
+                    "n_rates": len(rates),
+                    "last_day": int(days[-1]),
+                    "last_rate": float(rates[-1]),
+                }
+        return counts
+
+    @staticmethod
+    def _extends(state, days, rates):
+        """True if the series still starts with the fixings the state was built from."""
+
+        n = state["n_rates"]
+        return (
+            n <= len(rates)
+            and int(days[n - 1]) == state["last_day"]
+            and float(rates[n - 1]) == state["last_rate"]
+        )
+
+    def _quantiles(self, currency, horizon):
+        state = self._state.get((currency, horizon))
+        if state is None or state["quantiles"] is None:
+            raise KeyError(f"No FX shock distribution for {currency} over {horizon} days")
+        return state["quantiles"]
+
+    def has(self, currency, horizon=DEFAULT_HORIZON):
+        state = self._state.get((currency, horizon))
+        return currency == BASE_CURRENCY or (state is not None and state["quantiles"] is not None)
+
+    def observations(self, currency, horizon=DEFAULT_HORIZON):
+        return len(self._state[(currency, horizon)]["shocks"])
+
+    def quantile(self, currency, q, horizon=DEFAULT_HORIZON):
+        """Shock at quantile level(s) q, interpolated from the stored quantiles (0 for GBP)."""
+
+        if currency == BASE_CURRENCY:
+            return np.zeros(np.shape(q)) if np.ndim(q) else 0.0
+        result = np.interp(q, QUANTILE_LEVELS, self._quantiles(currency, horizon))
+        return result if np.ndim(result) else float(result)
+
+    def grid(self, currency, steps=11, horizon=DEFAULT_HORIZON, tail=DEFAULT_TAIL):
+        """
+        FX axis for scenario grids: shocks at steps evenly spaced quantile
+        levels from tail to 1 - tail, rounded to 0.01 percentage points.
+        Duplicate points (e.g. for pegged currencies) are dropped.
+        """
+
+        levels = np.linspace(tail, 1 - tail, steps)
+        return np.unique(np.round(self.quantile(currency, levels, horizon), 4))
+
+    def distribution(self, currency, horizon=DEFAULT_HORIZON):
+        """Monte Carlo spec for fx_shock_pct (see run_monte_carlo)."""
+
+        if currency == BASE_CURRENCY:
+            return {"dist": "fixed", "value": 0.0}
+        return {"dist": "empirical", "values": self._quantiles(currency, horizon)}
+
+    def to_frame(self):
+        """Long quantile table: currency, horizon, level, shock and observations."""
+
+        frames = []
+        for (currency, horizon), state in sorted(self._state.items()):
+            if state["quantiles"] is None:
+                continue
+            frames.append(pd.DataFrame({
+                "currency": currency,
+                "horizon_days": horizon,
+                "level": QUANTILE_LEVELS,
+                "shock_pct": state["quantiles"],
+                "observations": len(state["shocks"]),
+            }))
+        if not frames:
+            return pd.DataFrame(columns=["currency", "horizon_days", "level", "shock_pct", "observations"])
+        return pd.concat(frames, ignore_index=True)
+
+    def save(self, path=SHOCK_STATE_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        pd.to_pickle({"horizons": self.horizons, "state": self._state}, path)
+        return path
+
+    @classmethod
+    def load(cls, path=SHOCK_STATE_FILE):
+        """Saved distributions, or an empty instance if there is no state file."""
+
+        if not os.path.exists(path):
+            return cls()
+        saved = pd.read_pickle(path)
+        dists = cls(saved["horizons"])
+        dists._state = saved["state"]
+        return dists
+
+
+def shock_data_version(path=SHOCK_STATE_FILE):
+    """Path and modification time of the saved distributions (mtime is None if missing)."""
+
+    if os.path.exists(path):
+        return path, os.path.getmtime(path)
+    return path, None
+
+
+def update_shock_distributions(
+    fx_path=FX_FILE,
+    state_path=SHOCK_STATE_FILE,
+    output=QUANTILES_FILE,
+    horizons=None,
+    rebuild=False,
+    formats=DEFAULT_FORMATS,
+):
+    """
+    Bring the saved distributions up to date with the FX store and write
+    the quantile table.
+
+    Parameters:
+        horizons: Horizons to keep (default: the saved ones, else SHOCK_HORIZONS).
+                  Changing them rebuilds the state.
+        rebuild: Ignore the saved state
+
+    Returns: (FxShockDistributions, update counts)
+    """
+
+    dists = FxShockDistributions.load(state_path) if not rebuild else FxShockDistributions()
+    if horizons is not None and tuple(horizons) != dists.horizons:
+        dists = FxShockDistributions(horizons)
+
+    counts = dists.update(load_fx_rates(fx_path))
+    dists.save(state_path)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    write_outputs(dists.to_frame(), output, formats)
+    return dists, counts
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Empirical FX shock distributions from the FX store")
+    parser.add_argument("--fx-rates", default=FX_FILE, help="FX store (see scripts.fx_rates)")
+    parser.add_argument(
+        "--horizon",
+        type=int,
+        action="append",
+        help=f"Shock horizon in trading days (repeatable; default: {', '.join(map(str, SHOCK_HORIZONS))})",
+    )
+    parser.add_argument("--rebuild", action="store_true", help="Recompute from scratch")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    dists, counts = update_shock_distributions(
+        fx_path=args.fx_rates, horizons=args.horizon, rebuild=args.rebuild
+    )
+
+    print(f"FX shock distributions: {counts['appended']} appended, "
+          f"{counts['rebuilt']} rebuilt, {counts['unchanged']} unchanged → {QUANTILES_FILE}")
+    rows = []
+    for currency in dists.currencies:
+        for horizon in dists.horizons:
+            if not dists.has(currency, horizon):
+                continue
+            p1, p5, p50, p95, p99 = dists.quantile(currency, [0.01, 0.05, 0.5, 0.95, 0.99], horizon) * 100
+            rows.append({
+                "currency": currency, "horizon_days": horizon,
+                "p1": p1, "p5": p5, "p50": p50, "p95": p95, "p99": p99,
+            })
+    if rows:
+        print(pd.DataFrame(rows).round(2).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
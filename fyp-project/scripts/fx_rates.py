@@ -0,0 +1,300 @@
+# fx_rates.py
+# Bank of England daily spot rates: ingestion, columnar store and fast lookups
+#
+# Usage: python -m scripts.fx_rates data/raw/boe_fx_daily.csv [more.csv ...] [--replace]
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from scripts.storage import DEFAULT_FORMATS, FX_SCHEMA, apply_schema, read_table, resolve_path, write_outputs
+
+RAW_FX_FILE = "data/raw/boe_fx_daily.csv"
+FX_FILE = "data/processed/fx_rates.csv"
+
+# Rates are quoted as foreign currency units per 1 GBP
+BASE_CURRENCY = "GBP"
+
+# Bank of England database series codes for daily spot rates against sterling
+BOE_SERIES = {
+    "XUDLUSS": "USD",
+    "XUDLERS": "EUR",
+    "XUDLJYS": "JPY",
+    "XUDLSFS": "CHF",
+    "XUDLCDS": "CAD",
+    "XUDLADS": "AUD",
+    "XUDLBK89": "CNY",
+    "XUDLBK64": "INR",
+    "XUDLHDS": "HKD",
+    "XUDLSGS": "SGD",
+    "XUDLDKS": "DKK",
+    "XUDLNKS": "NOK",
+    "XUDLSKS": "SEK",
+}
+
+TRADING_DAYS = 252
+
+# Default window for realised volatility, in daily returns (about one year)
+DEFAULT_VOL_WINDOW = 250
+
+# Default horizon for typical moves, in trading days (about three months)
+DEFAULT_HORIZON = 63
+
+
+# Ingestion
+
+def _parse_dates(values):
+    """BoE exports use "02 Jan 2024"; fall back to day-first parsing for other layouts."""
+
+    dates = pd.to_datetime(values, format="%d %b %Y", errors="coerce")
+    unparsed = dates.isna() & values.notna()
+    if unparsed.any():
+        dates[unparsed] = pd.to_datetime(values[unparsed], dayfirst=True, errors="coerce")
+    return dates
+
+
+def read_boe_csv(path):
+    """
+    Read a Bank of England database export (one DATE column, one column per
+    series) into a long table of date, currency and rate.
+
+    Series columns are renamed with BOE_SERIES; columns already named by a
+    three-letter currency code are kept as they are. Blank or non-positive
+    rates (holidays, "n/a") are dropped.
+    """
+
+    raw = pd.read_csv(path)
+    date_col = next((c for c in raw.columns if c.strip().upper() == "DATE"), raw.columns[0])
+
+    currencies = {}
+    for col in raw.columns:
+        name = col.strip().upper()
+        if col == date_col:
+            continue
+        if name in BOE_SERIES:
+            currencies[col] = BOE_SERIES[name]
+        elif len(name) == 3 and name.isalpha():
+            currencies[col] = name
+    if not currencies:
+        raise ValueError(f"No known FX series in {path}; expected BoE codes such as XUDLUSS")
+
+    wide = raw[list(currencies)].rename(columns=currencies)
+    wide.insert(0, "date", _parse_dates(raw[date_col]))
+    long = wide.melt(id_vars="date", var_name="currency", value_name="rate")
+    long["rate"] = pd.to_numeric(long["rate"], errors="coerce")
+    long = long[long["date"].notna() & (long["rate"] > 0)]
+    return long[["currency", "date", "rate"]]
+
+
+def ingest_fx(paths, output=FX_FILE, formats=DEFAULT_FORMATS, replace=False):
+    """
+    Load BoE exports into the FX store.
+
+    New observations are merged into the existing store (later files win
+    for the same currency and date) unless replace is True. The store is
+    sorted by currency and date, so lookups can use binary search.
+
+    Returns: The stored DataFrame
+    """
+
+    frames = [read_boe_csv(path) for path in paths]
+    existing = resolve_path(output)
+    if not replace and os.path.exists(existing):
+        frames.insert(0, read_table(existing, schema=FX_SCHEMA))
+
+    rates = pd.concat([f.astype({"currency": str}) for f in frames], ignore_index=True)
+    rates = (
+        rates.drop_duplicates(["currency", "date"], keep="last")
+        .sort_values(["currency", "date"])
+        .reset_index(drop=True)
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    write_outputs(rates, output, formats, schema=FX_SCHEMA)
+    return apply_schema(rates, FX_SCHEMA)
+
+
+def fx_data_version(path=FX_FILE):
+    """Resolved path and modification time of the FX store (mtime is None if missing)."""
+
+    fx_file = resolve_path(path)
+    if os.path.exists(fx_file):
+        return fx_file, os.path.getmtime(fx_file)
+    return fx_file, None
+
+
+def load_fx_rates(path=FX_FILE):
+    """FxRates for the stored rates (columnar copy preferred); empty if there is no store."""
+
+    fx_file = resolve_path(path)
+    if not os.path.exists(fx_file):
+        return FxRates(pd.DataFrame(columns=list(FX_SCHEMA)))
+    return FxRates(read_table(fx_file, schema=FX_SCHEMA))
+
+
+# Lookups
+
+def _days(dates):
+    """Dates (strings, datetimes or arrays of them) -> int64 days since 1970-01-01."""
+
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+class FxRates:
+    """
+    Indexed daily FX series for rate, average and volatility lookups.
+
+    Each currency is held as sorted day numbers and rates, with prefix sums
+    of the rates and of the daily log returns and their squares. A lookup
+    is then one or two binary searches (np.searchsorted) plus O(1)
+    arithmetic, whatever the date range. Dates may be scalars or arrays;
+    array inputs give array outputs.
+
+    Parameters:
+        rates: Long table with currency, date and rate columns (as stored
+               by ingest_fx())
+    """
+
+    def __init__(self, rates):
+        self._series = {}
+        if len(rates) == 0:
+            return
+
+        rates = rates.sort_values(["currency", "date"], kind="stable")
+        currency = rates["currency"].astype(str).to_numpy()
+        days = rates["date"].to_numpy(dtype="datetime64[D]").astype(np.int64)
+        values = rates["rate"].to_numpy(dtype=np.float64)
+
+        bounds = np.flatnonzero(currency[1:] != currency[:-1]) + 1
+        for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(currency)]):
+            series_days, series_rates = days[lo:hi], values[lo:hi]
+            returns = np.diff(np.log(series_rates))
+            self._series[currency[lo]] = (
+                series_days,
+                series_rates,
+                np.r_[0.0, np.cumsum(series_rates)],
+                np.r_[0.0, np.cumsum(returns)],
+                np.r_[0.0, np.cumsum(returns * returns)],
+            )
+
+    @property
+    def currencies(self):
+        return sorted(self._series)
+
+    def _get(self, currency):
+        try:
+            return self._series[currency]
+        except KeyError:
+            raise KeyError(f"No FX series for {currency}") from None
+
+    def series(self, currency):
+        """Sorted day numbers (days since 1970-01-01) and rates for a currency."""
+
+        days, rates = self._get(currency)[:2]
+        return days, rates
+
+    def date_range(self, currency):
+        """First and last observation dates for a currency."""
+
+        days = self._get(currency)[0]
+        return np.datetime64(int(days[0]), "D"), np.datetime64(int(days[-1]), "D")
+
+    def rate(self, currency, date):
+        """
+        Rate on a date, or on the last business day before it (weekends and
+        holidays have no fixing). NaN before the first observation.
+        """
+
+        days, rates = self._get(currency)[:2]
+        idx = np.searchsorted(days, _days(date), side="right") - 1
+        if idx.ndim == 0:
+            return float(rates[idx]) if idx >= 0 else np.nan
+        return np.where(idx >= 0, rates[np.maximum(idx, 0)], np.nan)
+
+    def average(self, currency, start, end):
+        """Mean of the daily fixings in [start, end]; NaN if there are none."""
+
+        days, _, cum_rates = self._get(currency)[:3]
+        lo = np.searchsorted(days, _days(start), side="left")
+        hi = np.searchsorted(days, _days(end), side="right")
+        count = hi - lo
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result = np.where(count > 0, (cum_rates[hi] - cum_rates[lo]) / count, np.nan)
+        return result if result.ndim else float(result)
+
+    def volatility(self, currency, end, window=DEFAULT_VOL_WINDOW, annualise=True):
+        """
+        Realised volatility of daily log returns over the last window
+        returns up to end (sample standard deviation). NaN with fewer
+        than two returns.
+        """
+
+        days, _, _, cum_ret, cum_sq = self._get(currency)
+        # Returns are numbered by the fixing they end on (1..n-1)
+        hi = np.searchsorted(days, _days(end), side="right") - 1
+        hi = np.maximum(hi, 0)
+        lo = np.maximum(hi - window, 0)
+        count = hi - lo
+
+        total = cum_ret[hi] - cum_ret[lo]
+        total_sq = cum_sq[hi] - cum_sq[lo]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            variance = (total_sq - total * total / count) / (count - 1)
+        result = np.where(count >= 2, np.sqrt(np.maximum(variance, 0.0)), np.nan)
+        if annualise:
+            result = result * np.sqrt(TRADING_DAYS)
+        return result if result.ndim else float(result)
+
+    def typical_move(self, currency, end, horizon=DEFAULT_HORIZON, window=DEFAULT_VOL_WINDOW):
+        """One-standard-deviation move over horizon trading days, from realised volatility."""
+
+        daily = self.volatility(currency, end, window, annualise=False)
+        return daily * np.sqrt(horizon)
+
+    def shock(self, currency, start, end):
+        """
+        FX shock between two dates as used by the margin model: the change
+        in the GBP cost of goods priced in currency (positive = weaker GBP).
+        Zero for GBP.
+        """
+
+        if currency == BASE_CURRENCY:
+            shape = np.broadcast(_days(start), _days(end)).shape
+            return np.zeros(shape) if shape else 0.0
+        return self.rate(currency, start) / self.rate(currency, end) - 1
+
+    def summary(self, window=DEFAULT_VOL_WINDOW):
+        """One row per currency: date range, latest rate and realised volatility."""
+
+        rows = []
+        for currency in self.currencies:
+            first, last = self.date_range(currency)
+            rows.append({
+                "currency": currency,
+                "first_date": first,
+                "last_date": last,
+                "observations": len(self._get(currency)[0]),
+                "latest_rate": self.rate(currency, last),
+                "volatility_pct": self.volatility(currency, last, window) * 100,
+            })
+        return pd.DataFrame(rows)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load Bank of England FX exports into the FX store")
+    parser.add_argument("inputs", nargs="*", default=[RAW_FX_FILE], help="BoE CSV exports")
+    parser.add_argument("--output", default=FX_FILE, help="FX store path")
+    parser.add_argument("--replace", action="store_true", help="Rebuild the store instead of merging")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rates = ingest_fx(args.inputs, args.output, replace=args.replace)
+
+    print(f"Saved {len(rates):,} FX observations → {args.output}")
+    print(FxRates(rates).summary().to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# hmrc.py
+# Loading and cleaning of the HMRC import extract, shared by data_merge and trend_analysis
+
+from scripts.hs_codes import hs2_chapters, sitc_names_for_sections, sitc_sections_for_hs2
+from scripts.stage_metrics import instrumented
+from scripts.storage import HMRC_SCHEMA, apply_schema, iter_table, resolve_path
+
+HMRC_FILE = "data/processed/hmrc_cleaned.csv"
+
+
+def normalize_columns(df):
+    """Standardise column names to lowercase with underscores."""
+    df.columns = (
+        df.columns
+        .str.strip()
+        .str.lower()
+        .str.replace(" ", "_")
+        .str.replace("-", "_")
+    )
+    return df
+
+
+def iter_hmrc_chunks(chunksize, path=None):
+    """Stream an HMRC file (default HMRC_FILE) in chunks of at most chunksize rows."""
+    path = path or resolve_path(HMRC_FILE)
+    for chunk in iter_table(path, chunksize, schema=HMRC_SCHEMA):
+        yield apply_schema(normalize_columns(chunk), HMRC_SCHEMA)
+
+
+@instrumented()
+def prepare_hmrc(hmrc, verbose=True):
+    """Prepare HMRC data - extract HS2 chapters and map to SITC."""
+    if verbose:
+        print("\n" + "=" * 60)
+        print("PREPARING HMRC DATA")
+        print("=" * 60)
+    
+    # Rename partner_country to country_code
+    if "partner_country" in hmrc.columns:
+        hmrc = hmrc.rename(columns={"partner_country": "country_code"})
+    
+    # Remove bad country codes
+    bad_codes = ["YY", "ZZ", "XX", "", "UNK"]
+    original_len = len(hmrc)
+    hmrc = hmrc[~hmrc["country_code"].isin(bad_codes)]
+    hmrc = hmrc[hmrc["country_code"].notna()]
+    if verbose:
+        print(f"Removed {original_len - len(hmrc):,} rows with invalid country codes")
+    
+    # Extract HS2 chapter (first 2 digits of commodity code)
+    hmrc["hs2_chapter"] = hs2_chapters(hmrc["commodity"])
+    
+    # Map to SITC section
+    hmrc["sitc_section"] = sitc_sections_for_hs2(hmrc["hs2_chapter"])
+    hmrc["sitc_name"] = sitc_names_for_sections(hmrc["sitc_section"])
+    
+    if verbose:
+        print(f"HMRC unique HS2 chapters: {hmrc['hs2_chapter'].nunique()}")
+        print(f"HMRC unique SITC sections: {hmrc['sitc_section'].nunique()}")
+        print(f"HMRC year range: {hmrc['year'].min()} - {hmrc['year'].max()}")
+    
+    return hmrc
+
+
+def prepare_hmrc_chunk(chunk):
+    """
+    prepare_hmrc() for one chunk of a streamed file, without the summary
+    output or a stage record per chunk (the stage streaming the file is
+    recorded once instead).
+    """
+    return prepare_hmrc.__wrapped__(chunk, verbose=False)
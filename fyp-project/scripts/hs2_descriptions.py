@@ -0,0 +1,39 @@
+# hs2_descriptions.py
+# HS2 chapter descriptions shared by the dashboard and the API
+
+# HS2 chapter descriptions (codes 01-99)
+HS2_DESCRIPTIONS = {
+    1: "Live animals", 2: "Meat and edible meat offal", 3: "Fish and crustaceans",
+    4: "Dairy produce, eggs, honey", 5: "Products of animal origin", 6: "Live trees and plants",
+    7: "Edible vegetables", 8: "Edible fruit and nuts", 9: "Coffee, tea, spices",
+    10: "Cereals", 11: "Milling products, malt, starches", 12: "Oil seeds, miscellaneous grains",
+    13: "Lac, gums, resins", 14: "Vegetable plaiting materials", 15: "Animal or vegetable fats",
+    16: "Preparations of meat or fish", 17: "Sugars and sugar confectionery", 18: "Cocoa and cocoa preparations",
+    19: "Preparations of cereals", 20: "Preparations of vegetables, fruit", 21: "Miscellaneous edible preparations",
+    22: "Beverages, spirits and vinegar", 23: "Food industry residues", 24: "Tobacco and substitutes",
+    25: "Salt, sulphur, earth and stone", 26: "Ores, slag and ash", 27: "Mineral fuels, oils",
+    28: "Inorganic chemicals", 29: "Organic chemicals", 30: "Pharmaceutical products",
+    31: "Fertilisers", 32: "Tanning or dyeing extracts", 33: "Essential oils and perfumery",
+    34: "Soap, washing preparations", 35: "Albuminoidal substances, glues", 36: "Explosives, pyrotechnics",
+    37: "Photographic goods", 38: "Miscellaneous chemical products", 39: "Plastics and articles",
+    40: "Rubber and articles", 41: "Raw hides, skins and leather", 42: "Articles of leather",
+    43: "Furskins and artificial fur", 44: "Wood and articles of wood", 45: "Cork and articles",
+    46: "Manufactures of straw", 47: "Pulp of wood", 48: "Paper and paperboard",
+    49: "Printed books, newspapers", 50: "Silk", 51: "Wool and fine animal hair",
+    52: "Cotton", 53: "Other vegetable textile fibres", 54: "Man-made filaments",
+    55: "Man-made staple fibres", 56: "Wadding, felt and nonwovens", 57: "Carpets and textile floor coverings",
+    58: "Special woven fabrics", 59: "Impregnated textile fabrics", 60: "Knitted or crocheted fabrics",
+    61: "Knitted apparel and accessories", 62: "Woven apparel and accessories", 63: "Other made up textile articles",
+    64: "Footwear", 65: "Headgear", 66: "Umbrellas, walking sticks",
+    67: "Prepared feathers", 68: "Articles of stone, plaster, cement", 69: "Ceramic products",
+    70: "Glass and glassware", 71: "Precious stones and metals", 72: "Iron and steel",
+    73: "Articles of iron or steel", 74: "Copper and articles", 75: "Nickel and articles",
+    76: "Aluminium and articles", 78: "Lead and articles", 79: "Zinc and articles",
+    80: "Tin and articles", 81: "Other base metals", 82: "Tools of base metal",
+    83: "Miscellaneous articles of base metal", 84: "Nuclear reactors, boilers, machinery", 85: "Electrical machinery",
+    86: "Railway locomotives", 87: "Vehicles other than railway", 88: "Aircraft and spacecraft",
+    89: "Ships and boats", 90: "Optical and medical instruments", 91: "Clocks and watches",
+    92: "Musical instruments", 93: "Arms and ammunition", 94: "Furniture and bedding",
+    95: "Toys, games and sports equipment", 96: "Miscellaneous manufactured articles", 97: "Works of art and antiques",
+    99: "Special transactions"
+}
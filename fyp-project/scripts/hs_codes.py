@@ -0,0 +1,240 @@
+# hs_codes.py
+# HS2 chapter / SITC section mappings and vectorised code helpers shared by the pipeline and batch pricing
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# HMRC uses HS chapters (01-99), ONS uses SITC sections (0-9)
+# This maps each HS2 chapter to its parent SITC section
+
+HS2_TO_SITC = {
+    # Section 0: Food and live animals
+    1: 0, 2: 0, 3: 0, 4: 0, 5: 0, 6: 0, 7: 0, 8: 0, 9: 0, 10: 0,
+    11: 0, 12: 0, 13: 0, 14: 0, 15: 0, 16: 0, 17: 0, 18: 0, 19: 0, 20: 0,
+    21: 0, 22: 1, 23: 0, 24: 1,  # 22, 24 are beverages/tobacco
+    # Section 2: Crude materials
+    25: 2, 26: 2, 27: 3,  # 27 is fuels
+    # Section 5: Chemicals
+    28: 5, 29: 5, 30: 5, 31: 5, 32: 5, 33: 5, 34: 5, 35: 5, 36: 5, 37: 5, 38: 5,
+    # Section 6: Manufactured goods (basic)
+    39: 6, 40: 6, 41: 2, 42: 8, 43: 8,  # 42-43 are misc manufactures (leather goods)
+    44: 6, 45: 6, 46: 6, 47: 6, 48: 6, 49: 8, 50: 6,
+    51: 6, 52: 6, 53: 6, 54: 6, 55: 6, 56: 6, 57: 6, 58: 6, 59: 6,
+    60: 6, 61: 8, 62: 8, 63: 8, 64: 8, 65: 8, 66: 6, 67: 6,
+    68: 6, 69: 6, 70: 6, 71: 8, 72: 6, 73: 6, 74: 6, 75: 6, 76: 6,
+    78: 6, 79: 6, 80: 6, 81: 6, 82: 6, 83: 6,
+    # Section 7: Machinery and transport equipment
+    84: 7, 85: 7, 86: 7, 87: 7, 88: 7, 89: 7,
+    # Section 8: Miscellaneous manufactured articles
+    90: 8, 91: 8, 92: 8, 93: 8, 94: 8, 95: 8, 96: 8, 97: 8,
+    # Section 9: Other
+    99: 9,
+}
+
+# SITC section names
+SITC_NAMES = {
+    0: "0 Food & live animals",
+    1: "1 Beverages & tobacco",
+    2: "2 Crude materials",
+    3: "3 Fuels",
+    4: "4 Animal & vegetable oils",
+    5: "5 Chemicals",
+    6: "6 Manufactured goods",
+    7: "7 Machinery & transport equipment",
+    8: "8 Miscellaneous manufactures",
+    9: "9 Other commodities",
+}
+
+# Lookup arrays for vectorised mapping: index = HS2 chapter / SITC section.
+# -1 marks chapters with no SITC section (e.g. 77, 98).
+HS2_TO_SITC_ARRAY = np.full(100, -1, dtype=np.int8)
+for _hs2, _sitc in HS2_TO_SITC.items():
+    HS2_TO_SITC_ARRAY[_hs2] = _sitc
+
+SITC_NAME_ARRAY = np.array([SITC_NAMES.get(i) for i in range(10)], dtype=object)
+
+
+def extract_country_code_from_name(country_name):
+    """Extract country code from ONS format like 'AE United Arab Emirates' -> 'AE'"""
+    if pd.isna(country_name):
+        return None
+    parts = str(country_name).split(' ', 1)
+    if len(parts) >= 1 and len(parts[0]) == 2 and parts[0].isupper():
+        return parts[0]
+    return None
+
+
+def get_hs2_chapter(commodity_code):
+    """Extract HS2 chapter from a commodity code like 1012100 -> 10 (scalar reference)."""
+    try:
+        code = int(commodity_code)
+        if code < 100:
+            return code
+        return int(str(code)[:2])
+    except (ValueError, TypeError):
+        return None
+
+
+def extract_main_sitc_section(sitc_name):
+    """Extract main SITC section (0-9) from commodity name like '01 Meat' -> 0"""
+    if pd.isna(sitc_name):
+        return None
+    
+    name_str = str(sitc_name).strip()
+    
+    # Skip totals
+    if name_str.startswith('T ') or name_str == 'T Total':
+        return None
+    
+    # Get first digit from leading number
+    match = re.match(r'^(\d+)', name_str)
+    if match:
+        return int(match.group(1)[0])
+    return None
+
+
+def _map_unique(series, func):
+    """
+    Apply a vectorised mapping once per distinct value of a text/categorical Series.
+    
+    Code columns repeat a few thousand values millions of times, so mapping
+    the distinct values and then indexing by code is much cheaper than
+    string operations on every row. Numeric Series are mapped directly.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        uniques = pd.Series(series.cat.categories)
+    elif pd.api.types.is_numeric_dtype(series.dtype):
+        return func(series)
+    else:
+        codes, uniques = pd.factorize(series)
+        uniques = pd.Series(uniques)
+    
+    mapped = func(uniques)
+    # Code -1 (missing) has no matching label, so reindex leaves it missing
+    result = mapped.reindex(codes)
+    result.index = series.index
+    return result
+
+
+def _as_int_series(values, valid, index):
+    """Integer Series where all values are valid, otherwise float64 with NaN."""
+    if valid.all():
+        return pd.Series(values.astype("int64"), index=index)
+    return pd.Series(np.where(valid, values, np.nan), index=index)
+
+
+def hs2_chapters(commodity):
+    """
+    Vectorised get_hs2_chapter() over a Series of commodity codes.
+    
+    Matches the scalar rules: numbers are truncated to int, strings must be
+    plain integers, codes >= 100 keep their first two digits, and anything
+    unparseable becomes missing.
+    """
+    return _map_unique(commodity, _hs2_chapters)
+
+
+def _hs2_chapters(commodity):
+    kind = pd.api.types.infer_dtype(commodity, skipna=True)
+    
+    if kind in ("integer", "floating", "mixed-integer-float", "boolean", "empty"):
+        codes = pd.to_numeric(commodity, errors="coerce").to_numpy(dtype=np.float64)
+    elif kind == "string":
+        text = commodity.astype("string").str.strip()
+        is_int = text.str.fullmatch(r"[+-]?\d+").fillna(False).to_numpy(dtype=bool)
+        codes = pd.to_numeric(text.where(is_int), errors="coerce").to_numpy(dtype=np.float64)
+    else:
+        # Mixed Python objects: fall back to the scalar rule
+        return commodity.apply(get_hs2_chapter)
+    
+    valid = np.isfinite(codes)
+    codes = np.trunc(np.where(valid, codes, 0))
+    
+    # Keep the first two digits of longer codes
+    long_code = codes >= 100
+    while long_code.any():
+        codes[long_code] = np.floor(codes[long_code] / 10)
+        long_code = codes >= 100
+    
+    return _as_int_series(codes, valid, commodity.index)
+
+
+def hs2_chapters_from_codes(hs_codes):
+    """
+    HS2 chapter of each HS code in a Series, reading the code as text.
+
+    Unlike hs2_chapters(), which keeps the HMRC extract's integer rule,
+    leading zeros count: "0302" is chapter 3 and "01012100" chapter 1.
+    Codes come in pairs of digits, so an odd-length code has lost its
+    leading zero and is padded ("302" -> "0302"); this also recovers
+    codes that were read as integers. Dots and spaces ("0302.11") are
+    ignored, and anything else that is not all digits becomes missing.
+    """
+    return _map_unique(hs_codes, _hs2_chapters_from_codes)
+
+
+def _hs2_chapters_from_codes(hs_codes):
+    kind = pd.api.types.infer_dtype(hs_codes, skipna=True)
+
+    if kind in ("integer", "floating", "mixed-integer-float", "empty"):
+        values = pd.to_numeric(hs_codes, errors="coerce").to_numpy(dtype=np.float64)
+        whole = np.isfinite(values) & (values >= 0) & (values == np.trunc(values))
+        text = pd.Series(np.where(whole, values, 0).astype(np.int64), index=hs_codes.index).astype("string")
+        text = text.where(whole)
+    else:
+        text = hs_codes.astype("string").str.replace(r"[.\s]", "", regex=True)
+
+    is_code = text.str.fullmatch(r"\d+").fillna(False).to_numpy(dtype=bool)
+    text = text.where(text.str.len() % 2 == 0, "0" + text)
+    chapters = pd.to_numeric(text.str[:2].where(is_code), errors="coerce")
+    return _as_int_series(chapters.to_numpy(dtype=np.float64, na_value=np.nan), is_code, hs_codes.index)
+
+
+def sitc_sections_for_hs2(hs2):
+    """Vectorised HS2_TO_SITC lookup; unmapped or missing chapters become missing."""
+    values = hs2.to_numpy(dtype=np.float64, na_value=np.nan)
+    in_range = np.isfinite(values) & (values >= 0) & (values < 100)
+    idx = np.where(in_range, values, 0).astype(np.intp)
+    sections = HS2_TO_SITC_ARRAY[idx].astype(np.int64)
+    valid = in_range & (sections >= 0)
+    return _as_int_series(sections, valid, hs2.index)
+
+
+def sitc_names_for_sections(sections):
+    """Vectorised SITC_NAMES lookup as a categorical; unknown or missing sections become missing."""
+    values = sections.to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = np.isfinite(values) & (values >= 0) & (values < len(SITC_NAME_ARRAY))
+    codes = np.where(valid, values, -1).astype(np.int8)
+    names = pd.Categorical.from_codes(codes, categories=list(SITC_NAME_ARRAY))
+    return pd.Series(names, index=sections.index)
+
+
+def country_codes_from_names(country_names):
+    """Vectorised extract_country_code_from_name()."""
+    return _map_unique(country_names, _country_codes_from_names)
+
+
+def _country_codes_from_names(country_names):
+    present = country_names.notna()
+    first = country_names.astype(str).str.split(" ", n=1).str[0]
+    ok = present & (first.str.len() == 2) & first.str.isupper()
+    codes = np.full(len(first), None, dtype=object)
+    codes[ok.to_numpy()] = first[ok].to_numpy(dtype=object)
+    return pd.Series(codes, index=country_names.index)
+
+
+def main_sitc_sections(sitc_names):
+    """Vectorised extract_main_sitc_section()."""
+    return _map_unique(sitc_names, _main_sitc_sections)
+
+
+def _main_sitc_sections(sitc_names):
+    present = sitc_names.notna()
+    name = sitc_names.astype(str).str.strip()
+    is_total = name.str.startswith("T ") | (name == "T Total")
+    digit = pd.to_numeric(name.str.extract(r"^(\d)", expand=False), errors="coerce")
+    valid = (present & ~is_total & digit.notna()).to_numpy()
+    return _as_int_series(digit.to_numpy(dtype=np.float64, na_value=np.nan), valid, sitc_names.index)
@@ -1,6 +1,13 @@
 # margin_model.py
 # Core calculation for landed cost and profit margin
 
+import numpy as np
+import pandas as pd
+
+# Safety cap: landed cost may not exceed 200% of import value
+MAX_COST_MULTIPLIER = 2.0
+
+
 def compute_margin(
     import_value_gbp: float,
     revenue_gbp: float,
@@ -37,7 +44,6 @@ def compute_margin(
     landed_cost = goods_cost + shipping_cost + insurance_cost + tariff_cost
     
     # Safety cap: limit landed cost to 200% of import value
-    MAX_COST_MULTIPLIER = 2.0
     landed_cost = min(landed_cost, import_value_gbp * MAX_COST_MULTIPLIER)
     
     # Calculate profit (capped at -100% of import value)
@@ -60,3 +66,135 @@ def compute_margin(
         "profit": round(profit, 2),
         "margin_pct": round(margin_pct, 2) if margin_pct is not None else None,
     }
+
+
+def round_money(values):
+    """
+    Round an array to 2 decimal places exactly like Python's built-in round().
+    
+    NumPy rounds x * 100 to the nearest integer, which can disagree with
+    round(x, 2) when the scaled value lands within one ulp of a .5 tie.
+    Those rare elements fall back to round() so results stay bit-identical
+    to compute_margin().
+    """
+    
+    values = np.asarray(values, dtype=np.float64)
+    shape = values.shape
+    # The in-place ufuncs below need array outputs, which 0-d inputs are not
+    values = np.atleast_1d(values)
+    scaled = values * 100
+    rounded = np.rint(scaled)
+    
+    # Elements whose scaled value is too close to a tie to trust rint()
+    with np.errstate(invalid="ignore"):
+        distance = np.abs(scaled - rounded)
+        np.subtract(distance, 0.5, out=distance)
+        np.abs(distance, out=distance)
+        np.abs(scaled, out=scaled)
+        ambiguous = distance <= scaled * 2.0 ** -50
+        ambiguous |= scaled >= 2.0 ** 51
+    
+    np.divide(rounded, 100, out=rounded)
+    if ambiguous.any():
+        idx = np.nonzero(ambiguous)
+        rounded[idx] = [round(float(v), 2) for v in values[idx]]
+    
+    return rounded.reshape(shape)
+
+
+def compute_margin_batch(
+    import_value_gbp,
+    revenue_gbp,
+    fx_shock_pct=0.0,
+    shipping_pct=0.0,
+    insurance_pct=0.0,
+    tariff_pct=0.0,
+):
+    """
+    Vectorised version of compute_margin() for many scenarios at once.
+    
+    Inputs may be scalars or NumPy arrays and are broadcast together, so a
+    column of import values can be combined with a single tariff rate.
+    Applies the same 200% landed-cost cap, -100% profit floor and margin
+    floor as compute_margin(), and rounds identically.
+    
+    Returns:
+        Dictionary of float64 arrays with the same keys as compute_margin().
+        margin_pct is NaN where revenue is zero or negative (None in the
+        scalar version).
+    """
+    
+    import_value, revenue, fx, shipping, insurance, tariff = np.broadcast_arrays(
+        *(np.asarray(v, dtype=np.float64) for v in (
+            import_value_gbp, revenue_gbp, fx_shock_pct,
+            shipping_pct, insurance_pct, tariff_pct,
+        ))
+    )
+    
+    goods_cost = import_value * (1 + fx)
+    shipping_cost = goods_cost * shipping
+    insurance_cost = goods_cost * insurance
+    tariff_cost = goods_cost * tariff
+    
+    landed_cost = goods_cost + shipping_cost + insurance_cost + tariff_cost
+    
+    # Same cap and floors as the scalar model (np.where mirrors min()/max())
+    cost_cap = import_value * MAX_COST_MULTIPLIER
+    landed_cost = np.where(cost_cap < landed_cost, cost_cap, landed_cost)
+    
+    profit = revenue - landed_cost
+    profit_floor = -import_value
+    profit = np.where(profit_floor > profit, profit_floor, profit)
+    
+    has_revenue = revenue > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margin_pct = (profit / revenue) * 100
+    margin_pct = np.where(-100 > margin_pct, -100.0, margin_pct)
+    margin_pct = np.where(has_revenue, margin_pct, np.nan)
+    
+    return {
+        "goods_cost": round_money(goods_cost),
+        "shipping_cost": round_money(shipping_cost),
+        "insurance_cost": round_money(insurance_cost),
+        "tariff_cost": round_money(tariff_cost),
+        "landed_cost": round_money(landed_cost),
+        "profit": round_money(profit),
+        "margin_pct": round_money(margin_pct),
+    }
+
+
+# Column names accepted by compute_margin_frame(), mapped to keyword arguments
+BATCH_INPUT_COLUMNS = (
+    "import_value_gbp",
+    "revenue_gbp",
+    "fx_shock_pct",
+    "shipping_pct",
+    "insurance_pct",
+    "tariff_pct",
+)
+
+
+def compute_margin_frame(df, **defaults):
+    """
+    Run compute_margin_batch() over the columns of a DataFrame.
+    
+    Cost columns missing from df are taken from keyword defaults, e.g.
+    compute_margin_frame(book, tariff_pct=0.02).
+    
+    Returns: DataFrame with one result column per compute_margin() key,
+    aligned to df's index
+    """
+    
+    kwargs = {}
+    for col in BATCH_INPUT_COLUMNS:
+        if col in df.columns:
+            kwargs[col] = df[col].to_numpy(dtype=np.float64)
+        elif col in defaults:
+            kwargs[col] = defaults[col]
+    
+    missing = {"import_value_gbp", "revenue_gbp"} - set(kwargs)
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}")
+    
+    result = compute_margin_batch(**kwargs)
+    return pd.DataFrame(result, index=df.index)
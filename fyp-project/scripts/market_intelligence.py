@@ -0,0 +1,521 @@
+# market_intelligence.py
+# Precomputed HS2 x country x year import benchmarks, market outlook and incremental alerts
+#
+# Usage: python -m scripts.market_intelligence [--hmrc FILE ...] [--hs2 27 --value 250000]
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from scripts.pipeline_cache import CACHE_FOLDER
+from scripts.stage_metrics import instrumented
+from scripts.storage import (
+    BENCHMARK_SCHEMA,
+    DEFAULT_FORMATS,
+    apply_schema,
+    read_table,
+    resolve_path,
+    write_outputs,
+)
+from scripts.trend_analysis import DEFAULT_CHUNKSIZE, SeriesPanel, hmrc_panel, log_changes
+
+BENCHMARK_FILE = "data/output/market_benchmarks.csv"
+OUTLOOK_FILE = "data/output/market_outlook.csv"
+ALERTS_FILE = "data/output/market_alerts.csv"
+ALERT_STATE_FILE = os.path.join(CACHE_FOLDER, "market_alerts.pkl")
+
+# Alert thresholds; each period is compared with the same period a year earlier
+ALERT_THRESHOLDS = {
+    "supplier_change_pct": 50.0,   # supplier import value change
+    "min_share_pct": 1.0,          # ignore supplier moves below this market share
+    "share_shift_pts": 10.0,       # supplier market share change
+    "market_change_pct": 25.0,     # HS2 total import value change
+}
+
+ALERT_COLUMNS = ["period", "hs2_chapter", "country_code", "alert", "current", "previous", "change", "message"]
+
+
+# Benchmark tables
+
+def annual_panel(panel):
+    """Sum a monthly panel to calendar years (the latest year may be year to date)."""
+
+    if panel.freq == 1:
+        return panel
+    years = panel.periods // panel.freq
+    values = pd.DataFrame(panel.values.T).groupby(years).sum(min_count=1)
+    return SeriesPanel(panel.keys, values.index.to_numpy(), values.to_numpy().T, freq=1)
+
+
+def year_months(panel):
+    """Months of each year of annual_panel(panel) that the data covers (12 for annual panels)."""
+
+    if panel.freq == 1:
+        return np.full(len(panel.periods), 12, dtype=np.int64)
+    return pd.Series(panel.periods // panel.freq).groupby(panel.periods // panel.freq).size().to_numpy()
+
+
+def annual_growth(panel):
+    """
+    Year-on-year growth (%) of annual_panel(panel).
+
+    A year the data only partly covers (year to date) is compared with the
+    same months a year earlier, not with the whole previous year; years
+    whose months a year earlier are not all in the data get NaN.
+    """
+
+    annual = annual_panel(panel)
+    if panel.freq == 1 or len(panel.periods) == 0:
+        return np.expm1(log_changes(annual.values)) * 100
+
+    lag = panel.freq
+    earlier = np.full(panel.values.shape, np.nan)
+    earlier[:, lag:] = panel.values[:, :-lag]
+    years = panel.periods // panel.freq
+    previous = pd.DataFrame(earlier.T).groupby(years).sum(min_count=1).to_numpy().T
+    comparable = pd.Series(panel.periods - lag >= panel.periods[0]).groupby(years).all().to_numpy()
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        growth = np.where(
+            (annual.values > 0) & (previous > 0), np.expm1(np.log(annual.values / previous)) * 100, np.nan
+        )
+    growth[:, ~comparable] = np.nan
+    return growth
+
+
+def benchmark_table(panel):
+    """
+    Per HS2 chapter, year and supplier country: import value, market share,
+    rank, year-on-year growth and percentile among the chapter's suppliers.
+    months is the number of months of the year the data covers, so a
+    year-to-date total (months < 12) can be told from a whole year.
+
+    The table is sorted by hs2_chapter, year and rank, which is what
+    MarketBenchmarks indexes on.
+
+    Parameters:
+        panel: SeriesPanel keyed by country_code and hs2_chapter (see
+               trend_analysis.hmrc_panel); monthly panels are summed to years
+
+    Returns: DataFrame with hs2_chapter, year, months, country_code, value,
+    share_pct, rank, percentile, growth_pct and suppliers columns
+    """
+
+    annual = annual_panel(panel)
+    table = annual.to_long({"value": annual.values, "growth_pct": annual_growth(panel)})
+    table = table[table["value"] > 0].copy()
+    table["year"] = table.pop("period").astype(np.int64)
+    table["months"] = pd.Series(year_months(panel), index=annual.periods).reindex(table["year"]).to_numpy()
+    table["hs2_chapter"] = table["hs2_chapter"].astype(np.int64)
+    table["country_code"] = table["country_code"].astype(str)
+
+    market = table.groupby(["hs2_chapter", "year"])["value"]
+    table["share_pct"] = table["value"] / market.transform("sum") * 100
+    table["rank"] = market.rank(method="min", ascending=False).astype(np.int64)
+    # Share of the chapter's suppliers importing no more than this one
+    table["percentile"] = market.rank(method="max", pct=True) * 100
+    table["suppliers"] = market.transform("size")
+
+    columns = ["hs2_chapter", "year", "months", "country_code", "value", "share_pct", "rank", "percentile", "growth_pct", "suppliers"]
+    table = table.sort_values(["hs2_chapter", "year", "rank", "country_code"], kind="stable")[columns]
+    return apply_schema(table.reset_index(drop=True), BENCHMARK_SCHEMA)
+
+
+def market_outlook(benchmarks):
+    """
+    Per HS2 chapter and year: total imports, growth, 3-year CAGR, number of
+    suppliers, concentration (HHI, 0-10,000) and the leading supplier.
+    Growth is only given against a year covering the same months, so a
+    year-to-date total is not compared with a whole year.
+    """
+
+    table = benchmarks.astype({"country_code": str})
+    grouped = table.groupby(["hs2_chapter", "year"], sort=True)
+    outlook = grouped.agg(
+        months=("months", "first"),
+        total_value=("value", "sum"),
+        suppliers=("value", "size"),
+        top_country=("country_code", "first"),
+        top_share_pct=("share_pct", "first"),
+    )
+    outlook["hhi"] = (table["share_pct"] ** 2).groupby([table["hs2_chapter"], table["year"]]).sum()
+    outlook = outlook.reset_index()
+
+    # Growth only against the previous calendar year, not across gaps
+    by_year = outlook.set_index(["hs2_chapter", "year"])[["total_value", "months"]]
+    for lag, name in ((1, "growth_pct"), (3, "cagr_3y_pct")):
+        earlier = by_year.reindex(pd.MultiIndex.from_arrays([outlook["hs2_chapter"], outlook["year"] - lag]))
+        ratio = outlook["total_value"].to_numpy() / earlier["total_value"].to_numpy()
+        ratio[outlook["months"].to_numpy() != earlier["months"].to_numpy()] = np.nan
+        outlook[name] = (ratio ** (1 / lag) - 1) * 100
+    return outlook
+
+
+def benchmark_data_version(path=BENCHMARK_FILE):
+    """Resolved path and modification time of the benchmark table (mtime is None if missing)."""
+
+    benchmark_file = resolve_path(path)
+    if os.path.exists(benchmark_file):
+        return benchmark_file, os.path.getmtime(benchmark_file)
+    return benchmark_file, None
+
+
+def load_market_benchmarks(path=BENCHMARK_FILE):
+    """MarketBenchmarks for the stored table (columnar copy preferred); empty if missing."""
+
+    benchmark_file = resolve_path(path)
+    if not os.path.exists(benchmark_file):
+        return MarketBenchmarks(pd.DataFrame(columns=list(BENCHMARK_SCHEMA)))
+    return MarketBenchmarks(read_table(benchmark_file, schema=BENCHMARK_SCHEMA))
+
+
+class MarketBenchmarks:
+    """
+    Indexed benchmark table for dashboard lookups.
+
+    Rows are held sorted by HS2 chapter, year and rank, with the start and
+    end offset of every (chapter, year) group. A query is a binary search
+    for the group plus a slice or a second binary search within it, so no
+    lookup touches more than one market's suppliers.
+
+    Lookups without a year use the latest complete year, so a year-to-date
+    total from monthly data is not reported as the market (see latest_year).
+
+    Parameters:
+        benchmarks: Output of benchmark_table()
+    """
+
+    def __init__(self, benchmarks):
+        table = benchmarks.sort_values(["hs2_chapter", "year", "rank"], kind="stable").reset_index(drop=True)
+        self._table = table
+        hs2 = table["hs2_chapter"].to_numpy(dtype=np.int64)
+        year = table["year"].to_numpy(dtype=np.int64)
+        group = hs2 * 10_000 + year
+
+        bounds = np.flatnonzero(group[1:] != group[:-1]) + 1
+        self._starts = np.r_[0, bounds].astype(np.int64) if len(group) else np.empty(0, np.int64)
+        self._stops = np.r_[bounds, len(group)].astype(np.int64) if len(group) else np.empty(0, np.int64)
+        self._groups = group[self._starts]
+        self._values = table["value"].to_numpy(dtype=np.float64)
+        self._totals = np.add.reduceat(self._values, self._starts) if len(group) else np.empty(0)
+        # Tables written before the months column were all whole years
+        months = table["months"].to_numpy(dtype=np.int64) if "months" in table else np.full(len(table), 12)
+        self._months = months[self._starts] if len(group) else np.empty(0, np.int64)
+
+    def __len__(self):
+        return len(self._table)
+
+    def _chapter(self, hs2):
+        """(start, stop) group indices for an HS2 chapter."""
+
+        lo = np.searchsorted(self._groups, int(hs2) * 10_000)
+        hi = np.searchsorted(self._groups, (int(hs2) + 1) * 10_000)
+        return lo, hi
+
+    def years(self, hs2):
+        """Years with benchmark data for an HS2 chapter."""
+
+        lo, hi = self._chapter(hs2)
+        return (self._groups[lo:hi] % 10_000).tolist()
+
+    def latest_year(self, hs2):
+        """
+        Latest year the data covers in full for an HS2 chapter, else the
+        latest (year-to-date) year; None if the chapter has no data.
+        """
+
+        lo, hi = self._chapter(hs2)
+        if lo == hi:
+            return None
+        complete = np.flatnonzero(self._months[lo:hi] == 12)
+        idx = lo + complete[-1] if len(complete) else hi - 1
+        return int(self._groups[idx] % 10_000)
+
+    def _group(self, hs2, year=None):
+        """Group index for (hs2, year), defaulting to latest_year(); None if absent."""
+
+        year = self.latest_year(hs2) if year is None else year
+        if year is None:
+            return None
+        key = int(hs2) * 10_000 + int(year)
+        idx = np.searchsorted(self._groups, key)
+        return idx if idx < len(self._groups) and self._groups[idx] == key else None
+
+    def market(self, hs2, year=None):
+        """
+        Market summary for an HS2 chapter: total imports, growth on the
+        previous year, number of suppliers and the leading supplier.
+        months < 12 marks a year-to-date total; growth is only given when
+        the previous year covers the same months.
+
+        Returns: Dictionary, or None if the chapter has no data
+        """
+
+        idx = self._group(hs2, year)
+        if idx is None:
+            return None
+        lo, hi = self._starts[idx], self._stops[idx]
+        year = int(self._groups[idx] % 10_000)
+        previous = self._group(hs2, year - 1)
+        if previous is not None and self._months[previous] != self._months[idx]:
+            previous = None
+        total = float(self._totals[idx])
+        shares = self._table["share_pct"].to_numpy()[lo:hi]
+        return {
+            "hs2_chapter": int(hs2),
+            "year": year,
+            "months": int(self._months[idx]),
+            "total_value": total,
+            "growth_pct": (total / self._totals[previous] - 1) * 100 if previous is not None else np.nan,
+            "suppliers": int(hi - lo),
+            "top_country": str(self._table["country_code"].iat[lo]),
+            "top_share_pct": float(shares[0]),
+            "hhi": float((shares ** 2).sum()),
+        }
+
+    def top_suppliers(self, hs2, year=None, n=5):
+        """The n largest supplier countries for an HS2 chapter and year."""
+
+        idx = self._group(hs2, year)
+        if idx is None:
+            return self._table.iloc[:0]
+        lo, hi = self._starts[idx], self._stops[idx]
+        return self._table.iloc[lo:min(lo + n, hi)]
+
+    def supplier(self, hs2, country, year=None):
+        """Benchmark row for one supplier country, or None."""
+
+        idx = self._group(hs2, year)
+        if idx is None:
+            return None
+        rows = self._table.iloc[self._starts[idx]:self._stops[idx]]
+        match = rows[rows["country_code"].astype(str) == country]
+        return match.iloc[0].to_dict() if len(match) else None
+
+    def position(self, import_value, hs2, year=None):
+        """
+        Where an import value sits in an HS2 market.
+
+        Returns: Dictionary with share_pct (of total UK imports), percentile
+        (share of supplier countries importing no more than import_value)
+        and rank_equivalent (the rank it would have among the suppliers),
+        or None if the chapter has no data
+        """
+
+        idx = self._group(hs2, year)
+        if idx is None:
+            return None
+        lo, hi = self._starts[idx], self._stops[idx]
+        # Values are descending within the group; count suppliers above import_value
+        above = int(np.searchsorted(-self._values[lo:hi], -float(import_value), side="left"))
+        n = int(hi - lo)
+        return {
+            "year": int(self._groups[idx] % 10_000),
+            "months": int(self._months[idx]),
+            "share_pct": float(import_value) / float(self._totals[idx]) * 100,
+            "percentile": (n - above) / n * 100,
+            "rank_equivalent": above + 1,
+            "suppliers": n,
+        }
+
+
+# Alerts
+
+def _hs2_totals(panel):
+    """(codes, totals): HS2 group code per series and (n_chapters, n_periods) totals."""
+
+    codes, _ = pd.factorize(panel.keys["hs2_chapter"])
+    totals = pd.DataFrame(panel.values).groupby(codes).sum(min_count=1).sort_index().to_numpy()
+    return codes, totals
+
+
+def evaluate_alerts(panel, since=None, thresholds=ALERT_THRESHOLDS):
+    """
+    Alerts for the periods after since, each compared with the same period
+    a year earlier (so monthly data are not flagged for seasonality).
+
+    Alerts:
+        supplier_surge / supplier_drop: a supplier's value changed by more
+            than supplier_change_pct (only suppliers with min_share_pct share)
+        share_shift: a supplier's market share moved by share_shift_pts or more
+        market_surge / market_drop: the chapter total changed by more than
+            market_change_pct
+        new_top_supplier: the chapter's largest supplier changed
+
+    Parameters:
+        panel: SeriesPanel keyed by country_code and hs2_chapter
+        since: Last period already evaluated (None = all periods)
+
+    Returns: DataFrame with ALERT_COLUMNS
+    """
+
+    lag = panel.freq
+    cols = np.arange(lag, len(panel.periods))
+    if since is not None:
+        cols = cols[panel.periods[cols] > since]
+    if len(cols) == 0 or len(panel.keys) == 0:
+        return pd.DataFrame(columns=ALERT_COLUMNS)
+
+    codes, totals = _hs2_totals(panel)
+    chapters = panel.keys["hs2_chapter"].to_numpy()
+    countries = panel.keys["country_code"].astype(str).to_numpy()
+    chapter_of = pd.Series(chapters).groupby(codes).first().sort_index().to_numpy()
+    labels = np.array(panel.period_labels(), dtype=object)
+
+    current, previous = panel.values[:, cols], panel.values[:, cols - lag]
+    market_now, market_before = totals[:, cols], totals[:, cols - lag]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        share_now = current / market_now[codes] * 100
+        share_before = previous / market_before[codes] * 100
+        change = (current / previous - 1) * 100
+        market_change = (market_now / market_before - 1) * 100
+
+    frames = []
+
+    def add(rows, periods, alert, now, before, delta, chapter, country, message):
+        if len(rows) == 0:
+            return
+        frames.append(pd.DataFrame({
+            "period": labels[cols[periods]],
+            "hs2_chapter": chapter,
+            "country_code": country,
+            "alert": alert,
+            "current": now,
+            "previous": before,
+            "change": delta,
+            "message": message,
+        }))
+
+    big = np.fmax(share_now, share_before) >= thresholds["min_share_pct"]
+    for alert, mask in (
+        ("supplier_surge", (change >= thresholds["supplier_change_pct"]) & big),
+        ("supplier_drop", (change <= -thresholds["supplier_change_pct"]) & big),
+    ):
+        rows, periods = np.nonzero(mask)
+        delta = change[rows, periods]
+        add(rows, periods, alert, current[rows, periods], previous[rows, periods], delta,
+            chapters[rows], countries[rows],
+            [f"{c} HS {h:02d} imports {d:+.0f}% on a year earlier" for c, h, d in zip(countries[rows], chapters[rows], delta)])
+
+    with np.errstate(invalid="ignore"):
+        rows, periods = np.nonzero(np.abs(share_now - share_before) >= thresholds["share_shift_pts"])
+    delta = share_now[rows, periods] - share_before[rows, periods]
+    add(rows, periods, "share_shift", share_now[rows, periods], share_before[rows, periods], delta,
+        chapters[rows], countries[rows],
+        [f"{c} share of HS {h:02d} imports {d:+.1f} pts" for c, h, d in zip(countries[rows], chapters[rows], delta)])
+
+    for alert, mask in (
+        ("market_surge", market_change >= thresholds["market_change_pct"]),
+        ("market_drop", market_change <= -thresholds["market_change_pct"]),
+    ):
+        groups, periods = np.nonzero(mask)
+        delta = market_change[groups, periods]
+        add(groups, periods, alert, market_now[groups, periods], market_before[groups, periods], delta,
+            chapter_of[groups], "",
+            [f"HS {h:02d} UK imports {d:+.0f}% on a year earlier" for h, d in zip(chapter_of[groups], delta)])
+
+    # Largest supplier per chapter, now and a year earlier
+    def leaders(values):
+        filled = pd.DataFrame(np.nan_to_num(values, nan=-1.0))
+        return filled.groupby(codes).idxmax().sort_index().to_numpy()
+
+    top_now, top_before = leaders(current), leaders(previous)
+    valid = (np.take_along_axis(current, top_now, 0) > 0) & (np.take_along_axis(previous, top_before, 0) > 0)
+    groups, periods = np.nonzero(valid & (top_now != top_before))
+    new_top, old_top = top_now[groups, periods], top_before[groups, periods]
+    add(groups, periods, "new_top_supplier", share_now[new_top, periods], share_before[old_top, periods],
+        share_now[new_top, periods] - share_before[old_top, periods], chapter_of[groups], countries[new_top],
+        [f"{n} overtook {o} as the largest HS {h:02d} supplier"
+         for n, o, h in zip(countries[new_top], countries[old_top], chapter_of[groups])])
+
+    if not frames:
+        return pd.DataFrame(columns=ALERT_COLUMNS)
+    alerts = pd.concat(frames, ignore_index=True)
+    return alerts.sort_values(["period", "hs2_chapter", "alert", "country_code"], kind="stable").reset_index(drop=True)
+
+
+def update_alerts(panel, state_path=ALERT_STATE_FILE, output=ALERTS_FILE, rebuild=False, formats=DEFAULT_FORMATS):
+    """
+    Evaluate alerts for the periods added since the last run and append
+    them to the alert log.
+
+    The state file records the last period evaluated, so each period is
+    evaluated once, when it first arrives. A change of frequency (annual to
+    monthly data) or rebuild re-evaluates the whole history.
+
+    Returns: (new alerts, full alert log)
+    """
+
+    state = pd.read_pickle(state_path) if not rebuild and os.path.exists(state_path) else {}
+    incremental = state.get("freq") == panel.freq and os.path.exists(resolve_path(output))
+    since = state.get("last_period") if incremental else None
+
+    new = evaluate_alerts(panel, since)
+    log = pd.concat([read_table(resolve_path(output)), new], ignore_index=True) if incremental else new
+
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    write_outputs(log, output, formats)
+    if len(panel.periods):
+        os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+        pd.to_pickle({"freq": panel.freq, "last_period": int(panel.periods[-1])}, state_path)
+    return new, log
+
+
+@instrumented("market_intelligence")
+def build_market_intelligence(hmrc_path=None, formats=DEFAULT_FORMATS, rebuild_alerts=False, chunksize=None):
+    """
+    Pipeline step: benchmark and outlook tables from HMRC values, plus new alerts.
+
+    Parameters:
+        hmrc_path: HMRC file or list of partition files (default: cleaned HMRC data)
+        chunksize: Rows per streamed chunk (default: trend_analysis.DEFAULT_CHUNKSIZE)
+
+    Returns: List of written paths
+    """
+
+    panel = hmrc_panel(hmrc_path, chunksize or DEFAULT_CHUNKSIZE)
+    benchmarks = benchmark_table(panel)
+    paths = write_outputs(benchmarks, BENCHMARK_FILE, formats, schema=BENCHMARK_SCHEMA)
+    paths += write_outputs(market_outlook(benchmarks), OUTLOOK_FILE, formats)
+    new, log = update_alerts(panel, rebuild=rebuild_alerts, formats=formats)
+
+    print(f"Market benchmarks: {len(benchmarks):,} rows → {BENCHMARK_FILE}")
+    print(f"Market alerts: {len(new):,} new, {len(log):,} in total → {ALERTS_FILE}")
+    return paths
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="HS2 market benchmarks, outlook and alerts")
+    parser.add_argument("--hmrc", nargs="+", default=None, help="HMRC file(s) (default: the cleaned HMRC data)")
+    parser.add_argument("--rebuild-alerts", action="store_true", help="Re-evaluate alerts for all periods")
+    parser.add_argument("--hs2", type=int, help="Look up an HS2 chapter instead of building the tables")
+    parser.add_argument("--value", type=float, help="Import value (GBP) to position in the --hs2 market")
+    parser.add_argument("--year", type=int, help="Year for the --hs2 lookup (default: latest complete year)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.hs2 is None:
+        os.makedirs(os.path.dirname(BENCHMARK_FILE), exist_ok=True)
+        build_market_intelligence(args.hmrc, rebuild_alerts=args.rebuild_alerts)
+        return
+
+    benchmarks = load_market_benchmarks()
+    market = benchmarks.market(args.hs2, args.year)
+    if market is None:
+        print(f"No benchmark data for HS {args.hs2:02d}; run python -m scripts.market_intelligence first")
+        return
+    to_date = f" to date ({market['months']} months)" if market["months"] < 12 else ""
+    print(f"HS {args.hs2:02d} {market['year']}{to_date}: £{market['total_value']:,.0f} from {market['suppliers']} "
+          f"suppliers ({market['growth_pct']:+.1f}% on a year earlier, HHI {market['hhi']:,.0f})")
+    print(benchmarks.top_suppliers(args.hs2, market["year"]).to_string(index=False))
+    if args.value is not None:
+        position = benchmarks.position(args.value, args.hs2, market["year"])
+        print(f"£{args.value:,.0f} is {position['share_pct']:.3f}% of UK imports, at or above "
+              f"{position['percentile']:.0f}% of supplier countries (rank {position['rank_equivalent']})")
+
+
+if __name__ == "__main__":
+    main()
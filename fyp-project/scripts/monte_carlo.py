@@ -0,0 +1,293 @@
+# monte_carlo.py
+# Monte Carlo margin simulation with correlated cost drivers
+
+import argparse
+import time
+
+import numpy as np
+from scripts.margin_model import compute_margin_batch
+from scripts.parallel_executor import map_ordered, resolve_workers
+from scripts.quantile_sketch import QuantileSketch
+
+# Cost drivers sampled by the simulator, in correlation-matrix order
+FACTORS = ("fx_shock_pct", "shipping_pct", "insurance_pct", "tariff_pct")
+
+# Default assumptions: centred on the dashboard's slider defaults
+DEFAULT_DISTRIBUTIONS = {
+    "fx_shock_pct": {"dist": "normal", "mean": 0.0, "sd": 0.05},
+    "shipping_pct": {"dist": "lognormal", "median": 0.05, "sigma": 0.4},
+    "insurance_pct": {"dist": "uniform", "low": 0.005, "high": 0.02},
+    "tariff_pct": {"dist": "fixed", "value": 0.02},
+}
+
+DEFAULT_PERCENTILES = (1, 5, 10, 25, 50, 75, 90, 95, 99)
+
+
+def _norm_cdf(x):
+    """Standard normal CDF (Numerical Recipes erfc, |error| < 1.2e-7)."""
+
+    z = np.abs(x) / np.sqrt(2)
+    t = 1 / (1 + 0.5 * z)
+    poly = -z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (
+        0.09678418 + t * (-0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (
+            1.48851587 + t * (-0.82215223 + t * 0.17087277))))))))
+    erfc = t * np.exp(poly)
+    return np.where(x >= 0, 1 - 0.5 * erfc, 0.5 * erfc)
+
+
+def _transform(z, spec):
+    """Map standard normal draws onto the marginal distribution in spec."""
+
+    dist = spec.get("dist", "normal")
+
+    if dist == "normal":
+        values = spec.get("mean", 0.0) + spec.get("sd", 1.0) * z
+    elif dist == "lognormal":
+        values = spec["median"] * np.exp(spec["sigma"] * z)
+    elif dist == "uniform":
+        values = spec["low"] + (spec["high"] - spec["low"]) * _norm_cdf(z)
+    elif dist == "triangular":
+        low, mode, high = spec["low"], spec["mode"], spec["high"]
+        u = _norm_cdf(z)
+        split = (mode - low) / (high - low)
+        values = np.where(
+            u < split,
+            low + np.sqrt(u * (high - low) * (mode - low)),
+            high - np.sqrt((1 - u) * (high - low) * (high - mode)),
+        )
+    elif dist == "empirical":
+        values = np.quantile(np.asarray(spec["values"]), _norm_cdf(z))
+    elif dist == "fixed":
+        values = np.full(z.shape, float(spec["value"]))
+    else:
+        raise ValueError(f"Unknown distribution: {dist}")
+
+    if "clip" in spec:
+        values = np.clip(values, *spec["clip"])
+    return values
+
+
+def _cholesky(correlation):
+    """Validate a correlation matrix over FACTORS and return its Cholesky factor."""
+
+    if correlation is None:
+        return np.eye(len(FACTORS))
+
+    corr = np.asarray(correlation, dtype=np.float64)
+    if corr.shape != (len(FACTORS), len(FACTORS)):
+        raise ValueError(f"Correlation matrix must be {len(FACTORS)}x{len(FACTORS)} ({', '.join(FACTORS)})")
+    if not np.allclose(corr, corr.T) or not np.allclose(np.diag(corr), 1.0):
+        raise ValueError("Correlation matrix must be symmetric with a unit diagonal")
+    try:
+        return np.linalg.cholesky(corr)
+    except np.linalg.LinAlgError:
+        raise ValueError("Correlation matrix is not positive definite")
+
+
+def chunk_sizes(n_samples: int, chunk_size: int):
+    """Split n_samples into fixed-size chunks (the last may be shorter)."""
+
+    full, rest = divmod(n_samples, chunk_size)
+    return [chunk_size] * full + ([rest] if rest else [])
+
+
+def simulate_chunk(
+    import_value_gbp,
+    revenue_gbp,
+    distributions,
+    chol,
+    n,
+    seed_seq,
+    compression=500,
+):
+    """
+    Simulate one chunk of scenarios and summarise it.
+
+    Returns a partial result dictionary that merge_partials() can combine.
+    """
+
+    rng = np.random.default_rng(seed_seq)
+    z = rng.standard_normal((n, len(FACTORS))) @ chol.T
+
+    drivers = {
+        factor: _transform(z[:, i], distributions[factor])
+        for i, factor in enumerate(FACTORS)
+    }
+    result = compute_margin_batch(import_value_gbp, revenue_gbp, **drivers)
+    profit = result["profit"]
+
+    return {
+        "n": n,
+        "losses": int((profit < 0).sum()),
+        "profit_sum": float(profit.sum()),
+        "profit_sketch": QuantileSketch(compression).update(profit),
+        "margin_sketch": QuantileSketch(compression).update(result["margin_pct"]),
+    }
+
+
+def _simulate_task(task):
+    """Worker entry point for map_ordered()."""
+
+    return simulate_chunk(*task)
+
+
+def merge_partials(partials):
+    """Combine partial chunk results in order."""
+
+    merged = None
+    for part in partials:
+        if merged is None:
+            merged = part
+            continue
+        merged["n"] += part["n"]
+        merged["losses"] += part["losses"]
+        merged["profit_sum"] += part["profit_sum"]
+        merged["profit_sketch"].merge(part["profit_sketch"])
+        merged["margin_sketch"].merge(part["margin_sketch"])
+    return merged
+
+
+def summarise(merged, var_level=0.95, percentiles=DEFAULT_PERCENTILES):
+    """
+    Turn merged partials into the reported risk statistics.
+
+    VaR and CVaR are expressed as positive loss amounts in GBP: VaR is the
+    loss exceeded with probability 1 - var_level, and CVaR is the average
+    loss in that tail.
+    """
+
+    tail = 1 - var_level
+    profit_sketch = merged["profit_sketch"]
+    margin_sketch = merged["margin_sketch"]
+    probs = np.asarray(percentiles, dtype=np.float64) / 100
+
+    return {
+        "n_samples": merged["n"],
+        "loss_probability": merged["losses"] / merged["n"],
+        "expected_profit": merged["profit_sum"] / merged["n"],
+        "var_level": var_level,
+        "profit_var": -float(profit_sketch.quantile(tail)),
+        "profit_cvar": -profit_sketch.tail_mean(tail),
+        "profit_percentiles": dict(zip(percentiles, profit_sketch.quantile(probs).tolist())),
+        "margin_percentiles": dict(zip(percentiles, margin_sketch.quantile(probs).tolist())),
+    }
+
+
+def run_monte_carlo(
+    import_value_gbp: float,
+    revenue_gbp: float,
+    distributions=None,
+    correlation=None,
+    n_samples: int = 1_000_000,
+    chunk_size: int = 100_000,
+    seed=None,
+    var_level: float = 0.95,
+    percentiles=DEFAULT_PERCENTILES,
+    workers: int = 1,
+):
+    """
+    Simulate profit and margin under uncertain FX, shipping, insurance and tariffs.
+
+    Parameters:
+        import_value_gbp: Base import value in GBP
+        revenue_gbp: Expected sales revenue
+        distributions: Dict of factor -> spec, merged over DEFAULT_DISTRIBUTIONS.
+            Specs: {"dist": "normal", "mean", "sd"}, {"dist": "lognormal",
+            "median", "sigma"}, {"dist": "uniform", "low", "high"},
+            {"dist": "triangular", "low", "mode", "high"},
+            {"dist": "empirical", "values"}, {"dist": "fixed", "value"};
+            any spec may add "clip": (lo, hi)
+        correlation: 4x4 correlation matrix over FACTORS (Gaussian copula)
+        n_samples: Total number of simulated scenarios
+        chunk_size: Scenarios evaluated per vectorised chunk (bounds memory)
+        seed: Integer seed; the same seed always gives the same result
+        var_level: Confidence level for VaR/CVaR, e.g. 0.95
+        percentiles: Percentiles to report for profit and margin
+        workers: Processes to spread chunks over (0 = all cores). Partial
+            results are merged in chunk order, so the output is identical
+            for any worker count.
+
+    Returns:
+        Dictionary with n_samples, seed, loss_probability, expected_profit,
+        profit_var, profit_cvar, profit_percentiles and margin_percentiles
+    """
+
+    specs = dict(DEFAULT_DISTRIBUTIONS)
+    specs.update(distributions or {})
+    unknown = set(specs) - set(FACTORS)
+    if unknown:
+        raise ValueError(f"Unknown factors: {unknown}")
+
+    chol = _cholesky(correlation)
+    sizes = chunk_sizes(n_samples, chunk_size)
+
+    # One child seed per chunk, so results do not depend on evaluation order
+    root = np.random.SeedSequence(seed)
+    tasks = [
+        (import_value_gbp, revenue_gbp, specs, chol, n, child)
+        for n, child in zip(sizes, root.spawn(len(sizes)))
+    ]
+    if resolve_workers(workers) == 1:
+        # Lazily evaluated so only one chunk of samples is alive at a time
+        partials = (_simulate_task(task) for task in tasks)
+    else:
+        partials = map_ordered(_simulate_task, tasks, workers)
+
+    summary = summarise(merge_partials(partials), var_level, percentiles)
+    summary["seed"] = root.entropy
+    return summary
+
+
+def benchmark(n_samples: int = 2_000_000, chunk_size: int = 100_000, seed: int = 0, workers: int = 1):
+    """
+    Measure simulation throughput.
+
+    Returns: Dictionary with n_samples, seconds and samples_per_sec
+    """
+
+    start = time.perf_counter()
+    run_monte_carlo(1_000_000, 1_350_000, n_samples=n_samples, chunk_size=chunk_size, seed=seed,
+                    workers=workers)
+    elapsed = time.perf_counter() - start
+    return {
+        "n_samples": n_samples,
+        "workers": workers,
+        "seconds": round(elapsed, 3),
+        "samples_per_sec": round(n_samples / elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo import margin simulation")
+    parser.add_argument("--import-value", type=float, default=1_000_000)
+    parser.add_argument("--revenue", type=float, default=1_350_000)
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (0 = all cores)")
+    parser.add_argument("--benchmark", action="store_true", help="Report throughput only")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        stats = benchmark(args.samples, args.chunk_size, args.seed or 0, args.workers)
+        print(f"{stats['n_samples']:,} samples in {stats['seconds']}s "
+              f"({stats['samples_per_sec']:,} samples/sec)")
+        return
+
+    summary = run_monte_carlo(
+        args.import_value, args.revenue,
+        n_samples=args.samples, chunk_size=args.chunk_size, seed=args.seed,
+        workers=args.workers,
+    )
+    print(f"Samples: {summary['n_samples']:,} (seed {summary['seed']})")
+    print(f"Loss probability: {summary['loss_probability'] * 100:.2f}%")
+    print(f"Expected profit: GBP {summary['expected_profit']:,.0f}")
+    print(f"VaR {summary['var_level'] * 100:.0f}%: GBP {summary['profit_var']:,.0f}")
+    print(f"CVaR {summary['var_level'] * 100:.0f}%: GBP {summary['profit_cvar']:,.0f}")
+    print("Margin percentiles:")
+    for p, value in summary["margin_percentiles"].items():
+        print(f"  P{p}: {value:.2f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# parallel_executor.py
+# Process-pool execution with shared-memory result buffers
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def resolve_workers(workers) -> int:
+    """
+    Normalise a worker count.
+
+    None or 1 -> run in-process; 0 or negative -> one worker per CPU core.
+    """
+
+    if workers is None:
+        return 1
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return int(workers)
+
+
+def split_range(n: int, n_chunks: int):
+    """Split range(n) into up to n_chunks contiguous (start, stop) slices."""
+
+    n_chunks = max(1, min(n, n_chunks))
+    bounds = np.linspace(0, n, n_chunks + 1).round().astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def map_ordered(func, tasks, workers=1):
+    """
+    Apply func to each task and return the results in task order.
+
+    With one worker this runs in-process; otherwise tasks run on a process
+    pool. Results always come back in submission order, so merging them
+    gives the same answer whatever the worker count.
+    """
+
+    workers = resolve_workers(workers)
+    tasks = list(tasks)
+    if workers == 1 or len(tasks) <= 1:
+        return [func(task) for task in tasks]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        return list(pool.map(func, tasks))
+
+
+class SharedArrays:
+    """
+    Named NumPy buffers in shared memory that worker processes write into.
+
+    Workers call attach_array() with the (name, shape, dtype) spec from
+    specs and write their slice in place, so results are never pickled
+    back to the parent. Use as a context manager so segments are always
+    unlinked; copy results out with to_dict() before leaving the block.
+    """
+
+    def __init__(self, shapes: dict, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        self._segments = {}
+        self.arrays = {}
+        self.specs = {}
+        for key, shape in shapes.items():
+            nbytes = max(1, int(np.prod(shape)) * self.dtype.itemsize)
+            shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            self._segments[key] = shm
+            self.arrays[key] = np.ndarray(shape, dtype=self.dtype, buffer=shm.buf)
+            self.specs[key] = (shm.name, tuple(shape), self.dtype.str)
+
+    def to_dict(self):
+        """Copy the shared buffers into ordinary arrays."""
+
+        return {key: np.array(arr) for key, arr in self.arrays.items()}
+
+    def close(self):
+        self.arrays = {}
+        for shm in self._segments.values():
+            shm.close()
+            shm.unlink()
+        self._segments = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach_array(spec):
+    """
+    Attach to a SharedArrays buffer from a worker process.
+
+    Returns: (shm, array); call shm.close() once the array is no longer used
+    """
+
+    name, shape, dtype = spec
+    if sys.version_info >= (3, 13):
+        # The parent owns and unlinks the segment
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    else:
+        # Pool workers share the parent's resource tracker, so registering
+        # again is harmless and the parent's unlink() clears it
+        shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
@@ -0,0 +1,138 @@
+# pipeline_cache.py
+# Content-hashed caching of data pipeline stages
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from scripts import __version__
+
+CACHE_FOLDER = "data/cache/"
+HASH_MEMO_FILE = "file_hashes.json"
+
+
+def hash_text(*parts) -> str:
+    """Stable SHA-256 of JSON-serialisable parts."""
+
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def file_hash(path, memo=None) -> str:
+    """
+    SHA-256 of a file's contents.
+
+    If memo (a dict) is given, hashes are reused while the file's size and
+    modification time are unchanged, so multi-GB inputs are not re-read on
+    every run.
+    """
+
+    stat = os.stat(path)
+    signature = [stat.st_size, stat.st_mtime_ns]
+    abs_path = os.path.abspath(path)
+    if memo is not None and memo.get(abs_path, {}).get("signature") == signature:
+        return memo[abs_path]["sha256"]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    sha = digest.hexdigest()
+
+    if memo is not None:
+        memo[abs_path] = {"signature": signature, "sha256": sha}
+    return sha
+
+
+def code_version(*source_files) -> str:
+    """Hash of the package version and the source of the given modules."""
+
+    digest = hashlib.sha256(__version__.encode("utf-8"))
+    for path in source_files:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class StageCache:
+    """
+    Stores stage artifacts under a key derived from their inputs.
+
+    A stage key hashes the stage name, the code version, its parameters and
+    the keys of its inputs (file hashes or upstream stage keys), so a stage
+    is recomputed only when something it depends on changes. Artifacts are
+    pickled to <cache_dir>/<stage>/<key>.pkl.
+
+    Parameters:
+        cache_dir: Folder for artifacts and the file-hash memo
+        force: Rebuild every stage
+        force_stages: Names of stages to rebuild even if cached
+        enabled: If False, nothing is read from or written to the cache
+    """
+
+    def __init__(self, cache_dir=CACHE_FOLDER, force=False, force_stages=(), enabled=True):
+        self.cache_dir = cache_dir
+        self.force = force
+        self.force_stages = set(force_stages or ())
+        self.enabled = enabled
+        self.hits = []
+        self.misses = []
+
+        self._memo_path = os.path.join(cache_dir, HASH_MEMO_FILE)
+        self._memo = {}
+        if enabled and os.path.exists(self._memo_path):
+            with open(self._memo_path) as f:
+                self._memo = json.load(f)
+
+    def file_key(self, path) -> str:
+        """Content hash of an input file (memoised by size and mtime)."""
+
+        return file_hash(path, self._memo if self.enabled else None)
+
+    def key(self, stage, inputs=(), params=None, code=""):
+        """Cache key for a stage from its input keys, parameters and code version."""
+
+        return hash_text(stage, list(inputs), params or {}, code)
+
+    def _path(self, stage, key):
+        return os.path.join(self.cache_dir, stage, key + ".pkl")
+
+    def get_or_compute(self, stage, key, compute, valid=None):
+        """
+        Return the cached artifact for (stage, key), or compute and store it.
+
+        valid is an optional check on a cached artifact (e.g. that output
+        files still exist); if it returns False the stage is recomputed.
+        """
+
+        forced = self.force or stage in self.force_stages
+        path = self._path(stage, key)
+
+        if self.enabled and not forced and os.path.exists(path):
+            artifact = pd.read_pickle(path)
+            if valid is None or valid(artifact):
+                self.hits.append(stage)
+                print(f"[cache] {stage}: reusing {key[:12]}")
+                return artifact
+
+        self.misses.append(stage)
+        artifact = compute()
+
+        if self.enabled:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            pd.to_pickle(artifact, path)
+        return artifact
+
+    def save_memo(self):
+        """Persist the file-hash memo for the next run."""
+
+        if not self.enabled:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self._memo_path, "w") as f:
+            json.dump(self._memo, f, indent=1)
+
+    def summary(self) -> str:
+        return f"{len(self.hits)} stage(s) reused, {len(self.misses)} recomputed"
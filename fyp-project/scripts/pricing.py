@@ -0,0 +1,65 @@
+# pricing.py
+# Batch pricing: margins, risk levels and confidence bands for many orders
+
+import numpy as np
+from scripts.categories import MISSING_CODE
+from scripts.confidence_band import confidence_multiplier_array
+from scripts.margin_model import compute_margin_batch
+from scripts.risk_adjuster import adjust_risk_array
+from scripts.risk_label import risk_label_array
+
+# Optional per-order cost drivers, with their defaults
+COST_DRIVERS = {
+    "fx_shock_pct": 0.0,
+    "shipping_pct": 0.0,
+    "insurance_pct": 0.0,
+    "tariff_pct": 0.0,
+}
+
+PRICING_COLUMNS = (
+    "goods_cost", "shipping_cost", "insurance_cost", "tariff_cost",
+    "landed_cost", "profit", "margin_pct",
+    "risk_level", "adjusted_risk", "confidence_multiplier",
+    "profit_lower", "profit_upper",
+)
+
+
+def price_batch(import_value_gbp, revenue_gbp, coverage_class=None, **cost_drivers):
+    """
+    Price a batch of orders in one vectorised pass.
+
+    Parameters:
+        import_value_gbp: Array of import values in GBP
+        revenue_gbp: Array of expected revenues
+        coverage_class: Sequence or Categorical of ONS coverage classes, or
+            their int8 codes, one per order (None / MISSING_CODE where unknown)
+        cost_drivers: fx_shock_pct, shipping_pct, insurance_pct, tariff_pct
+            as scalars or arrays
+
+    Returns:
+        Dictionary of PRICING_COLUMNS. Money and margin columns are float64
+        arrays (margin_pct is NaN without revenue); risk columns are
+        Categoricals.
+        Profit bands are widened by the coverage multiplier and always
+        ordered lower <= upper.
+    """
+
+    unknown = set(cost_drivers) - set(COST_DRIVERS)
+    if unknown:
+        raise ValueError(f"Unknown cost drivers: {unknown}")
+
+    result = compute_margin_batch(
+        np.atleast_1d(import_value_gbp), np.atleast_1d(revenue_gbp), **cost_drivers
+    )
+    if coverage_class is None:
+        coverage_class = np.full(len(result["profit"]), MISSING_CODE, dtype=np.int8)
+
+    result["risk_level"] = risk_label_array(result["margin_pct"])
+    result["adjusted_risk"] = adjust_risk_array(result["risk_level"], coverage_class)
+    multiplier = confidence_multiplier_array(coverage_class)
+    result["confidence_multiplier"] = multiplier
+
+    spread = np.abs(result["profit"]) * multiplier
+    result["profit_lower"] = result["profit"] - spread
+    result["profit_upper"] = result["profit"] + spread
+    return result
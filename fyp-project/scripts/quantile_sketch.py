@@ -0,0 +1,106 @@
+# quantile_sketch.py
+# Mergeable streaming quantile sketch (t-digest style) for large simulations
+
+import numpy as np
+
+
+class QuantileSketch:
+    """
+    Bounded-memory quantile estimator built from weighted centroids.
+
+    Values are absorbed a chunk at a time with update() and compressed with
+    the t-digest k1 scale function, so at most about compression / 2
+    centroids are kept. The tails get more, smaller centroids than the
+    middle, which keeps extreme percentiles (VaR) accurate.
+
+    Sketches from separate chunks or workers can be combined with merge().
+    Merging the same partial sketches in the same order always gives the
+    same result.
+    """
+
+    def __init__(self, compression: float = 500):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        """Add an array of observations (NaNs are ignored)."""
+
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._compress(
+            np.concatenate([self.means, values]),
+            np.concatenate([self.weights, np.ones(len(values))]),
+        )
+        return self
+
+    def merge(self, other):
+        """Absorb another sketch's centroids into this one."""
+
+        if other.count == 0:
+            return self
+
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(
+            np.concatenate([self.means, other.means]),
+            np.concatenate([self.weights, other.weights]),
+        )
+        return self
+
+    def _compress(self, means, weights):
+        """Group sorted centroids into unit-width buckets of the k1 scale."""
+
+        order = np.argsort(means, kind="stable")
+        means = means[order]
+        weights = weights[order]
+
+        cum_weight = np.cumsum(weights)
+        q_mid = (cum_weight - weights / 2) / cum_weight[-1]
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q_mid - 1)
+        bucket = np.floor(k)
+
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def quantile(self, q):
+        """
+        Estimate quantile(s) q in [0, 1] by interpolating between centroids.
+
+        Returns NaN if the sketch is empty.
+        """
+
+        q = np.asarray(q, dtype=np.float64)
+        if self.count == 0:
+            return np.full(q.shape, np.nan) if q.ndim else np.nan
+
+        positions = np.cumsum(self.weights) - self.weights / 2
+        xp = np.concatenate([[0.0], positions, [self.count]])
+        fp = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(q * self.count, xp, fp)
+
+    def tail_mean(self, q: float) -> float:
+        """
+        Mean of the lowest q fraction of observations (used for CVaR).
+
+        The centroid straddling the cut-off contributes pro rata.
+        """
+
+        if self.count == 0 or q <= 0:
+            return np.nan
+
+        target = q * self.count
+        cum_weight = np.cumsum(self.weights)
+        taken = np.clip(target - (cum_weight - self.weights), 0, self.weights)
+        return float((taken * self.means).sum() / taken.sum())
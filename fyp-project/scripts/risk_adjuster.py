@@ -1,6 +1,29 @@
 # risk_adjuster.py
 # Adjusts risk level based on ONS data coverage quality
 
+import numpy as np
+import pandas as pd
+from scripts.categories import (
+    COVERAGE_CODES, MISSING_CODE, RISK_LEVELS, CoverageClass, RiskLevel,
+    code_lookup, coverage_codes, risk_categorical, risk_codes,
+)
+
+# Coverage classes that move risk up one level
+POOR_COVERAGE_CODES = (CoverageClass.NONE, CoverageClass.LOW)
+POOR_COVERAGE = tuple(c.label for c in POOR_COVERAGE_CODES)
+
+# Poor-coverage flag by coverage code (last slot: missing coverage)
+_POOR_BY_CODE = code_lookup([c in POOR_COVERAGE_CODES for c in CoverageClass], False)
+
+# Adjusted risk code by [risk code, poor coverage]; the last row is for
+# missing risk levels
+ADJUSTED_RISK = np.array([
+    [RiskLevel.HIGH, RiskLevel.HIGH],
+    [RiskLevel.MODERATE, RiskLevel.HIGH],
+    [RiskLevel.LOW, RiskLevel.MODERATE],
+    [MISSING_CODE, MISSING_CODE],
+], dtype=np.int8)
+
 
 def adjust_risk(margin_risk: str, coverage_class: str) -> str:
     """
@@ -14,24 +37,81 @@ def adjust_risk(margin_risk: str, coverage_class: str) -> str:
     Parameters:
         margin_risk: Base risk from risk_label() - "HIGH", "MODERATE", or "LOW"
         coverage_class: ONS coverage - "High/Partial/Low/No coverage"
+                        (label or CoverageClass)
     
     Returns: Adjusted risk level
     """
     
+    # Compare integer codes rather than label strings
+    poor = COVERAGE_CODES.get(coverage_class, coverage_class) in POOR_COVERAGE_CODES
+    
     # HIGH risk can't get worse
     if margin_risk == "HIGH":
         return "HIGH"
     
     # MODERATE risk -> HIGH if poor data
     if margin_risk == "MODERATE":
-        if coverage_class in ["No coverage", "Low coverage"]:
+        if poor:
             return "HIGH"
         return "MODERATE"
     
     # LOW risk -> MODERATE if poor data
     if margin_risk == "LOW":
-        if coverage_class in ["No coverage", "Low coverage"]:
+        if poor:
             return "MODERATE"
         return "LOW"
     
     return margin_risk
+
+
+def poor_coverage(coverage_class):
+    """
+    Boolean array: True where coverage is in POOR_COVERAGE.
+    
+    Accepts labels, None, CoverageClass codes or a Categorical.
+    """
+    
+    return _POOR_BY_CODE[coverage_codes(coverage_class)]
+
+
+def adjust_risk_array(margin_risk, coverage_class):
+    """
+    Vectorised adjust_risk() for arrays of risk levels and coverage classes.
+    
+    Both inputs are encoded as int8 codes and the result is one lookup in
+    ADJUSTED_RISK. Labels outside RISK_LEVELS pass through unchanged, as in
+    the scalar version (via a slower per-distinct-value path).
+    
+    Returns: Categorical of adjusted risk levels (RISK_DTYPE unless
+    pass-through values were present); None inputs stay missing
+    """
+    
+    codes = risk_codes(margin_risk)
+    poor = poor_coverage(coverage_class)
+    
+    missing = codes == MISSING_CODE
+    if missing.any():
+        labels = pd.Series(margin_risk, copy=False)
+        if labels.dtype.kind not in "iu" and labels[missing].notna().any():
+            return _adjust_risk_labels(margin_risk, poor)
+    
+    return risk_categorical(ADJUSTED_RISK[codes, poor.astype(np.intp)])
+
+
+def _adjust_risk_labels(margin_risk, poor):
+    """adjust_risk() per distinct label, for inputs with non-standard labels."""
+    
+    codes, uniques = pd.factorize(np.asarray(margin_risk, dtype=object))
+    # Missing values (code -1) index the extra last row
+    uniques = list(uniques) + [None]
+    
+    # Rows: distinct risk levels; columns: good coverage, poor coverage
+    adjusted = [(adjust_risk(risk, None), adjust_risk(risk, POOR_COVERAGE[0])) for risk in uniques]
+    extra = [v for pair in adjusted for v in pair if v is not None and v not in RISK_LEVELS]
+    categories = list(RISK_LEVELS) + list(dict.fromkeys(extra))
+    position = {label: i for i, label in enumerate(categories)}
+    table = np.array(
+        [[position.get(good, MISSING_CODE), position.get(bad, MISSING_CODE)] for good, bad in adjusted],
+        dtype=np.int32,
+    )
+    return pd.Categorical.from_codes(table[codes, poor.astype(np.intp)], categories=categories)
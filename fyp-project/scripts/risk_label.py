@@ -1,6 +1,13 @@
 # risk_label.py
 # Classifies financial risk based on profit margin thresholds
 
+import numpy as np
+from scripts.categories import RiskLevel, risk_categorical
+
+# Margin thresholds (%): below HIGH_RISK_BELOW is HIGH, below LOW_RISK_FROM is MODERATE
+HIGH_RISK_BELOW = 5
+LOW_RISK_FROM = 10
+
 
 def risk_label(margin_pct):
     """
@@ -14,9 +21,28 @@ def risk_label(margin_pct):
     Returns: "HIGH", "MODERATE", or "LOW"
     """
     
-    if margin_pct is None or margin_pct < 5:
+    if margin_pct is None or margin_pct < HIGH_RISK_BELOW:
         return "HIGH"
-    elif margin_pct < 10:
+    elif margin_pct < LOW_RISK_FROM:
         return "MODERATE"
     else:
         return "LOW"
+
+
+def risk_label_array(margin_pct):
+    """
+    Vectorised risk_label() for an array of margins.
+    
+    Missing margins (None or NaN, as produced by compute_margin_batch())
+    are HIGH risk, like None in the scalar version.
+    
+    Returns: Categorical with the RISK_DTYPE categories
+    """
+    
+    margin = np.asarray(margin_pct, dtype=np.float64)
+    codes = np.select(
+        [np.isnan(margin) | (margin < HIGH_RISK_BELOW), margin < LOW_RISK_FROM],
+        [RiskLevel.HIGH, RiskLevel.MODERATE],
+        default=RiskLevel.LOW,
+    ).astype(np.int8)
+    return risk_categorical(codes)
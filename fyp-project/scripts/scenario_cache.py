@@ -0,0 +1,142 @@
+# scenario_cache.py
+# Bounded LRU/TTL cache for scenario grids and their derived tables
+
+import threading
+import time
+from collections import OrderedDict
+
+from scripts.scenario_runner import run_sensitivity_scenarios
+
+
+class ScenarioCache:
+    """
+    Thread-safe least-recently-used cache with a time-to-live.
+
+    Entries expire ttl seconds after they were computed, and the least
+    recently used entry is evicted once maxsize is reached. Hit, miss and
+    eviction counters are kept for the dashboard's debug panel.
+
+    Parameters:
+        maxsize: Maximum number of entries
+        ttl: Seconds an entry stays valid (None = no expiry)
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 3600, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, or compute, store and return it."""
+
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, value = entry
+                if self.ttl is None or now - created < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+
+        # Computed outside the lock so other sessions are not blocked
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Counters and current size, for display."""
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+def scenario_key(import_value_gbp, revenue_gbp, uncertainty=None):
+    """
+    Normalised cache key for a scenario request.
+
+    Money is rounded to pennies and the band multiplier to 6 decimal
+    places, so equivalent widget values (e.g. 1e6 and 1000000) share an
+    entry.
+    """
+
+    key = (round(float(import_value_gbp), 2), round(float(revenue_gbp), 2))
+    if uncertainty is not None:
+        key += (round(float(uncertainty), 6),)
+    return key
+
+
+def add_confidence_bands(df, uncertainty):
+    """Add profit/margin lower and upper band columns (returns a new DataFrame)."""
+
+    df = df.copy()
+    df["profit_lower"] = df["profit"] - abs(df["profit"]) * uncertainty
+    df["profit_upper"] = df["profit"] + abs(df["profit"]) * uncertainty
+    df["margin_lower"] = df["margin_pct"] - abs(df["margin_pct"]) * uncertainty
+    df["margin_upper"] = df["margin_pct"] + abs(df["margin_pct"]) * uncertainty
+    return df
+
+
+def cached_scenarios(cache, import_value_gbp, revenue_gbp, uncertainty, fx_values=None):
+    """
+    Sensitivity grid with confidence bands and the FX x shipping margin pivot.
+
+    The raw grid depends only on the import value, revenue and FX axis, so
+    it is cached separately and shared by every coverage class (band width).
+    Cached frames are shared across sessions and must not be modified.
+
+    fx_values optionally replaces the default -10%..+10% FX axis (e.g. a
+    currency's empirical shock quantiles); it must be a tuple.
+
+    Returns: (scenarios DataFrame with band columns, margin pivot DataFrame)
+    """
+
+    grid_key = ("grid",) + scenario_key(import_value_gbp, revenue_gbp) + (fx_values,)
+    grid = cache.get_or_compute(
+        grid_key,
+        lambda: run_sensitivity_scenarios(
+            import_value_gbp=import_value_gbp, revenue_gbp=revenue_gbp, fx_values=fx_values
+        ),
+    )
+
+    def derive():
+        df = add_confidence_bands(grid, uncertainty)
+        pivot_margin = df.pivot_table(
+            values="margin_pct",
+            index="fx_shock_pct",
+            columns="shipping_pct",
+            aggfunc="mean",
+        )
+        return df, pivot_margin
+
+    derived_key = ("derived",) + scenario_key(import_value_gbp, revenue_gbp, uncertainty) + (fx_values,)
+    return cache.get_or_compute(derived_key, derive)
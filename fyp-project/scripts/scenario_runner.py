@@ -1,8 +1,242 @@
 # scenario_runner.py
 # Runs sensitivity analysis across FX and shipping cost combinations
 
+import operator
+
+import numpy as np
 import pandas as pd
-from scripts.margin_model import compute_margin
+from scripts.margin_model import compute_margin_batch
+from scripts.parallel_executor import (
+    SharedArrays, attach_array, map_ordered, resolve_workers, split_range,
+)
+
+# Grid axis names -> compute_margin() keyword arguments
+GRID_AXES = {
+    "fx": "fx_shock_pct",
+    "shipping": "shipping_pct",
+    "insurance": "insurance_pct",
+    "tariff": "tariff_pct",
+    "revenue": "revenue_gbp",
+    "import_value": "import_value_gbp",
+}
+
+# Axes stored as decimals but reported as percentages in long DataFrames
+PERCENT_AXES = {"fx", "shipping", "insurance", "tariff"}
+
+# Result columns available from compute_margin_batch()
+RESULT_COLUMNS = (
+    "goods_cost", "shipping_cost", "insurance_cost", "tariff_cost",
+    "landed_cost", "profit", "margin_pct",
+)
+
+
+def _step_count(steps):
+    """steps as an int; a float or other non-integer is an error, not rounded."""
+
+    try:
+        return operator.index(steps)
+    except TypeError:
+        raise TypeError(f"steps must be an integer, got {steps!r}") from None
+
+
+def grid_values(lo, hi, steps):
+    """
+    Evenly spaced values from lo to hi inclusive.
+
+    Uses the same arithmetic as the original list comprehension
+    (lo + i * (hi - lo) / (steps - 1)) so grid points are unchanged.
+    """
+
+    steps = _step_count(steps)
+    if steps < 2:
+        return np.array([lo], dtype=np.float64)
+    return lo + np.arange(steps) * (hi - lo) / (steps - 1)
+
+
+class GridRange:
+    """
+    A grid axis of steps evenly spaced values from lo to hi inclusive.
+
+    Axes of run_scenario_grid() are either a GridRange or explicit values
+    as a list or array. Tuples are rejected there, because (0.0, 0.05, 0.1)
+    could be three values or a range with 0.1 steps.
+    """
+
+    def __init__(self, lo, hi, steps):
+        self.lo = float(lo)
+        self.hi = float(hi)
+        self.steps = _step_count(steps)
+        if self.steps < 1:
+            raise ValueError(f"steps must be at least 1, got {self.steps}")
+
+    def __len__(self):
+        return self.steps
+
+    def __repr__(self):
+        return f"GridRange({self.lo!r}, {self.hi!r}, {self.steps!r})"
+
+    def values(self):
+        return grid_values(self.lo, self.hi, self.steps)
+
+
+class ScenarioCube:
+    """
+    Dense labelled result of run_scenario_grid().
+
+    Attributes:
+        dims: Axis names in array order, e.g. ("fx", "shipping")
+        coords: Dictionary of axis name -> 1-D array of grid values
+        data: Dictionary of result column -> ndarray shaped like the grid
+    """
+
+    def __init__(self, dims, coords, data):
+        self.dims = tuple(dims)
+        self.coords = coords
+        self.data = data
+
+    @property
+    def shape(self):
+        return tuple(len(self.coords[d]) for d in self.dims)
+
+    def __getitem__(self, column):
+        return self.data[column]
+
+    def to_frame(self):
+        """
+        Flatten the cube into a long DataFrame, one row per grid point.
+
+        Rows follow the nested-loop order (first axis outermost). Rate
+        axes are reported as percentages, matching run_sensitivity_scenarios().
+        """
+
+        n = int(np.prod(self.shape))
+        columns = {}
+        for i, dim in enumerate(self.dims):
+            values = self.coords[dim] * 100 if dim in PERCENT_AXES else self.coords[dim]
+            reps = int(np.prod(self.shape[i + 1:]))
+            tiles = n // (len(values) * reps)
+            columns[GRID_AXES[dim]] = np.tile(np.repeat(values, reps), tiles)
+        for name, values in self.data.items():
+            columns[name] = values.reshape(-1)
+        return pd.DataFrame(columns)
+
+
+def _evaluate_grid(dims, coords, fixed, outputs):
+    """Evaluate the full grid in-process with one broadcast pass."""
+
+    inputs = dict(fixed)
+    for i, dim in enumerate(dims):
+        shape = [1] * len(dims)
+        shape[i] = len(coords[dim])
+        inputs[GRID_AXES[dim]] = coords[dim].reshape(shape)
+
+    result = compute_margin_batch(**inputs)
+    grid_shape = tuple(len(coords[d]) for d in dims)
+    return {
+        name: np.broadcast_to(result[name], grid_shape)
+        for name in outputs
+    }
+
+
+def _grid_chunk(task):
+    """Worker: evaluate a slice of the first axis into shared memory."""
+
+    dims, coords, fixed, outputs, start, stop, specs = task
+    coords = dict(coords)
+    coords[dims[0]] = coords[dims[0]][start:stop]
+    data = _evaluate_grid(dims, coords, fixed, outputs)
+
+    for name in outputs:
+        shm, target = attach_array(specs[name])
+        target[start:stop] = data[name]
+        del target
+        shm.close()
+
+
+def _evaluate_grid_parallel(dims, coords, fixed, outputs, grid_shape, workers):
+    """Split the first axis across a process pool writing to shared buffers."""
+
+    with SharedArrays({name: grid_shape for name in outputs}) as shared:
+        tasks = [
+            (dims, coords, fixed, outputs, start, stop, shared.specs)
+            for start, stop in split_range(grid_shape[0], workers * 4)
+        ]
+        map_ordered(_grid_chunk, tasks, workers)
+        return shared.to_dict()
+
+
+def run_scenario_grid(
+    import_value_gbp: float,
+    revenue_gbp: float,
+    axes: dict,
+    fx_shock_pct: float = 0.0,
+    shipping_pct: float = 0.0,
+    insurance_pct: float = 0.0,
+    tariff_pct: float = 0.0,
+    outputs=("profit", "margin_pct"),
+    as_frame: bool = True,
+    workers: int = 1,
+):
+    """
+    Evaluate margins over an N-dimensional grid in one broadcast pass.
+
+    Parameters:
+        import_value_gbp: Base import value (used unless "import_value" is an axis)
+        revenue_gbp: Expected revenue (used unless "revenue" is an axis)
+        axes: Ordered dict of axis name -> GridRange(lo, hi, steps), or a
+              list/array of explicit values.
+              Names: fx, shipping, insurance, tariff, revenue, import_value
+        fx_shock_pct, shipping_pct, insurance_pct, tariff_pct:
+              Fixed values for the cost drivers that are not axes
+        outputs: Result columns to keep (see RESULT_COLUMNS)
+        as_frame: Return a long DataFrame if True, else a ScenarioCube
+        workers: Processes to split the first axis across (0 = all cores).
+              Results are identical for any worker count.
+
+    Example:
+        run_scenario_grid(1e6, 1.35e6, {"fx": GridRange(-0.1, 0.1, 41),
+                                        "tariff": [0.0, 0.02, 0.04, 0.12]})
+    """
+
+    unknown = set(axes) - set(GRID_AXES)
+    if unknown:
+        raise ValueError(f"Unknown grid axes: {unknown}")
+    unknown = set(outputs) - set(RESULT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown output columns: {unknown}")
+
+    dims = list(axes)
+    coords = {}
+    for dim, spec in axes.items():
+        if isinstance(spec, GridRange):
+            coords[dim] = spec.values()
+        elif isinstance(spec, tuple):
+            raise TypeError(
+                f"Axis {dim}: give explicit values as a list or array, "
+                f"or a range as GridRange(lo, hi, steps), not a tuple"
+            )
+        else:
+            coords[dim] = np.asarray(spec, dtype=np.float64).reshape(-1)
+
+    # Fixed inputs, replaced by a grid axis where one is given
+    fixed = {
+        "import_value_gbp": import_value_gbp,
+        "revenue_gbp": revenue_gbp,
+        "fx_shock_pct": fx_shock_pct,
+        "shipping_pct": shipping_pct,
+        "insurance_pct": insurance_pct,
+        "tariff_pct": tariff_pct,
+    }
+    grid_shape = tuple(len(coords[d]) for d in dims)
+
+    workers = resolve_workers(workers)
+    if workers == 1 or not dims:
+        data = _evaluate_grid(dims, coords, fixed, outputs)
+    else:
+        data = _evaluate_grid_parallel(dims, coords, fixed, outputs, grid_shape, workers)
+
+    cube = ScenarioCube(dims, coords, data)
+    return cube.to_frame() if as_frame else cube
 
 
 def run_sensitivity_scenarios(
@@ -13,10 +247,12 @@ def run_sensitivity_scenarios(
     steps=11,
     tariff_pct=0.0,
     insurance_pct=0.0,
+    workers=1,
+    fx_values=None,
 ):
     """
     Generate a grid of scenarios varying FX and shipping costs.
-    
+
     Parameters:
         import_value_gbp: Base import value in GBP
         revenue_gbp: Expected sales revenue
@@ -25,46 +261,22 @@ def run_sensitivity_scenarios(
         steps: Number of steps per range (11 x 11 = 121 scenarios)
         tariff_pct: Fixed tariff rate for all scenarios
         insurance_pct: Fixed insurance rate for all scenarios
-    
+        workers: Worker processes for large grids (1 = in-process)
+        fx_values: Explicit FX shocks to use instead of fx_range, e.g.
+                   empirical quantiles from FxShockDistributions.grid()
+
     Returns:
         DataFrame with fx_shock_pct, shipping_pct, profit, margin_pct
     """
-    
-    # Generate evenly-spaced values for each range
-    fx_values = [
-        fx_range[0] + i * (fx_range[1] - fx_range[0]) / (steps - 1) 
-        for i in range(steps)
-    ]
-    ship_values = [
-        shipping_range[0] + i * (shipping_range[1] - shipping_range[0]) / (steps - 1) 
-        for i in range(steps)
-    ]
-    
-    # Run margin calculation for each combination
-    rows = []
-    for fx in fx_values:
-        for ship in ship_values:
-            result = compute_margin(
-                import_value_gbp=import_value_gbp,
-                revenue_gbp=revenue_gbp,
-                fx_shock_pct=fx,
-                shipping_pct=ship,
-                insurance_pct=insurance_pct,
-                tariff_pct=tariff_pct,
-            )
-            rows.append({
-                "fx_shock_pct": fx * 100,
-                "shipping_pct": ship * 100,
-                "profit": result["profit"],
-                "margin_pct": result["margin_pct"],
-            })
-    
-    return pd.DataFrame(rows)
-    
-    # =========================================================================
-    # STEP 3: Return as a DataFrame for easy use in the dashboard
-    # =========================================================================
-    # Pandas DataFrames work well with Plotly for creating heatmaps and charts.
-    # The dashboard will pivot this data to create the FX × Shipping matrix.
-    
-    return pd.DataFrame(rows)
+
+    return run_scenario_grid(
+        import_value_gbp=import_value_gbp,
+        revenue_gbp=revenue_gbp,
+        axes={
+            "fx": list(fx_values) if fx_values is not None else GridRange(fx_range[0], fx_range[1], steps),
+            "shipping": GridRange(shipping_range[0], shipping_range[1], steps),
+        },
+        insurance_pct=insurance_pct,
+        tariff_pct=tariff_pct,
+        workers=workers,
+    )
@@ -0,0 +1,225 @@
+# stage_metrics.py
+# Per-stage timing, memory and row-count records for the data pipeline, written as JSON lines
+
+import cProfile
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRICS_FILE = "data/output/pipeline_metrics.jsonl"
+
+# The active recorder; instrumented functions run untouched while it is None
+_recorder = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None where unavailable)."""
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def count_rows(value):
+    """Rows in a DataFrame, or in all the DataFrames of a tuple (None if there are none)."""
+
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, tuple):
+        counts = [c for c in map(count_rows, value) if c is not None]
+        return sum(counts) if counts else None
+    return None
+
+
+class StageRecord:
+    """Measurements for one stage call; rows_in/rows_out may be set by the caller."""
+
+    def __init__(self, stage, call, depth, rows_in=None):
+        self.stage = stage
+        self.call = call
+        self.depth = depth
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.child_traced_peak = 0
+
+    def as_dict(self):
+        return {k: v for k, v in vars(self).items() if k != "child_traced_peak"}
+
+
+class StageRecorder:
+    """
+    Collects one record per instrumented stage call and appends it to a JSON
+    lines file as soon as the stage finishes, so a run that is killed part
+    way still leaves the stages that completed.
+
+    Each record has the run id, stage name, call number, nesting depth,
+    wall and CPU seconds, rows in and out, rows per second, the process
+    peak RSS and how much the stage raised it, and optionally the traced
+    allocation peak and a cProfile dump path.
+
+    Parameters:
+        path: JSON lines file to append to (None = keep records in memory only)
+        profile_dir: Folder for one cProfile dump per top-level stage call
+        trace_memory: Also track Python allocations with tracemalloc (slower)
+    """
+
+    def __init__(self, path=METRICS_FILE, profile_dir=None, trace_memory=False):
+        self.path = path
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+        self.run_id = uuid.uuid4().hex[:12]
+        self.records = []
+        self._calls = {}
+        self._stack = []
+        self._previous = None
+        self._started_tracing = False
+
+    def __enter__(self):
+        global _recorder
+        self._previous = _recorder
+        _recorder = self
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def __exit__(self, *exc):
+        global _recorder
+        _recorder = self._previous
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return False
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """Measure the enclosed block as one call of stage name."""
+
+        self._calls[name] = self._calls.get(name, 0) + 1
+        record = StageRecord(name, self._calls[name], len(self._stack), rows_in)
+        if self.trace_memory:
+            # reset_peak() below clears the enclosing stage's peak, so fold it in first
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                parent = self._stack[-1]
+                parent.child_traced_peak = max(parent.child_traced_peak, peak)
+            tracemalloc.reset_peak()
+            traced_start = current
+        self._stack.append(record)
+
+        # cProfile cannot nest, so only top-level stages get a dump
+        profiler = cProfile.Profile() if self.profile_dir and record.depth == 0 else None
+        rss_before = peak_rss_mb()
+        started = datetime.now(timezone.utc)
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profiler:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler:
+                profiler.disable()
+            record.wall_s = round(time.perf_counter() - wall, 6)
+            record.cpu_s = round(time.process_time() - cpu, 6)
+            self._stack.pop()
+            self._finish(record, started, rss_before, profiler, traced_start if self.trace_memory else None)
+
+    def _finish(self, record, started, rss_before, profiler, traced_start):
+        rows = record.rows_in if record.rows_in is not None else record.rows_out
+        record.rows_per_sec = round(rows / record.wall_s, 1) if rows is not None and record.wall_s > 0 else None
+
+        rss_after = peak_rss_mb()
+        record.peak_rss_mb = None if rss_after is None else round(rss_after, 1)
+        record.peak_rss_delta_mb = None if rss_after is None else round(rss_after - rss_before, 1)
+
+        if traced_start is not None:
+            traced_peak = max(tracemalloc.get_traced_memory()[1], record.child_traced_peak)
+            record.traced_peak_delta_mb = round((traced_peak - traced_start) / 2**20, 1)
+            if self._stack:
+                parent = self._stack[-1]
+                parent.child_traced_peak = max(parent.child_traced_peak, traced_peak)
+
+        if profiler:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            suffix = "" if record.call == 1 else f"-{record.call}"
+            record.profile = os.path.join(self.profile_dir, f"{record.stage}{suffix}.prof")
+            profiler.dump_stats(record.profile)
+
+        line = {"run_id": self.run_id, "started": started.isoformat(timespec="milliseconds"), **record.as_dict()}
+        self.records.append(line)
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(line) + "\n")
+
+    def summary(self):
+        """Total wall/CPU time, rows and worst RSS rise per stage, slowest first."""
+
+        if not self.records:
+            return pd.DataFrame(columns=["stage", "calls", "wall_s", "cpu_s", "rows_in", "rows_out", "peak_rss_delta_mb"])
+        df = pd.DataFrame(self.records).astype({"rows_in": "Int64", "rows_out": "Int64"})
+        summary = (
+            df.groupby("stage", sort=False)
+            .agg(
+                calls=("call", "count"),
+                wall_s=("wall_s", "sum"),
+                cpu_s=("cpu_s", "sum"),
+                rows_in=("rows_in", lambda rows: rows.sum(min_count=1)),
+                rows_out=("rows_out", lambda rows: rows.sum(min_count=1)),
+                peak_rss_delta_mb=("peak_rss_delta_mb", "max"),
+            )
+            .sort_values("wall_s", ascending=False)
+            .reset_index()
+        )
+        return summary.round({"wall_s": 3, "cpu_s": 3})
+
+
+def set_rows_in(rows):
+    """
+    Set rows in for the innermost active stage, for stages that stream
+    their input instead of taking it as a DataFrame argument.
+    """
+
+    if _recorder is not None and _recorder._stack:
+        _recorder._stack[-1].rows_in = rows
+
+
+def instrumented(name=None):
+    """
+    Decorator recording each call of a pipeline stage while a StageRecorder
+    is active. Rows in are the rows of any DataFrame arguments and rows out
+    the rows of the DataFrame(s) returned. With no active recorder the
+    function is called directly.
+    """
+
+    def decorate(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _recorder is None:
+                return func(*args, **kwargs)
+            inputs = [count_rows(a) for a in (*args, *kwargs.values()) if isinstance(a, pd.DataFrame)]
+            with _recorder.stage(stage_name, sum(inputs) if inputs else None) as record:
+                result = func(*args, **kwargs)
+                record.rows_out = count_rows(result)
+            return result
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,408 @@
+# storage.py
+# Columnar (Parquet / Arrow IPC) and CSV storage for pipeline tables
+
+import importlib.util
+import operator
+import os
+
+import pandas as pd
+from scripts.categories import COVERAGE_DTYPE
+
+# Supported formats, keyed by file extension
+FORMATS = {
+    ".parquet": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+    ".csv": "csv",
+}
+
+# Lookup order when a table exists in more than one format
+READ_PREFERENCE = (".parquet", ".feather", ".csv")
+
+# Explicit dtypes per table. Integer casts are skipped for columns with
+# missing values so nothing is silently coerced.
+HMRC_SCHEMA = {
+    "country_code": "category",
+    "partner_country": "category",
+    "commodity": "category",
+    "year": "int16",
+    "value": "float64",
+}
+
+ONS_TOTALS_SCHEMA = {
+    "country_code": "category",
+    "country_name": "category",
+    "year": "int16",
+    "import_value_million_gbp": "float64",
+}
+
+ONS_COMMODITY_SCHEMA = {
+    "country_name": "category",
+    "commodity": "category",
+    "year": "int16",
+    "import_value_million_gbp": "float64",
+}
+
+MERGED_TOTALS_SCHEMA = {
+    "country_code": "category",
+    "year": "int16",
+    "hmrc_total_value": "float64",
+    "country_name": "category",
+    "import_value_million_gbp": "float64",
+}
+
+COVERAGE_SCHEMA = {
+    "commodity": "int16",
+    "hs2_chapter": "int16",
+    "sitc_section": "int8",
+    "sitc_category": "category",
+    "total_years": "int16",
+    "ons_covered_years": "int16",
+    "ons_coverage_pct": "float64",
+    "coverage_class": COVERAGE_DTYPE,
+}
+
+FX_SCHEMA = {
+    "currency": "category",
+    "date": "datetime64[ns]",
+    "rate": "float64",
+}
+
+BENCHMARK_SCHEMA = {
+    "hs2_chapter": "int16",
+    "year": "int16",
+    "months": "int8",
+    "country_code": "category",
+    "value": "float64",
+    "share_pct": "float64",
+    "rank": "int32",
+    "percentile": "float64",
+    "growth_pct": "float64",
+    "suppliers": "int32",
+}
+
+
+def parquet_available() -> bool:
+    """True if pyarrow is installed (needed for Parquet and Arrow IPC)."""
+
+    # Look the package up without importing it; pyarrow is only imported
+    # when a Parquet/Arrow table is actually read or written
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _require_pyarrow():
+    if not parquet_available():
+        raise ImportError(
+            "Parquet/Arrow storage needs pyarrow: pip install pyarrow"
+        )
+
+
+# Default output formats: CSV for export, plus Parquet when pyarrow is available
+DEFAULT_FORMATS = ("csv", "parquet") if parquet_available() else ("csv",)
+
+
+def file_format(path) -> str:
+    """Storage format for a path, from its extension."""
+
+    ext = os.path.splitext(str(path))[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"Unsupported table format: {path}")
+    return FORMATS[ext]
+
+
+def resolve_path(path) -> str:
+    """
+    Find the best available copy of a table.
+
+    Given "data/output/merged_hmrc_ons_totals.csv" (or the path without an
+    extension), returns the .parquet or .feather sibling if one exists and
+    is not older than the CSV, falling back to the CSV.
+    """
+
+    stem, ext = os.path.splitext(str(path))
+    if ext.lower() not in FORMATS:
+        stem = str(path)
+    csv_path = stem + ".csv"
+    csv_mtime = os.path.getmtime(csv_path) if os.path.exists(csv_path) else None
+
+    for candidate_ext in READ_PREFERENCE:
+        candidate = stem + candidate_ext
+        if not os.path.exists(candidate):
+            continue
+        if candidate_ext == ".csv":
+            return candidate
+        # Skip columnar copies that pyarrow can't read or that are stale
+        if parquet_available() and (csv_mtime is None or os.path.getmtime(candidate) >= csv_mtime):
+            return candidate
+    return str(path) if ext else csv_path
+
+
+def apply_schema(df, schema):
+    """Cast columns present in df to the dtypes given in schema."""
+
+    if not schema:
+        return df
+
+    casts = {}
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        if isinstance(dtype, str) and dtype.startswith(("int", "uint")) and df[col].isna().any():
+            continue
+        casts[col] = dtype
+    return df.astype(casts)
+
+
+_COMPARISONS = {
+    "=": operator.eq,
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+
+def _predicate(field, op, value):
+    """Apply one predicate to a pandas Series or a pyarrow.dataset field."""
+
+    if op == "in":
+        return field.isin(list(value))
+    if op == "not in":
+        return ~field.isin(list(value))
+    if op in _COMPARISONS:
+        return _COMPARISONS[op](field, value)
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+def _filter_mask(df, filters):
+    """Evaluate (column, op, value) predicates with pandas (CSV fallback)."""
+
+    mask = pd.Series(True, index=df.index)
+    for col, op, value in filters:
+        mask &= _predicate(df[col], op, value)
+    return mask
+
+
+def _arrow_filter(filters):
+    """Build a pyarrow.dataset expression from (column, op, value) predicates."""
+
+    import pyarrow.dataset as ds
+
+    expr = None
+    for col, op, value in filters:
+        term = _predicate(ds.field(col), op, value)
+        expr = term if expr is None else expr & term
+    return expr
+
+
+def read_table(path, columns=None, filters=None, schema=None, dtype=None):
+    """
+    Read a table from Parquet, Arrow IPC (Feather) or CSV.
+
+    Parameters:
+        path: File path; the format comes from the extension
+        columns: Optional list of columns to load (projection)
+        filters: Optional list of (column, op, value) predicates, e.g.
+                 [("year", ">=", 2020), ("country_code", "in", ["FR", "DE"])].
+                 Pushed down to the file scan for Parquet/Arrow.
+        schema: Optional dtype mapping (e.g. HMRC_SCHEMA) applied after load
+        dtype: Optional column types for parsing a CSV (e.g. {"hs_code": str}
+               to keep leading zeros); columns not in the file are ignored
+
+    Returns: DataFrame
+    """
+
+    fmt = file_format(path)
+
+    if fmt == "csv":
+        usecols = None
+        if columns is not None:
+            # Filter columns must be loaded even if not projected
+            usecols = list(dict.fromkeys(list(columns) + [f[0] for f in filters or []]))
+        dtype = {
+            **(dtype or {}),
+            **{col: "category" for col, t in (schema or {}).items() if t == "category"},
+        }
+        df = pd.read_csv(path, usecols=usecols, dtype=dtype or None, low_memory=False)
+        if filters:
+            df = df[_filter_mask(df, filters)]
+        if columns is not None:
+            df = df[list(columns)]
+        return apply_schema(df, schema)
+
+    _require_pyarrow()
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(path, format="parquet" if fmt == "parquet" else "ipc")
+    table = dataset.to_table(
+        columns=list(columns) if columns is not None else None,
+        filter=_arrow_filter(filters) if filters else None,
+    )
+    return apply_schema(table.to_pandas(), schema)
+
+
+def iter_table(path, chunksize, columns=None, filters=None, schema=None, dtype=None):
+    """
+    Stream a table in chunks of at most chunksize rows.
+
+    Takes the same arguments as read_table(), so peak memory depends on
+    the chunk size and not the file size. Parquet/Arrow batches are read
+    with the filters pushed down; CSV chunks are filtered after parsing.
+    dtype (CSV only) fixes column types for every chunk, so a column that
+    is empty in one chunk and text in the next keeps one type.
+
+    Yields: DataFrames
+    """
+
+    fmt = file_format(path)
+
+    if fmt == "csv":
+        usecols = None
+        if columns is not None:
+            usecols = list(dict.fromkeys(list(columns) + [f[0] for f in filters or []]))
+        dtype = {
+            **(dtype or {}),
+            **{col: "category" for col, t in (schema or {}).items() if t == "category"},
+        }
+        reader = pd.read_csv(path, usecols=usecols, dtype=dtype or None, chunksize=chunksize)
+        for chunk in reader:
+            if filters:
+                chunk = chunk[_filter_mask(chunk, filters)]
+            if columns is not None:
+                chunk = chunk[list(columns)]
+            yield apply_schema(chunk, schema)
+        return
+
+    _require_pyarrow()
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(path, format="parquet" if fmt == "parquet" else "ipc")
+    batches = dataset.to_batches(
+        columns=list(columns) if columns is not None else None,
+        filter=_arrow_filter(filters) if filters else None,
+        batch_size=chunksize,
+    )
+    for batch in batches:
+        if batch.num_rows:
+            yield apply_schema(batch.to_pandas(), schema)
+
+
+def write_table(df, path, schema=None):
+    """
+    Write a table; the format comes from the path's extension.
+
+    Parquet and Feather files keep the schema's dtypes (including
+    categoricals); CSV is written as plain text for export.
+    """
+
+    fmt = file_format(path)
+    df = apply_schema(df, schema)
+
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+        return path
+
+    _require_pyarrow()
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.reset_index(drop=True).to_feather(path)
+    return path
+
+
+def write_outputs(df, path, formats=("csv",), schema=None):
+    """
+    Write the same table in several formats next to each other.
+
+    Parameters:
+        path: Output path; its extension is replaced for each format
+        formats: Any of "csv", "parquet", "feather"
+
+    Returns: List of written paths
+    """
+
+    stem = os.path.splitext(str(path))[0]
+    ext_for = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+    return [write_table(df, stem + ext_for[fmt], schema=schema) for fmt in formats]
+
+
+class TableWriter:
+    """
+    Append DataFrame chunks to a single CSV, Parquet or Arrow IPC file.
+
+    Used to stream results with constant memory: each chunk is written as
+    it arrives. The column layout of the first chunk fixes the file schema;
+    later chunks are cast to it. Columns that are entirely empty in the
+    first chunk are stored as text (object columns) or float64, so later
+    values fit. If the block writing the file raises, the partial file is
+    removed.
+
+    Usage:
+        with TableWriter("priced.parquet") as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, path, schema=None):
+        self.path = path
+        self.format = file_format(path)
+        self.schema = schema
+        self.rows = 0
+        self._writer = None
+        self._arrow_schema = None
+        self._columns = None
+        if self.format != "csv":
+            _require_pyarrow()
+
+    def write(self, df):
+        df = apply_schema(df, self.schema)
+        if self._columns is None:
+            self._columns = list(df.columns)
+        df = df[self._columns]
+
+        if self.format == "csv":
+            df.to_csv(self.path, mode="w" if self.rows == 0 else "a", header=self.rows == 0, index=False)
+        else:
+            import pyarrow as pa
+
+            if self._writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self._arrow_schema = _fill_null_types(table.schema, df)
+                table = table.cast(self._arrow_schema)
+                if self.format == "parquet":
+                    import pyarrow.parquet as pq
+                    self._writer = pq.ParquetWriter(self.path, self._arrow_schema)
+                else:
+                    self._writer = pa.ipc.new_file(self.path, self._arrow_schema)
+            else:
+                table = pa.Table.from_pandas(df, schema=self._arrow_schema, preserve_index=False)
+            self._writer.write_table(table)
+
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        if exc_type is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _fill_null_types(arrow_schema, df):
+    """Replace null-typed fields (all-empty columns) with string or float64."""
+
+    import pyarrow as pa
+
+    for i, field in enumerate(arrow_schema):
+        if pa.types.is_null(field.type):
+            kind = pa.string() if df[field.name].dtype == object else pa.float64()
+            arrow_schema = arrow_schema.set(i, field.with_type(kind))
+    return arrow_schema
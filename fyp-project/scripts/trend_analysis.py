@@ -0,0 +1,463 @@
+# trend_analysis.py
+# Import-value trends, rolling volatility and seasonality across many series at once
+#
+# Usage: python -m scripts.trend_analysis [--source totals|hmrc] [--window 3]
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from scripts.coverage import TOTALS_FILE
+from scripts.hmrc import HMRC_FILE, iter_hmrc_chunks, prepare_hmrc_chunk
+from scripts.storage import DEFAULT_FORMATS, read_table, resolve_path, write_outputs
+
+OUTPUT_FILES = {
+    "totals": "data/output/trend_summary_country.csv",
+    "hmrc": "data/output/trend_summary_country_hs2.csv",
+}
+
+# Column naming the month (1-12) in monthly HMRC extracts
+MONTH_COLUMN = "month"
+
+DEFAULT_CHUNKSIZE = 500_000
+
+
+# Series panel
+
+class SeriesPanel:
+    """
+    Many time series on a shared, regular period axis.
+
+    values is a dense (n_series, n_periods) float64 matrix with NaN where a
+    series has no value, so every kernel below runs over all series in one
+    NumPy pass along the last axis.
+
+    Attributes:
+        keys: DataFrame with one row of key columns per series
+        periods: int array of period numbers (years, or year * 12 + month - 1)
+        values: (n_series, n_periods) float64 array
+        freq: Periods per year (1 = annual, 12 = monthly)
+    """
+
+    def __init__(self, keys, periods, values, freq=1):
+        self.keys = keys.reset_index(drop=True)
+        self.periods = np.asarray(periods, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.freq = freq
+
+    @classmethod
+    def from_long(cls, df, keys, period, value, freq=1):
+        """
+        Build a panel from a long table, summing duplicate rows.
+
+        Periods missing from every series are still given a column, so the
+        time axis has no gaps.
+        """
+
+        wide = df.groupby(list(keys) + [period], observed=True)[value].sum().unstack(period)
+        if len(wide.columns):
+            wide = wide.reindex(columns=np.arange(wide.columns.min(), wide.columns.max() + 1))
+        return cls(wide.index.to_frame(index=False), wide.columns.to_numpy(), wide.to_numpy(), freq)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def aggregate(self, keys):
+        """
+        Sum series sharing the given key columns, e.g. ["hs2_chapter"] for
+        HS2 totals over all countries. A period stays NaN only if every
+        series in the group is NaN.
+        """
+
+        wide = pd.DataFrame(self.values)
+        grouped = wide.groupby([self.keys[k].to_numpy() for k in keys]).sum(min_count=1)
+        group_keys = grouped.index.to_frame(index=False)
+        group_keys.columns = list(keys)
+        return SeriesPanel(group_keys, self.periods, grouped.to_numpy(), self.freq)
+
+    def period_labels(self):
+        """Periods as "2024" (annual) or "2024-03" (monthly)."""
+
+        if self.freq == 12:
+            return [f"{p // 12}-{p % 12 + 1:02d}" for p in self.periods]
+        return [str(p) for p in self.periods]
+
+    def to_long(self, columns):
+        """
+        Long table of per-period results.
+
+        Parameters:
+            columns: Dict of column name -> (n_series, n_periods) array
+
+        Returns: DataFrame with the key columns, period and one column per
+        result; rows where every result is NaN are dropped.
+        """
+
+        n_series, n_periods = self.shape
+        out = self.keys.iloc[np.repeat(np.arange(n_series), n_periods)].reset_index(drop=True)
+        out["period"] = np.tile(self.period_labels(), n_series)
+        for name, values in columns.items():
+            out[name] = np.asarray(values).reshape(-1)
+        return out.dropna(subset=list(columns), how="all").reset_index(drop=True)
+
+
+# Rolling kernels (all O(n) per series via prefix sums)
+
+def _window_sums(x, window):
+    """Sum of each trailing window along the last axis (x must have no NaN)."""
+
+    prefix = np.zeros(x.shape[:-1] + (x.shape[-1] + 1,))
+    np.cumsum(x, axis=-1, out=prefix[..., 1:])
+    start = np.maximum(np.arange(1, x.shape[-1] + 1) - window, 0)
+    return prefix[..., 1:] - prefix[..., start]
+
+
+def _window_counts(valid, window):
+    return _window_sums(valid.astype(np.float64), window)
+
+
+def rolling_mean(values, window, min_periods=None):
+    """
+    Trailing-window mean along the last axis, ignoring NaN.
+
+    Windows with fewer than min_periods values (default: window) are NaN,
+    as with pandas rolling().mean().
+    """
+
+    min_periods = window if min_periods is None else min_periods
+    valid = ~np.isnan(values)
+    count = _window_counts(valid, window)
+    total = _window_sums(np.where(valid, values, 0.0), window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count >= max(min_periods, 1), total / count, np.nan)
+
+
+def rolling_std(values, window, min_periods=None, ddof=1):
+    """
+    Trailing-window standard deviation along the last axis, ignoring NaN.
+
+    Uses windowed sums of x and x squared. Each series is centred on its
+    own mean first, which keeps the subtraction well conditioned for large
+    import values.
+    """
+
+    min_periods = window if min_periods is None else min_periods
+    valid = ~np.isnan(values)
+    count = _window_counts(valid, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        centre = np.nansum(values, axis=-1, keepdims=True) / valid.sum(axis=-1, keepdims=True)
+    x = np.where(valid, values - np.nan_to_num(centre), 0.0)
+
+    total = _window_sums(x, window)
+    total_sq = _window_sums(x * x, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = (total_sq - total * total / count) / (count - ddof)
+    ok = (count >= max(min_periods, 1)) & (count > ddof)
+    return np.where(ok, np.sqrt(np.maximum(variance, 0.0)), np.nan)
+
+
+def rolling_slope(values, window, min_periods=None):
+    """
+    Least-squares slope of each trailing window (value change per period),
+    ignoring NaN. Needs at least two points per window.
+    """
+
+    min_periods = window if min_periods is None else min_periods
+    valid = ~np.isnan(values)
+    # Time centred on the middle of the axis keeps the sums small
+    n = values.shape[-1]
+    t = np.broadcast_to(np.arange(n, dtype=np.float64) - n / 2, values.shape)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        centre = np.nansum(values, axis=-1, keepdims=True) / valid.sum(axis=-1, keepdims=True)
+    x = np.where(valid, values - np.nan_to_num(centre), 0.0)
+    t = np.where(valid, t, 0.0)
+
+    count = _window_counts(valid, window)
+    sum_t = _window_sums(t, window)
+    sum_x = _window_sums(x, window)
+    sum_tt = _window_sums(t * t, window)
+    sum_tx = _window_sums(t * x, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = (count * sum_tx - sum_t * sum_x) / (count * sum_tt - sum_t * sum_t)
+    return np.where((count >= max(min_periods, 2)), slope, np.nan)
+
+
+def log_changes(values, lag=1):
+    """log(x[t] / x[t - lag]) along the last axis; NaN unless both values are positive."""
+
+    out = np.full(values.shape, np.nan)
+    current, previous = values[..., lag:], values[..., :-lag]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out[..., lag:] = np.where((current > 0) & (previous > 0), np.log(current / previous), np.nan)
+    return out
+
+
+def _shift_left(values, steps):
+    """Move values steps periods earlier along the last axis, padding the end with NaN."""
+
+    if steps == 0:
+        return values
+    out = np.full(values.shape, np.nan)
+    out[..., :-steps] = values[..., steps:]
+    return out
+
+
+# Trends and seasonality
+
+def linear_trend(values):
+    """
+    Least-squares line over each series' full history.
+
+    Returns: (slope per period, fitted value at the last period), both
+    shaped (n_series,)
+    """
+
+    n = values.shape[-1]
+    slope = rolling_slope(values, n, min_periods=2)[..., -1]
+    valid = ~np.isnan(values)
+    t = np.arange(n, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = np.nansum(values, axis=-1) / valid.sum(axis=-1)
+        mean_t = (valid * t).sum(axis=-1) / valid.sum(axis=-1)
+    return slope, mean_x + slope * (n - 1 - mean_t)
+
+
+def centred_moving_average(values, period):
+    """
+    Classical decomposition trend: centred moving average over one season
+    (a 2 x period average for even periods). NaN near the ends.
+    """
+
+    trailing = rolling_mean(values, period)
+    half = period // 2
+    if period % 2:
+        return _shift_left(trailing, half)
+    return (_shift_left(trailing, half - 1) + _shift_left(trailing, half)) / 2
+
+
+def seasonal_decompose(values, periods, period=12, model="multiplicative"):
+    """
+    Classical seasonal decomposition of every series at once.
+
+    Parameters:
+        values: (n_series, n_periods) array
+        periods: Period numbers, used to align seasons (e.g. calendar months)
+        period: Season length in periods
+        model: "multiplicative" (x = trend * seasonal * resid) or "additive"
+
+    Returns: Dictionary with trend, seasonal and resid arrays shaped like
+    values, and strength: the per-series seasonal strength in [0, 1]
+    """
+
+    if model not in ("multiplicative", "additive"):
+        raise ValueError(f"Unknown decomposition model: {model}")
+    multiplicative = model == "multiplicative"
+
+    trend = centred_moving_average(values, period)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        detrended = values / trend if multiplicative else values - trend
+
+    # Mean detrended value per season position, over all cycles
+    phase = np.asarray(periods) % period
+    valid = ~np.isnan(detrended)
+    one_hot = (phase[:, None] == np.arange(period)).astype(np.float64)
+    totals = np.where(valid, detrended, 0.0) @ one_hot
+    counts = valid.astype(np.float64) @ one_hot
+    with np.errstate(invalid="ignore", divide="ignore"):
+        index = totals / counts
+        # Normalise so the seasonal effects average out over a cycle
+        if multiplicative:
+            index = index / np.nanmean(np.where(counts > 0, index, np.nan), axis=-1, keepdims=True)
+        else:
+            index = index - np.nanmean(np.where(counts > 0, index, np.nan), axis=-1, keepdims=True)
+    seasonal = index[:, phase]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if multiplicative:
+            resid = values / (trend * seasonal)
+            # Strength on the log scale, where the components add
+            log_resid = np.log(resid)
+            log_both = np.log(seasonal * resid)
+        else:
+            resid = values - trend - seasonal
+            log_resid, log_both = resid, seasonal + resid
+        strength = 1 - np.nanvar(log_resid, axis=-1) / np.nanvar(log_both, axis=-1)
+    return {
+        "trend": trend,
+        "seasonal": seasonal,
+        "resid": resid,
+        "strength": np.clip(strength, 0.0, 1.0),
+    }
+
+
+def _first_last(values):
+    """Index of the first and last non-NaN value per series (-1 if none)."""
+
+    valid = ~np.isnan(values)
+    has_any = valid.any(axis=-1)
+    first = np.where(has_any, valid.argmax(axis=-1), -1)
+    last = np.where(has_any, values.shape[-1] - 1 - valid[..., ::-1].argmax(axis=-1), -1)
+    return first, last
+
+
+def trend_summary(panel, window=3):
+    """
+    One row per series: history, latest value, growth, trend and volatility.
+
+    Parameters:
+        panel: SeriesPanel
+        window: Volatility window in years (converted to periods)
+
+    Returns: DataFrame with the key columns and
+        first_period, last_period, periods_observed, latest_value,
+        growth_pct (latest vs one year earlier), cagr_pct (first to last
+        value), trend_pct (fitted slope per year as % of the fitted latest
+        value), volatility_pct (annualised std of period log changes over
+        the last window) and, for monthly panels, seasonal_strength
+    """
+
+    values, freq = panel.values, panel.freq
+    n_series, n_periods = values.shape
+    rows = np.arange(n_series)
+    first, last = _first_last(values)
+    labels = np.array(panel.period_labels() + [None], dtype=object)
+
+    first_value = values[rows, np.maximum(first, 0)]
+    last_value = values[rows, np.maximum(last, 0)]
+    year_ago = np.where(last >= freq, values[rows, np.maximum(last - freq, 0)], np.nan)
+    years = (last - first) / freq
+
+    slope, fitted_last = linear_trend(values)
+    changes = log_changes(values)
+    window_periods = max(int(window * freq), 2)
+    volatility = rolling_std(changes, window_periods, min_periods=2)[rows, np.maximum(last, 0)]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        summary = {
+            "first_period": labels[first],
+            "last_period": labels[last],
+            "periods_observed": (~np.isnan(values)).sum(axis=-1),
+            "latest_value": last_value,
+            "growth_pct": (last_value / year_ago - 1) * 100,
+            "cagr_pct": np.where(
+                (years > 0) & (first_value > 0) & (last_value > 0),
+                ((last_value / first_value) ** (1 / years) - 1) * 100,
+                np.nan,
+            ),
+            "trend_pct": slope * freq / fitted_last * 100,
+            "volatility_pct": volatility * np.sqrt(freq) * 100,
+        }
+    if freq > 1 and n_periods >= 2 * freq:
+        summary["seasonal_strength"] = seasonal_decompose(values, panel.periods, freq)["strength"]
+
+    out = panel.keys.copy()
+    for name, column in summary.items():
+        out[name] = column
+    for name in ("growth_pct", "cagr_pct", "trend_pct", "volatility_pct"):
+        out[name] = out[name].replace([np.inf, -np.inf], np.nan)
+    return out
+
+
+def rolling_table(panel, window=3):
+    """
+    Per-period rolling statistics for every series, for charts.
+
+    Returns: Long DataFrame with value, rolling_mean, rolling_volatility_pct
+    (annualised) and rolling_trend (slope per period) over window years
+    """
+
+    window_periods = max(int(window * panel.freq), 2)
+    values = panel.values
+    return panel.to_long({
+        "value": values,
+        "rolling_mean": rolling_mean(values, window_periods, min_periods=1),
+        "rolling_volatility_pct": (
+            rolling_std(log_changes(values), window_periods, min_periods=2) * np.sqrt(panel.freq) * 100
+        ),
+        "rolling_trend": rolling_slope(values, window_periods, min_periods=2),
+    })
+
+
+# Loaders
+
+def country_panel(path=TOTALS_FILE):
+    """Annual HMRC import value per country, from the merged totals table."""
+
+    totals = read_table(resolve_path(path), columns=["country_code", "year", "hmrc_total_value"])
+    return SeriesPanel.from_long(totals, ["country_code"], "year", "hmrc_total_value")
+
+
+def hmrc_panel(path=None, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Import value per country and HS2 chapter from the HMRC detail file.
+
+    The file is streamed and summed per chunk. Monthly extracts (with a
+    month column) give a monthly panel; otherwise the panel is annual.
+    path may also be a list of files (e.g. HMRC partitions), summed together.
+    """
+
+    paths = path if isinstance(path, (list, tuple)) else [path]
+    partials = []
+    monthly = False
+    for chunk in (c for p in paths for c in iter_hmrc_chunks(chunksize, p)):
+        chunk = prepare_hmrc_chunk(chunk)
+        chunk = chunk[chunk["hs2_chapter"].notna()]
+        monthly = MONTH_COLUMN in chunk.columns
+        period = chunk["year"].astype(np.int64)
+        if monthly:
+            period = period * 12 + chunk[MONTH_COLUMN].astype(np.int64) - 1
+        partials.append(
+            chunk.assign(
+                period=period,
+                country_code=chunk["country_code"].astype(str),
+                hs2_chapter=chunk["hs2_chapter"].astype(np.int16),
+            )
+            .groupby(["country_code", "hs2_chapter", "period"], observed=True)["value"]
+            .sum()
+            .reset_index()
+        )
+
+    if not partials:
+        return SeriesPanel(pd.DataFrame(columns=["country_code", "hs2_chapter"]), [], np.empty((0, 0)))
+    combined = pd.concat(partials, ignore_index=True)
+    return SeriesPanel.from_long(
+        combined, ["country_code", "hs2_chapter"], "period", "value", freq=12 if monthly else 1
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Import-value trends, volatility and seasonality")
+    parser.add_argument(
+        "--source",
+        choices=tuple(OUTPUT_FILES),
+        default="totals",
+        help="totals: country totals; hmrc: country x HS2 from the HMRC detail file",
+    )
+    parser.add_argument("--window", type=float, default=3, help="Volatility window in years")
+    parser.add_argument("--hmrc", default=None, help=f"HMRC file (default {HMRC_FILE})")
+    parser.add_argument("--rolling", action="store_true", help="Also save per-period rolling statistics")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    panel = country_panel() if args.source == "totals" else hmrc_panel(args.hmrc)
+    print(f"Series: {panel.shape[0]:,} x {panel.shape[1]} periods")
+
+    summary = trend_summary(panel, args.window)
+    output = OUTPUT_FILES[args.source]
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    write_outputs(summary, output, DEFAULT_FORMATS)
+    print(f"Saved trend summary → {output}")
+    print(summary.head(10).to_string(index=False))
+
+    if args.rolling:
+        rolling_output = output.replace("trend_summary", "trend_rolling")
+        write_outputs(rolling_table(panel, args.window), rolling_output, DEFAULT_FORMATS)
+        print(f"Saved rolling statistics → {rolling_output}")
+
+
+if __name__ == "__main__":
+    main()